@@ -0,0 +1,63 @@
+"""Initial tables: document_queries and answer_cache
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Databases set up before migrations already have these tables (the app used
+to create them on import); they are left as they are and only stamped.
+document_queries predates this revision and may hold that history, so a
+downgrade keeps it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("document_queries"):
+        op.create_table(
+            "document_queries",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("document_url", sa.String(), nullable=False),
+            sa.Column("document_name", sa.String(), nullable=True),
+            sa.Column("questions", sa.JSON(), nullable=False),
+            sa.Column("retrieved_chunks", sa.JSON(), nullable=False),
+            sa.Column("answers", sa.JSON(), nullable=False),
+            sa.Column("processing_time", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_document_queries_id", "document_queries", ["id"])
+
+    if not inspector.has_table("answer_cache"):
+        op.create_table(
+            "answer_cache",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("cache_key", sa.String(64), nullable=False),
+            sa.Column("document_id", sa.String(), nullable=False),
+            sa.Column("question", sa.Text(), nullable=False),
+            sa.Column("model", sa.String(), nullable=False),
+            sa.Column("prompt_version", sa.String(), nullable=False),
+            sa.Column("answer", sa.Text(), nullable=False),
+            sa.Column("retrieved_chunks", sa.JSON(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_answer_cache_id", "answer_cache", ["id"])
+        op.create_index("ix_answer_cache_cache_key", "answer_cache", ["cache_key"], unique=True)
+        op.create_index("ix_answer_cache_document_id", "answer_cache", ["document_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("answer_cache")
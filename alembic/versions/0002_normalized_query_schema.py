@@ -0,0 +1,91 @@
+"""Normalised documents, chunks, question/answer and retrieval reference tables
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+The legacy document_queries table is kept (with its rows) and gets the
+document_url index it was missing; new requests are recorded in query_runs.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    legacy_indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("document_queries")}
+    if "ix_document_queries_document_url" not in legacy_indexes:
+        op.create_index("ix_document_queries_document_url", "document_queries", ["document_url"])
+
+    op.create_table(
+        "documents",
+        sa.Column("id", sa.String(64), primary_key=True),
+        sa.Column("chunk_count", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    op.create_table(
+        "chunks",
+        sa.Column("document_id", sa.String(64), sa.ForeignKey("documents.id", ondelete="CASCADE"),
+                  primary_key=True),
+        sa.Column("chunk_index", sa.Integer(), primary_key=True),
+        sa.Column("chunk_id", sa.String(), nullable=True),
+        sa.Column("text", sa.Text(), nullable=False),
+    )
+
+    op.create_table(
+        "query_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("document_id", sa.String(64), sa.ForeignKey("documents.id", ondelete="CASCADE"),
+                  nullable=False),
+        sa.Column("document_url", sa.String(), nullable=False),
+        sa.Column("document_name", sa.String(), nullable=True),
+        sa.Column("processing_time", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_query_runs_document_id", "query_runs", ["document_id"])
+    op.create_index("ix_query_runs_document_url", "query_runs", ["document_url"])
+    op.create_index("ix_query_runs_created_at", "query_runs", ["created_at"])
+
+    op.create_table(
+        "question_answers",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("query_run_id", sa.Integer(), sa.ForeignKey("query_runs.id", ondelete="CASCADE"),
+                  nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("question", sa.Text(), nullable=False),
+        sa.Column("answer", sa.Text(), nullable=False),
+        sa.Column("cache_key", sa.String(64), nullable=True),
+    )
+    op.create_index("ix_question_answers_query_run_id", "question_answers", ["query_run_id"])
+    op.create_index("ix_question_answers_cache_key", "question_answers", ["cache_key"])
+
+    op.create_table(
+        "retrieval_references",
+        sa.Column("question_answer_id", sa.Integer(),
+                  sa.ForeignKey("question_answers.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("rank", sa.Integer(), primary_key=True),
+        sa.Column("document_id", sa.String(64), nullable=False),
+        sa.Column("chunk_index", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=True),
+    )
+    op.create_index("ix_retrieval_references_chunk", "retrieval_references", ["document_id", "chunk_index"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("retrieval_references")
+    op.drop_table("question_answers")
+    op.drop_table("query_runs")
+    op.drop_table("chunks")
+    op.drop_table("documents")
+    op.drop_index("ix_document_queries_document_url", table_name="document_queries")
@@ -0,0 +1,38 @@
+"""document_urls: normalised document URL -> content-addressed document ID
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+Replaces the per-instance JSON registry file, so every instance (and every
+restart) resolves a known URL without downloading and re-ingesting it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "document_urls",
+        sa.Column("url", sa.String(), primary_key=True),
+        sa.Column("document_id", sa.String(64), nullable=False),
+        sa.Column("etag", sa.String(), nullable=True),
+        sa.Column("last_modified", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_document_urls_document_id", "document_urls", ["document_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("document_urls")
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import json
 import time
 
-from app.models.database import get_db, DocumentQuery
-from app.models.schemas import EvaluationRequest, EvaluationResponse, DocumentQueryCreate
+from app.models.schemas import (
+    EvaluationRequest, EvaluationResponse, IngestionRequest, IngestionJobResponse
+)
 from app.services.rag_service import RAGService
 from app.api.auth import verify_token
 from app.utils.logger import logger
@@ -15,44 +18,20 @@ rag_service = RAGService()
 @router.post("/hackrx/run", response_model=EvaluationResponse)
 async def evaluate_document(
     request: EvaluationRequest,
-    db: Session = Depends(get_db),
     token: str = Depends(verify_token)
 ):
     """Main endpoint for document evaluation."""
     try:
-        # Validate input
-        if not request.questions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Questions list cannot be empty"
-            )
-        
-        if len(request.questions) > 20: 
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Too many questions. Maximum 20 questions allowed."
-            )
+        _validate_request(request)
         
         logger.info(f"Processing document: {request.documents}")
         logger.info(f"Number of questions: {len(request.questions)}")
         
         # Process document and questions
-        result = rag_service.process_document_and_questions(
+        result = await rag_service.process_document_and_questions(
             request.documents, request.questions
         )
         
-        # Save to database
-        db_record = DocumentQuery(
-            document_url=request.documents,
-            document_name=result["document_name"],
-            questions=request.questions,
-            retrieved_chunks=result["retrieved_chunks"],
-            answers=result["answers"],
-            processing_time=result["processing_time"]
-        )
-        db.add(db_record)
-        db.commit()
-        
         logger.info(f"Successfully processed document. Processing time: {result['processing_time']}ms")
         
         return EvaluationResponse(answers=result["answers"])
@@ -66,6 +45,105 @@ async def evaluate_document(
             detail=f"Internal server error: {str(e)}"
         )
 
+@router.post("/hackrx/run/stream")
+async def evaluate_document_stream(
+    request: EvaluationRequest,
+    http_request: Request,
+    response_format: Optional[str] = Query(None, alias="format"),
+    stream_tokens: bool = False,
+    token: str = Depends(verify_token)
+):
+    """Streaming variant of /hackrx/run.
+    
+    Emits an ``answer`` event per question (tagged with its index) as soon as
+    it is ready, ``token`` events while answers are generated when
+    ``stream_tokens`` is set, and a final ``done`` event with timing and cache
+    hits (or an ``error`` event). Sent as Server-Sent Events when
+    ``format=sse`` or the client accepts text/event-stream, otherwise as
+    newline-delimited JSON.
+    """
+    _validate_request(request)
+    accepts_sse = "text/event-stream" in http_request.headers.get("accept", "")
+    stream_format = response_format or ("sse" if accepts_sse else "ndjson")
+    if stream_format not in ("sse", "ndjson"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format must be 'sse' or 'ndjson'"
+        )
+    
+    logger.info(f"Streaming answers for document: {request.documents} ({len(request.questions)} questions)")
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        _encode_events(_answer_events(request, stream_tokens), stream_format),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _answer_events(request: EvaluationRequest, stream_tokens: bool) -> AsyncIterator[Dict[str, Any]]:
+    """Pipeline events for the client; failures become a final error event."""
+    try:
+        async for event in rag_service.stream_document_and_questions(
+            request.documents, request.questions, stream_tokens=stream_tokens
+        ):
+            if event["event"] == "done":
+                logger.info(f"Successfully streamed answers. Processing time: {event['processing_time']}ms")
+                event = {key: value for key, value in event.items() if key != "retrieved_chunks"}
+            yield event
+    except Exception as e:
+        logger.error(f"Error streaming answers: {str(e)}")
+        yield {"event": "error", "detail": f"Internal server error: {str(e)}"}
+
+async def _encode_events(events: AsyncIterator[Dict[str, Any]], response_format: str) -> AsyncIterator[str]:
+    async for event in events:
+        data = json.dumps(event)
+        if response_format == "sse":
+            yield f"event: {event['event']}\ndata: {data}\n\n"
+        else:
+            yield data + "\n"
+
+@router.post("/documents/ingest", response_model=IngestionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_document(
+    request: IngestionRequest,
+    token: str = Depends(verify_token)
+):
+    """Queue a document for background ingestion, so later questions about it skip that work.
+    
+    Submitting a URL whose job is still queued or running returns that job.
+    """
+    try:
+        job = rag_service.ingestion_jobs.submit(request.documents)
+    except asyncio.QueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Ingestion queue is full. Please try again later."
+        )
+    return job.as_dict()
+
+@router.get("/documents/ingest/{job_id}", response_model=IngestionJobResponse)
+async def ingestion_job_status(job_id: str, token: str = Depends(verify_token)):
+    """Status of a background ingestion job."""
+    job = rag_service.ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown ingestion job: {job_id}"
+        )
+    return job.as_dict()
+
+def _validate_request(request: EvaluationRequest):
+    """Reject empty or oversized question lists."""
+    if not request.questions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Questions list cannot be empty"
+        )
+    
+    if len(request.questions) > 20: 
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Too many questions. Maximum 20 questions allowed."
+        )
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -73,22 +151,38 @@ async def health_check():
 
 @router.get("/queries", response_model=List[dict])
 async def get_queries(
-    db: Session = Depends(get_db),
     token: str = Depends(verify_token),
     limit: int = 10
 ):
     """Get recent queries (for debugging/monitoring)."""
-    queries = db.query(DocumentQuery).order_by(
-        DocumentQuery.created_at.desc()
-    ).limit(limit).all()
-    
-    return [
-        {
-            "id": q.id,
-            "document_url": q.document_url,
-            "questions_count": len(q.questions),
-            "processing_time": q.processing_time,
-            "created_at": q.created_at
-        }
-        for q in queries
-    ]
\ No newline at end of file
+    return await asyncio.to_thread(rag_service.query_store.recent, limit)
+
+@router.get("/queries/stats")
+async def query_log_stats(token: str = Depends(verify_token)):
+    """Buffered, written and dropped records of the background query log."""
+    return rag_service.query_logger.stats()
+
+@router.get("/cache/stats")
+async def cache_stats(token: str = Depends(verify_token)):
+    """Answer, semantic and embedding cache hit rates (for tuning/monitoring)."""
+    embedding_cache = rag_service.embedding_service.cache
+    return {
+        "answer_cache": rag_service.answer_cache.stats(),
+        "semantic_cache": rag_service.semantic_cache.stats(),
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None
+    }
+
+@router.get("/embedding/stats")
+async def embedding_stats(token: str = Depends(verify_token)):
+    """Batch sizes and queueing delay of the cross-request query embedding batcher."""
+    return rag_service.embedding_service.query_batcher.stats()
+
+@router.get("/ingestion/stats")
+async def ingestion_stats(token: str = Depends(verify_token)):
+    """Per-stage throughput of the document ingestion pipeline, and background job counts."""
+    return {**rag_service.ingestion.stats(), "jobs": rag_service.ingestion_jobs.stats()}
+
+@router.get("/llm/stats")
+async def llm_stats(token: str = Depends(verify_token)):
+    """Rate-limit window usage, queueing, retries and hedges of LLM calls."""
+    return rag_service.llm_service.scheduler.stats()
@@ -5,16 +5,67 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     database_url: str
+    database_migrate_on_startup: bool = True  # run.py applies pending Alembic migrations
     
     # Vector Database
-    pinecone_api_key: str
-    pinecone_index_name: str
+    vector_backend: str = "pinecone"  # "pinecone" or "local"
+    pinecone_api_key: Optional[str] = None
+    pinecone_index_name: Optional[str] = None
+    local_vector_dir: str = "data/vectors"
+    manifest_dir: str = "data/manifests"
+    local_index_type: str = "flat"  # "flat" (exact) or "ivf" (approximate, int8)
+    ivf_nlist: int = 256
+    ivf_nprobe: int = 8
+    ivf_train_size: int = 10000
+    ivf_rerank_factor: int = 4
+    ivf_exact_threshold: int = 20000  # Document-scoped searches below this size stay exact
+    ivf_snapshot_ratio: float = 0.1  # Rewrite the index file once this share of it has changed
+    # Pinecone upserts: concurrent requests, per-request limits and retries
+    upsert_concurrency: int = 4
+    upsert_max_batch_bytes: int = 1536 * 1024  # Pinecone rejects requests over 2 MB
+    upsert_max_batch_vectors: int = 1000
+    upsert_max_retries: int = 3
+    upsert_retry_backoff: float = 0.5
     
     # LLM Providers
-    groq_api_key: str
+    llm_provider: str = "groq"  # "groq" or "mock" (offline load testing)
+    groq_api_key: Optional[str] = None
+    llm_model: str = "llama3-8b-8192"
+    llm_timeout: float = 30.0
+    llm_max_connections: int = 20
+    # Calls queue rather than exceed these; set them to the account's Groq limits
+    llm_requests_per_minute: int = 30
+    llm_tokens_per_minute: int = 30000
+    llm_max_retries: int = 3
+    llm_retry_backoff: float = 1.0
+    # Send a duplicate request when a call runs past this percentile of recent latencies
+    llm_hedge_enabled: bool = False
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_min_samples: int = 20
+    mock_llm_latency_ms: float = 800.0  # Median latency of the mock provider
+    mock_llm_latency_sigma: float = 0.5  # Log-normal shape: larger gives a longer slow tail
+    mock_llm_error_rate: float = 0.0  # Share of mock calls failing with a retryable 429
+    # Answer questions with overlapping context together in one JSON-mode call
+    llm_batch_enabled: bool = False
+    llm_batch_max_questions: int = 5
+    llm_batch_context_tokens: int = 3000  # Budget for a group's merged context
+    llm_batch_min_overlap: float = 0.2  # Jaccard overlap of retrieved chunks to join a group
+    llm_batch_max_output_tokens: int = 2500
+    # Context assembly between retrieval and generation (token counts use this tiktoken encoding)
+    llm_tokenizer_encoding: str = "cl100k_base"
+    context_assembly_enabled: bool = True
+    context_candidates: int = 10  # Chunks retrieved per question for MMR to choose top_k from
+    context_max_tokens: int = 1500  # Per-question context budget
+    context_mmr_lambda: float = 0.7  # 1.0 = relevance only; lower favours diverse chunks
+    context_dedup_threshold: float = 0.8  # Shingle containment at which a chunk is a near-duplicate
     
-    # LlamaParse
-    llama_parse_api_key: str
+    # PDF parsing ("llamaparse", "local" or "auto": local first, LlamaParse for scans)
+    pdf_parser_backend: str = "llamaparse"
+    llama_parse_api_key: Optional[str] = None
+    pdf_parser_workers: int = 2
+    pdf_pages_per_task: int = 8
+    pdf_min_chars_per_page: int = 100
+    pdf_max_sparse_page_ratio: float = 0.3
     
     # Authentication
     bearer_token: str
@@ -23,9 +74,57 @@ class Settings(BaseSettings):
     environment: str = "production"
     log_level: str = "INFO"
     embedding_model: str = "all-MiniLM-L6-v2"
-    chunk_size: int = 512
-    chunk_overlap: int = 50
+    embedding_dimension: int = 384
+    embedding_backend: str = "torch"  # "torch" (SentenceTransformer) or "onnx"
+    embedding_batch_size: int = 32
+    onnx_model_dir: str = "data/onnx"
+    onnx_quantize: bool = True  # int8 dynamic quantisation of the exported graph
+    onnx_intra_op_threads: int = 0  # 0 = one per core
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = "data/embedding_cache.sqlite3"
+    embedding_cache_memory_bytes: int = 64 * 1024 * 1024
+    embedding_cache_dtype: str = "float32"  # or "float16" to halve cache memory and disk
+    # Chunk size and overlap are in embedding-model tokens
+    chunk_size: int = 240
+    chunk_overlap: int = 40
     top_k: int = 5
+    # Hybrid retrieval: per-document BM25 fused with dense search by reciprocal rank fusion
+    hybrid_search_enabled: bool = True
+    lexical_index_dir: str = "data/lexical"
+    hybrid_candidates: int = 20  # Results taken from each retriever before fusion
+    rrf_k: int = 60
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    answer_cache_size: int = 10000
+    semantic_cache_enabled: bool = False  # shadow mode until SEMANTIC_CACHE_THRESHOLD is tuned (histogram in /cache/stats)
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_max_entries: int = 1000  # per document
+    semantic_cache_max_documents: int = 500
+    
+    # Document download
+    pdf_download_timeout: int = 30
+    pdf_max_bytes: int = 100 * 1024 * 1024
+    pdf_download_chunk_bytes: int = 256 * 1024
+    http_max_connections: int = 20
+    document_revalidation: bool = True
+    
+    # Concurrency
+    embedding_workers: int = 1
+    # Query embeddings from concurrent requests are batched for up to this long / this many texts
+    embedding_batch_max_wait_ms: float = 5.0
+    embedding_batch_max_size: int = 64
+    question_concurrency: int = 8
+    # Ingestion pipeline: chunks per embedding batch, and max items per stage queue
+    ingest_batch_size: int = 64
+    ingest_queue_size: int = 4
+    # Background ingestion jobs (POST /documents/ingest)
+    ingestion_workers: int = 2
+    ingestion_job_queue_size: int = 32
+    ingestion_job_history: int = 1000
+    # Write-behind query logging: records buffered (then dropped), rows per insert batch, seconds between flushes
+    query_log_buffer_size: int = 1000
+    query_log_batch_size: int = 100
+    query_log_flush_interval: float = 1.0
     
     class Config:
         env_file = "LLM-Powered-Intelligent-Query-Retrieval-System/.env"
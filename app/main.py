@@ -168,6 +168,22 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("🛑 Shutting down RAG System API...")
+    try:
+        from app.api.routes import rag_service
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load services to shut down: {e}")
+        return
+    # Each in its own try, so one failure doesn't skip draining the query log or closing clients
+    for name, service in [
+        ("query log", rag_service.query_logger),
+        ("PDF parser", rag_service.pdf_parser),
+        ("LLM service", rag_service.llm_service),
+        ("ingestion jobs", rag_service.ingestion_jobs)
+    ]:
+        try:
+            await service.aclose()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not close {name}: {e}")
 
 # Exception handlers
 @app.exception_handler(500)
@@ -1,6 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, JSON, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker
 from sqlalchemy.sql import func
 from app.config.settings import settings
 
@@ -9,10 +9,11 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 class DocumentQuery(Base):
+    """Legacy per-request log with questions, chunks and answers as JSON (superseded by QueryRun)."""
     __tablename__ = "document_queries"
     
     id = Column(Integer, primary_key=True, index=True)
-    document_url = Column(String, nullable=False)
+    document_url = Column(String, nullable=False, index=True)
     document_name = Column(String, nullable=True)
     questions = Column(JSON, nullable=False)
     retrieved_chunks = Column(JSON, nullable=False)
@@ -20,8 +21,94 @@ class DocumentQuery(Base):
     processing_time = Column(Integer, nullable=True)  # in milliseconds
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+class CachedAnswer(Base):
+    __tablename__ = "answer_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # sha256 of (document_id, normalized question, model, prompt version)
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)
+    document_id = Column(String, nullable=False, index=True)
+    question = Column(Text, nullable=False)
+    model = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+    answer = Column(Text, nullable=False)
+    retrieved_chunks = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Document(Base):
+    __tablename__ = "documents"
+    
+    # sha256 of the PDF bytes, as used by the vector store and answer cache
+    id = Column(String(64), primary_key=True)
+    chunk_count = Column(Integer, nullable=True)  # unknown for documents ingested before this table
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Chunk(Base):
+    __tablename__ = "chunks"
+    
+    document_id = Column(String(64), ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    chunk_index = Column(Integer, primary_key=True)
+    chunk_id = Column(String, nullable=True)  # ID in the vector backend
+    text = Column(Text, nullable=False)
+
+class DocumentUrl(Base):
+    """A normalised document URL and the content-addressed document it last served."""
+    __tablename__ = "document_urls"
+    
+    url = Column(String, primary_key=True)
+    # No foreign key to documents: the documents row is written best-effort at ingestion
+    document_id = Column(String(64), nullable=False, index=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class QueryRun(Base):
+    """One answered request: a document and its questions."""
+    __tablename__ = "query_runs"
+    
+    id = Column(Integer, primary_key=True)
+    document_id = Column(String(64), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    document_url = Column(String, nullable=False, index=True)
+    document_name = Column(String, nullable=True)
+    processing_time = Column(Integer, nullable=True)  # in milliseconds
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    
+    answers = relationship(
+        "QuestionAnswer", order_by="QuestionAnswer.position", cascade="all, delete-orphan"
+    )
+
+class QuestionAnswer(Base):
+    __tablename__ = "question_answers"
+    
+    id = Column(Integer, primary_key=True)
+    query_run_id = Column(Integer, ForeignKey("query_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)  # index of the question in the request
+    question = Column(Text, nullable=False)
+    answer = Column(Text, nullable=False)
+    # answer_cache entry it came from (the matched question's, for semantic cache hits)
+    cache_key = Column(String(64), nullable=True, index=True)
+    
+    references = relationship(
+        "RetrievalReference", order_by="RetrievalReference.rank", cascade="all, delete-orphan"
+    )
+
+class RetrievalReference(Base):
+    """A chunk retrieved as context for an answer, by (document_id, chunk_index) rather than by copy."""
+    __tablename__ = "retrieval_references"
+    __table_args__ = (
+        Index("ix_retrieval_references_chunk", "document_id", "chunk_index"),
+    )
+    
+    question_answer_id = Column(
+        Integer, ForeignKey("question_answers.id", ondelete="CASCADE"), primary_key=True
+    )
+    rank = Column(Integer, primary_key=True)
+    # No foreign key to chunks: documents ingested before the chunks table have no rows there
+    document_id = Column(String(64), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    score = Column(Float, nullable=True)
+
+# Tables are created and upgraded by the Alembic migrations (alembic upgrade head)
 
 def get_db():
     db = SessionLocal()
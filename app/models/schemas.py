@@ -1,6 +1,5 @@
-from pydantic import BaseModel, HttpUrl
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from pydantic import BaseModel
+from typing import List, Optional
 
 class EvaluationRequest(BaseModel):
     documents: str  # PDF URL
@@ -9,20 +8,16 @@ class EvaluationRequest(BaseModel):
 class EvaluationResponse(BaseModel):
     answers: List[str]
 
-class DocumentQueryCreate(BaseModel):
-    document_url: str
-    document_name: Optional[str]
-    questions: List[str]
-    retrieved_chunks: List[Dict[str, Any]]
-    answers: List[str]
-    processing_time: Optional[int]
+class IngestionRequest(BaseModel):
+    documents: str  # PDF URL
 
-class DocumentQueryResponse(BaseModel):
-    id: int
+class IngestionJobResponse(BaseModel):
+    job_id: str
     document_url: str
-    document_name: Optional[str]
-    questions: List[str]
-    retrieved_chunks: List[Dict[str, Any]]
-    answers: List[str]
-    processing_time: Optional[int]
-    created_at: datetime
\ No newline at end of file
+    status: str
+    document_id: Optional[str]
+    error: Optional[str]
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    seconds: float
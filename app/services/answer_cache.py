@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from typing import List, Dict, Any
+import hashlib
+import re
+import threading
+from sqlalchemy.dialects.postgresql import insert
+from app.models.database import SessionLocal, CachedAnswer
+from app.config.settings import settings
+from app.utils.logger import logger
+
+def normalize_question(question: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.!").strip().lower()
+
+def make_cache_key(document_id: str, question: str, model: str, prompt_version: str) -> str:
+    """Cache key for one answer: document, normalised question, model and prompt version."""
+    raw = "\x1f".join([document_id, normalize_question(question), model, prompt_version])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def insert_answers(entries: List[Dict[str, Any]]):
+    """Multi-row INSERT of new ``answer_cache`` rows (see ``AnswerCache.remember_many`` for their fields)."""
+    # Concurrent requests may answer the same question; first writer wins
+    return insert(CachedAnswer).values(entries).on_conflict_do_nothing(index_elements=["cache_key"])
+
+class AnswerCache:
+    """Two-tier per-question answer cache.
+    
+    A bounded in-memory LRU sits in front of the ``answer_cache`` Postgres
+    table. Lookups for a whole request go to Postgres in one ``IN`` query for
+    whatever the LRU missed; hits found there are promoted into the LRU. New
+    answers go into the LRU at once and reach the table write-behind, with the
+    request's query log (``QueryStore.record_many``).
+    """
+    
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or settings.answer_cache_size
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+    
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return cached entries ({"answer", "retrieved_chunks"}) for the keys that hit."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = entry
+        
+        memory_hits = len(found)
+        missing = [key for key in set(keys) if key not in found]
+        if missing:
+            db = SessionLocal()
+            try:
+                rows = db.query(CachedAnswer).filter(CachedAnswer.cache_key.in_(missing)).all()
+                for row in rows:
+                    entry = {"answer": row.answer, "retrieved_chunks": row.retrieved_chunks}
+                    found[row.cache_key] = entry
+                    self._remember(row.cache_key, entry)
+            except Exception as e:
+                # The persistent tier is an optimisation; fall back to recomputing
+                logger.error(f"Error reading answer cache: {str(e)}")
+            finally:
+                db.close()
+        
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.db_hits += len(found) - memory_hits
+            self.misses += len(missing) - (len(found) - memory_hits)
+        return found
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit counters for each tier."""
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                "entries_in_memory": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0
+            }
+    
+    def remember_many(self, entries: List[Dict[str, Any]]):
+        """Put new answers in the in-memory tier.
+        
+        Each entry carries cache_key, document_id, question, model,
+        prompt_version, answer and retrieved_chunks.
+        """
+        for entry in entries:
+            self._remember(entry["cache_key"], {
+                "answer": entry["answer"],
+                "retrieved_chunks": entry["retrieved_chunks"]
+            })
@@ -0,0 +1,51 @@
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import json
+import os
+from app.config.settings import settings
+from app.utils.documents import document_key
+from app.utils.logger import logger
+
+class ChunkManifestStore:
+    """Per-document chunk manifests kept on local disk.
+
+    A manifest lists every chunk (ID, index and text) stored for a document,
+    so checking whether a document was ingested or listing its chunks is a
+    dictionary lookup instead of a vector-store query.
+    """
+
+    def __init__(self, manifest_dir: str = None):
+        self.manifest_dir = Path(manifest_dir or settings.manifest_dir)
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+        self._manifests: Dict[str, List[Dict[str, Any]]] = {}
+
+    def _path(self, document_id: str) -> Path:
+        return self.manifest_dir / f"{document_key(document_id)}.json"
+
+    def get(self, document_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the document's chunks in document order, or None if unknown."""
+        chunks = self._manifests.get(document_id)
+        if chunks is not None:
+            return chunks
+
+        path = self._path(document_id)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                chunks = json.load(f)["chunks"]
+        except Exception as e:
+            logger.error(f"Error reading chunk manifest for {document_id}: {str(e)}")
+            return None
+        self._manifests[document_id] = chunks
+        return chunks
+
+    def put(self, document_id: str, chunks: List[Dict[str, Any]]):
+        """Write (or replace) the manifest for a document."""
+        path = self._path(document_id)
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"document_id": document_id, "chunks": chunks}, f)
+        os.replace(tmp_path, path)
+        self._manifests[document_id] = chunks
+        logger.info(f"Wrote chunk manifest with {len(chunks)} chunks for document: {document_id}")
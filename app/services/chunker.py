@@ -0,0 +1,198 @@
+from typing import Iterable, Iterator, List, Optional, Tuple
+import copy
+import re
+import threading
+from app.config.settings import settings
+
+LINE_RE = re.compile(r"[^\n]*\n?")
+HEADING_RE = re.compile(r"#{1,6}\s+\S")
+# Lines that open a new clause: bullets, "1.", "2)", "2.3", "(a)", "iv)" ... but not "2024 premiums"
+CLAUSE_RE = re.compile(r"(?:[-*•]|\d+(?:\.\d+)+[.)]?|\d+[.)]|\(?[a-zA-Z]{1,4}\)|\([ivxlc]+\))\s+\S")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?;])\s+")
+
+# Units are tokenised in batches to use the fast tokenizer's batch path
+TOKENIZE_BATCH = 128
+
+class TextChunker:
+    """Token-sized, overlapping chunker for the markdown produced by the PDF parsers.
+
+    Text is split into sentences, list items and clauses, which are packed
+    greedily into chunks of at most ``chunk_size`` model tokens. Consecutive
+    chunks of a section share up to ``overlap`` tokens of whole sentences.
+    A markdown heading always starts a new chunk and is repeated at the top
+    of every chunk of its section; a document with nothing but headings is
+    chunked as plain text. Only units longer than a whole chunk are cut
+    mid-sentence, on token boundaries.
+
+    The input is scanned once and chunks are yielded as they are completed.
+    """
+
+    def __init__(self, tokenizer, max_tokens: Optional[int] = None):
+        # A HuggingFace *fast* tokenizer (offset mappings are needed to cut long units). Each call
+        # resets its truncation/padding state, so the chunker keeps its own copy instead of sharing
+        # the encoder's, and concurrent ingestions take turns on it
+        self.tokenizer = copy.deepcopy(tokenizer)
+        self._tokenizer_lock = threading.Lock()
+        # [CLS] and [SEP] take two of the model's positions
+        self.max_tokens = max_tokens - 2 if max_tokens else None
+
+    def iter_chunks(self, text: str, chunk_size: int = None, overlap: int = None) -> Iterator[str]:
+        """Yield chunks of ``text`` in document order."""
+        return self.iter_page_chunks([text], chunk_size=chunk_size, overlap=overlap)
+
+    def iter_page_chunks(self, pages: Iterable[str], chunk_size: int = None,
+                         overlap: int = None) -> Iterator[str]:
+        """Yield chunks of a document given lazily as pages (chunks may span pages)."""
+        budget = chunk_size or settings.chunk_size
+        if self.max_tokens:
+            budget = min(budget, self.max_tokens)
+        overlap = settings.chunk_overlap if overlap is None else overlap
+        overlap = min(overlap, budget // 2)
+
+        bare_headings: List[Tuple[str, int]] = []
+        emitted = False
+        for chunk in self._pack(self._measured_units(pages), budget, overlap, bare_headings):
+            emitted = True
+            yield chunk
+        if not emitted:
+            # Headings only: keep them rather than leave the document without chunks
+            yield from _pack_headings(bare_headings, budget)
+
+    def _pack(self, units: Iterator[Tuple[str, str, str, int, list]], budget: int, overlap: int,
+              bare_headings: List[Tuple[str, int]]) -> Iterator[str]:
+        """Pack measured units into chunks; headings of sections without text go to ``bare_headings``."""
+        heading: Optional[Tuple[str, int]] = None
+        pieces: List[Tuple[str, str, int]] = []  # (separator, text, tokens)
+        tokens = 0
+        fresh = 0  # tokens added since the last emitted chunk
+
+        for kind, separator, unit, n_tokens, offsets in units:
+            if kind == "heading":
+                if fresh:
+                    yield _join(heading, pieces)
+                elif heading:
+                    bare_headings.append(heading)
+                # Overlap never crosses a section boundary; very long headings are not repeated
+                heading = (unit, n_tokens) if n_tokens <= budget // 4 else None
+                pieces, tokens, fresh = [], 0, 0
+                if heading is None:
+                    pieces, tokens, fresh = [("", unit, n_tokens)], n_tokens, n_tokens
+                continue
+
+            available = budget - (heading[1] if heading else 0)
+            if n_tokens > available:
+                if fresh:
+                    yield _join(heading, pieces)
+                for window in _token_windows(unit, offsets, available, overlap):
+                    yield _join(heading, [("", window, 0)])
+                pieces, tokens, fresh = [], 0, 0
+                continue
+
+            if tokens + n_tokens > available:
+                yield _join(heading, pieces)
+                pieces, tokens = _overlap_tail(pieces, overlap, available - n_tokens)
+                fresh = 0
+
+            pieces.append((separator if pieces else "", unit, n_tokens))
+            tokens += n_tokens
+            fresh += n_tokens
+
+        if fresh:
+            yield _join(heading, pieces)
+        elif heading:
+            bare_headings.append(heading)
+
+    def _measured_units(self, pages: Iterable[str]) -> Iterator[Tuple[str, str, str, int, list]]:
+        """Tokenise units in batches: (kind, separator, text, token count, offsets)."""
+        batch = []
+        for unit in _units(pages):
+            batch.append(unit)
+            if len(batch) >= TOKENIZE_BATCH:
+                yield from self._tokenize(batch)
+                batch = []
+        if batch:
+            yield from self._tokenize(batch)
+
+    def _tokenize(self, batch: List[Tuple[str, str, str]]):
+        with self._tokenizer_lock:
+            encoded = self.tokenizer(
+                [unit for _, _, unit in batch],
+                add_special_tokens=False,
+                return_offsets_mapping=True
+            )
+        for (kind, separator, unit), ids, offsets in zip(batch, encoded["input_ids"], encoded["offset_mapping"]):
+            yield kind, separator, unit, len(ids), offsets
+
+def _units(pages: Iterable[str]) -> Iterator[Tuple[str, str, str]]:
+    """Yield (kind, separator, text) units: headings, and sentences of paragraphs and clauses.
+
+    A page break ends the current paragraph, like the blank line pages were joined with.
+    """
+    paragraph: List[str] = []
+
+    def flush():
+        body = " ".join(paragraph)
+        paragraph.clear()
+        for i, sentence in enumerate(SENTENCE_END_RE.split(body)):
+            if sentence:
+                yield "text", "\n\n" if i == 0 else " ", sentence
+
+    for text in pages:
+        for match in LINE_RE.finditer(text):
+            line = match.group().strip()
+            if not line:
+                yield from flush()
+                continue
+
+            heading = HEADING_RE.match(line)
+            if heading:
+                yield from flush()
+                yield "heading", "", line
+            elif CLAUSE_RE.match(line):
+                yield from flush()
+                paragraph.append(line)
+            else:
+                paragraph.append(line)
+
+        yield from flush()
+
+def _overlap_tail(pieces: List[Tuple[str, str, int]], overlap: int,
+                  room: int) -> Tuple[List[Tuple[str, str, int]], int]:
+    """The trailing whole pieces of a chunk that fit in ``overlap`` (and the room left)."""
+    limit = min(overlap, room)
+    tail, tokens = [], 0
+    for piece in reversed(pieces):
+        if tokens + piece[2] > limit:
+            break
+        tail.append(piece)
+        tokens += piece[2]
+    tail.reverse()
+    if tail:
+        tail[0] = ("", tail[0][1], tail[0][2])
+    return tail, tokens
+
+def _token_windows(unit: str, offsets: list, size: int, overlap: int) -> Iterator[str]:
+    """Cut an over-long unit into overlapping windows of ``size`` tokens."""
+    stride = max(size - overlap, 1)
+    for start in range(0, len(offsets), stride):
+        window = offsets[start:start + size]
+        yield unit[window[0][0]:window[-1][1]]
+        if start + size >= len(offsets):
+            break
+
+def _pack_headings(headings: List[Tuple[str, int]], budget: int) -> Iterator[str]:
+    """Pack (heading, tokens) pairs into chunks of at most ``budget`` tokens."""
+    pieces: List[Tuple[str, str, int]] = []
+    tokens = 0
+    for text, n_tokens in headings:
+        if pieces and tokens + n_tokens > budget:
+            yield _join(None, pieces)
+            pieces, tokens = [], 0
+        pieces.append(("\n\n" if pieces else "", text, n_tokens))
+        tokens += n_tokens
+    if pieces:
+        yield _join(None, pieces)
+
+def _join(heading: Optional[Tuple[str, int]], pieces: List[Tuple[str, str, int]]) -> str:
+    body = "".join(separator + text for separator, text, _ in pieces)
+    return f"{heading[0]}\n\n{body}" if heading else body
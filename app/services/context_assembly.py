@@ -0,0 +1,164 @@
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+import hashlib
+import re
+import numpy as np
+from app.services.chunker import HEADING_RE
+from app.services.vector_backends.similarity import normalize
+from app.config.settings import settings
+from app.utils.tokens import count_tokens, truncate_tokens
+from app.utils.logger import logger
+
+WORD_RE = re.compile(r"\w+")
+# Words per shingle when comparing chunks for near-duplicates
+SHINGLE_SIZE = 5
+# Shortest shared text between neighbouring chunks that is treated as overlap
+MIN_OVERLAP_CHARS = 32
+
+def chunk_key(chunk: Dict[str, Any]) -> Tuple:
+    """Identity of a retrieved chunk: its position in the document, or its text."""
+    if chunk.get("chunk_index") is not None:
+        return (chunk.get("document_id"), chunk["chunk_index"])
+    return ("text", hashlib.sha1(chunk["text"].encode("utf-8")).hexdigest())
+
+def document_order(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Chunks sorted by position in their document (unpositioned ones keep their order)."""
+    return sorted(chunks, key=lambda c: (str(c.get("document_id")), c.get("chunk_index") or 0))
+
+def format_context(chunks: List[Dict[str, Any]]) -> str:
+    """Join chunks into prompt context, keeping text shared by neighbouring chunks once.
+
+    Consecutive chunks of a section repeat the section heading and a few
+    overlapping sentences (see TextChunker); when both neighbours are in the
+    context, the repeat is dropped from the second.
+    """
+    parts = []
+    previous = None
+    for chunk in chunks:
+        text = chunk["text"]
+        if previous is not None and _adjacent(previous, chunk):
+            text = _strip_overlap(previous["text"], text)
+        if text:
+            parts.append(text)
+        previous = chunk
+    return "\n\n".join(parts)
+
+class ContextAssembler:
+    """Turns a question's retrieved chunks into the context given to the LLM.
+
+    Candidates (best first, as retrieved) are deduplicated: the same chunk,
+    the same text, or a chunk whose word shingles are mostly contained in a
+    better-scored one (``context_dedup_threshold``) is dropped. Maximal
+    marginal relevance then picks up to ``top_k`` of the rest, trading
+    similarity to the question against similarity to the chunks already
+    picked (``context_mmr_lambda``). Picks are added in MMR order while the
+    formatted context stays within ``context_max_tokens``, and the result is
+    returned in document order.
+
+    Chunk vectors come from ``embed`` (the embedding service), which mostly
+    hits the embedding cache filled at ingestion.
+    """
+
+    def __init__(self, embed: Callable[[List[str]], Awaitable[np.ndarray]], top_k: int = None,
+                 max_tokens: int = None, mmr_lambda: float = None, dedup_threshold: float = None):
+        self.embed = embed
+        self.top_k = top_k or settings.top_k
+        self.max_tokens = max_tokens or settings.context_max_tokens
+        self.mmr_lambda = settings.context_mmr_lambda if mmr_lambda is None else mmr_lambda
+        self.dedup_threshold = settings.context_dedup_threshold if dedup_threshold is None else dedup_threshold
+
+    async def assemble(self, question_embedding: np.ndarray,
+                       chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Select, order and trim ``chunks`` (best first) for one question.
+
+        Returns the selected chunks and the LLM tokens of their formatted context.
+        """
+        candidates = self._deduplicate(chunks)
+        if len(candidates) > self.top_k:
+            vectors = normalize(np.asarray(await self.embed([chunk["text"] for chunk in candidates]), dtype=np.float32))
+            query = normalize(np.asarray(question_embedding, dtype=np.float32)[None, :])[0]
+            ranked = [candidates[i] for i in _mmr(query, vectors, self.top_k, self.mmr_lambda)]
+        else:
+            ranked = candidates
+
+        selected: List[Dict[str, Any]] = []
+        tokens = 0
+        for chunk in ranked:
+            trial = document_order(selected + [chunk])
+            trial_tokens = count_tokens(format_context(trial))
+            if trial_tokens <= self.max_tokens:
+                selected, tokens = trial, trial_tokens
+        if not selected and ranked:
+            # Even the best chunk alone is over budget: keep as much of it as fits
+            selected = [dict(ranked[0], text=truncate_tokens(ranked[0]["text"], self.max_tokens))]
+            tokens = count_tokens(format_context(selected))
+
+        logger.info(
+            f"Context assembly: {len(chunks)} -> {len(selected)} chunks, "
+            f"{count_tokens(format_context(document_order(chunks)))} -> {tokens} tokens"
+        )
+        return selected, tokens
+
+    def _deduplicate(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        kept: List[Dict[str, Any]] = []
+        kept_shingles: List[Set[Tuple[str, ...]]] = []
+        seen = set()
+        for chunk in chunks:
+            normalized = " ".join(WORD_RE.findall(chunk["text"].lower()))
+            keys = {chunk_key(chunk), ("normalized", normalized)}
+            if keys & seen:
+                continue
+            shingles = _shingles(normalized)
+            if any(_containment(shingles, other) >= self.dedup_threshold for other in kept_shingles):
+                continue
+            seen |= keys
+            kept.append(chunk)
+            kept_shingles.append(shingles)
+        return kept
+
+def _mmr(query: np.ndarray, vectors: np.ndarray, k: int, mmr_lambda: float) -> List[int]:
+    """Indices of ``k`` rows chosen by maximal marginal relevance, in pick order."""
+    relevance = vectors @ query
+    remaining = list(range(len(vectors)))
+    picked: List[int] = []
+    while remaining and len(picked) < k:
+        if picked:
+            redundancy = (vectors[remaining] @ vectors[picked].T).max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+        scores = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+        picked.append(remaining.pop(int(np.argmax(scores))))
+    return picked
+
+def _shingles(normalized: str) -> Set[Tuple[str, ...]]:
+    words = normalized.split()
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def _containment(a: Set[Tuple[str, ...]], b: Set[Tuple[str, ...]]) -> float:
+    """Share of the smaller shingle set found in the other."""
+    smaller = min(len(a), len(b))
+    return len(a & b) / smaller if smaller else 0.0
+
+def _adjacent(previous: Dict[str, Any], chunk: Dict[str, Any]) -> bool:
+    return (
+        previous.get("chunk_index") is not None and chunk.get("chunk_index") is not None
+        and previous.get("document_id") == chunk.get("document_id")
+        and chunk["chunk_index"] == previous["chunk_index"] + 1
+    )
+
+def _strip_overlap(previous: str, text: str) -> str:
+    """Remove the repeated heading and the prefix of ``text`` that ends ``previous``."""
+    heading, separator, body = text.partition("\n\n")
+    if separator and HEADING_RE.match(heading) and previous.startswith(heading + separator):
+        text = body
+    probe = text[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return text
+    position = previous.find(probe)
+    while position != -1:
+        if text.startswith(previous[position:]):
+            return text[len(previous) - position:].lstrip()
+        position = previous.find(probe, position + 1)
+    return text
+
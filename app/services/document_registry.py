@@ -0,0 +1,49 @@
+from typing import Dict, Any, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from app.models.database import SessionLocal, DocumentUrl
+from app.utils.documents import normalize_document_url
+from app.utils.logger import logger
+
+class DocumentRegistry:
+    """Maps normalised document URLs to content-addressed document IDs (``document_urls`` table).
+    
+    A document ID is the SHA-256 of the PDF bytes, so the same file reached
+    through different (e.g. freshly signed) URLs is ingested only once. Each
+    entry also keeps the ETag/Last-Modified validators the server sent, so a
+    known URL can be revalidated with a conditional request instead of
+    downloaded again. The map lives in Postgres so every instance, and every
+    restart, shares it.
+    """
+    
+    def lookup(self, document_url: str) -> Optional[Dict[str, Any]]:
+        """Return {"document_id", "etag", "last_modified"} recorded for this URL, if any."""
+        db = SessionLocal()
+        try:
+            row = db.get(DocumentUrl, normalize_document_url(document_url))
+            if row is None:
+                return None
+            return {"document_id": row.document_id, "etag": row.etag, "last_modified": row.last_modified}
+        except Exception as e:
+            # Without the alias the download's content hash still finds the document
+            logger.error(f"Error reading document registry: {str(e)}")
+            return None
+        finally:
+            db.close()
+    
+    def record(self, document_url: str, document_id: str,
+               etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Remember that this URL served the document with the given ID and validators."""
+        values = {"document_id": document_id, "etag": etag, "last_modified": last_modified}
+        db = SessionLocal()
+        try:
+            db.execute(
+                insert(DocumentUrl).values(url=normalize_document_url(document_url), **values)
+                .on_conflict_do_update(index_elements=["url"], set_={**values, "updated_at": func.now()})
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error recording document URL: {str(e)}")
+        finally:
+            db.close()
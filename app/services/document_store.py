@@ -0,0 +1,73 @@
+from typing import List, Dict, Any, Optional
+from sqlalchemy.dialects.postgresql import insert
+from app.models.database import SessionLocal, Document, Chunk
+from app.utils.logger import logger
+
+# Rows per multi-row INSERT when writing a document's chunks
+INSERT_BATCH_SIZE = 1000
+
+class DocumentStore:
+    """Documents and their chunk texts in Postgres (``documents`` and ``chunks`` tables).
+
+    The local chunk manifests stay the fast path; this is the durable copy
+    that survives a lost or fresh local disk, keyed by (document_id,
+    chunk_index) so a document's chunks are one primary-key range scan.
+    """
+
+    def put(self, document_id: str, chunks: List[Dict[str, Any]]):
+        """Record (or replace) a document's chunks ({"text", "chunk_index", "chunk_id"})."""
+        db = SessionLocal()
+        try:
+            db.execute(
+                insert(Document).values(id=document_id, chunk_count=len(chunks))
+                .on_conflict_do_update(index_elements=["id"], set_={"chunk_count": len(chunks)})
+            )
+            rows = [
+                {
+                    "document_id": document_id,
+                    "chunk_index": chunk["chunk_index"],
+                    "chunk_id": chunk.get("chunk_id"),
+                    "text": chunk["text"]
+                }
+                for chunk in chunks
+            ]
+            # Re-ingesting with other chunking settings replaces the old chunks
+            db.query(Chunk).filter(
+                Chunk.document_id == document_id, Chunk.chunk_index >= len(rows)
+            ).delete(synchronize_session=False)
+            for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                statement = insert(Chunk).values(rows[start:start + INSERT_BATCH_SIZE])
+                db.execute(statement.on_conflict_do_update(
+                    index_elements=["document_id", "chunk_index"],
+                    set_={"chunk_id": statement.excluded.chunk_id, "text": statement.excluded.text}
+                ))
+            db.commit()
+            logger.info(f"Stored {len(rows)} chunks in database for document: {document_id}")
+        except Exception as e:
+            # The manifest already has the chunks; the database copy can be rebuilt from it
+            db.rollback()
+            logger.error(f"Error storing chunks for document {document_id}: {str(e)}")
+        finally:
+            db.close()
+
+    def get_chunks(self, document_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the document's chunks in document order, or None if it has none stored."""
+        db = SessionLocal()
+        try:
+            rows = db.query(Chunk).filter(Chunk.document_id == document_id).order_by(Chunk.chunk_index).all()
+            if not rows:
+                return None
+            return [
+                {
+                    "text": row.text,
+                    "document_id": document_id,
+                    "chunk_index": row.chunk_index,
+                    "chunk_id": row.chunk_id
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            logger.error(f"Error reading chunks for document {document_id}: {str(e)}")
+            return None
+        finally:
+            db.close()
@@ -0,0 +1,15 @@
+from app.services.embedding_backends.base import EmbeddingBackend
+
+def create_embedding_backend(name: str) -> EmbeddingBackend:
+    """Instantiate an embedding backend by name.
+    
+    Backends are imported lazily so onnxruntime is only needed when the
+    ONNX backend is configured.
+    """
+    if name == "torch":
+        from app.services.embedding_backends.torch_backend import TorchBackend
+        return TorchBackend()
+    if name == "onnx":
+        from app.services.embedding_backends.onnx_backend import OnnxBackend
+        return OnnxBackend()
+    raise ValueError(f"Unknown embedding backend: {name}")
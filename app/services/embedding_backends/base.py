@@ -0,0 +1,21 @@
+from abc import ABC, abstractmethod
+from typing import List
+import numpy as np
+
+class EmbeddingBackend(ABC):
+    """Turns texts into sentence embeddings for EmbeddingService.
+    
+    Implementations expose the model's HuggingFace ``tokenizer`` and
+    ``max_seq_length`` (used to size chunks), the embedding ``dimension``
+    and a ``name`` that identifies the numerics, used to key the embedding
+    cache so vectors from different backends are never mixed.
+    """
+    
+    name: str
+    dimension: int
+    max_seq_length: int
+    tokenizer = None
+    
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into an (n, dimension) float32 array, in input order."""
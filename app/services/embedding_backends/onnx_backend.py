@@ -0,0 +1,150 @@
+from pathlib import Path
+from typing import Dict, List
+import json
+import os
+import numpy as np
+import onnxruntime as ort
+from transformers import AutoTokenizer
+from app.services.embedding_backends.base import EmbeddingBackend
+from app.config.settings import settings
+from app.utils.logger import logger
+
+class OnnxBackend(EmbeddingBackend):
+    """The same SentenceTransformer model exported to ONNX and run by onnxruntime.
+
+    On first start the transformer is exported from the PyTorch model into
+    ``onnx_model_dir`` (and, with ``onnx_quantize``, a copy with int8
+    dynamically quantised weights is written next to it); later starts load
+    the saved graph directly. Pooling and normalisation are applied in NumPy
+    as in the SentenceTransformer pipeline, so vectors stay compatible with
+    the stored ones (see benchmarks/embedding_benchmark.py for the drift).
+
+    Texts are sorted by token length and batched in that order, so each
+    batch is only padded to the longest of a run of similar-length texts.
+    """
+
+    def __init__(self):
+        model_dir = Path(settings.onnx_model_dir) / settings.embedding_model.strip("/").replace("/", "__")
+        graph_path = model_dir / "model.onnx"
+        config_path = model_dir / "pipeline.json"
+        if not graph_path.exists() or not config_path.exists():
+            _export(settings.embedding_model, model_dir)
+
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.pooling = config["pooling"]
+        self.normalize = config["normalize"]
+        self.dimension = config["dimension"]
+        self.max_seq_length = config["max_seq_length"]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+
+        if settings.onnx_quantize:
+            quantized_path = model_dir / "model.int8.onnx"
+            if not quantized_path.exists():
+                _quantize(graph_path, quantized_path)
+            graph_path = quantized_path
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = settings.onnx_intra_op_threads  # 0 = one per core
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(graph_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+        self.name = f"{settings.embedding_model}:onnx{'-int8' if settings.onnx_quantize else ''}"
+        logger.info(f"ONNX embedding graph loaded from {graph_path}")
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(texts, truncation=True, max_length=self.max_seq_length)
+        lengths = np.array([len(ids) for ids in encoded["input_ids"]], dtype=np.int64)
+        order = np.argsort(lengths, kind="stable")
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+
+        batch_size = settings.embedding_batch_size
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            feeds = self._pad(encoded, rows, int(lengths[rows].max()))
+            hidden = self.session.run(None, feeds)[0]
+            embeddings[rows] = self._pool(hidden, feeds["attention_mask"])
+        return embeddings
+
+    def _pad(self, encoded, rows: np.ndarray, width: int) -> Dict[str, np.ndarray]:
+        """Right-pad one length bucket to its longest sequence."""
+        feeds = {}
+        for name in self.input_names:
+            pad_value = self.tokenizer.pad_token_id if name == "input_ids" else 0
+            array = np.full((len(rows), width), pad_value, dtype=np.int64)
+            for i, row in enumerate(rows):
+                if name in encoded:
+                    values = encoded[name][row]
+                else:
+                    values = [1 if name == "attention_mask" else 0] * len(encoded["input_ids"][row])
+                array[i, :len(values)] = values
+            feeds[name] = array
+        return feeds
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.normalize:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled
+
+def _export(model_name: str, model_dir: Path):
+    """Export the SentenceTransformer's transformer to ONNX with its tokenizer and pooling config."""
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+
+    logger.info(f"Exporting {model_name} to ONNX in {model_dir}")
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    pooling = next((module for module in model if isinstance(module, models.Pooling)), None)
+    if pooling is not None and not (pooling.pooling_mode_mean_tokens or pooling.pooling_mode_cls_token):
+        raise ValueError(f"Unsupported pooling mode for ONNX export: {pooling.get_pooling_mode_str()}")
+
+    sample = model.tokenizer(["An example sentence to trace the graph."], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return self.transformer(**dict(zip(input_names, inputs))).last_hidden_state
+
+    model_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = model_dir / "model.tmp.onnx"
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(),
+            tuple(sample[name] for name in input_names),
+            str(tmp_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+
+    model.tokenizer.save_pretrained(str(model_dir))
+    with open(model_dir / "pipeline.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "pooling": "cls" if pooling is not None and pooling.pooling_mode_cls_token else "mean",
+            "normalize": any(isinstance(module, models.Normalize) for module in model),
+            "dimension": model.get_sentence_embedding_dimension(),
+            "max_seq_length": model.max_seq_length
+        }, f)
+    os.replace(tmp_path, model_dir / "model.onnx")
+
+def _quantize(graph_path: Path, quantized_path: Path):
+    """Write a copy of the graph with int8 weights (activations are quantised at run time)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    logger.info(f"Quantizing {graph_path.name} to int8")
+    tmp_path = quantized_path.with_name("model.int8.tmp.onnx")
+    quantize_dynamic(str(graph_path), str(tmp_path), weight_type=QuantType.QInt8)
+    os.replace(tmp_path, quantized_path)
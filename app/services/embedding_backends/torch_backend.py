@@ -0,0 +1,23 @@
+from typing import List
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from app.services.embedding_backends.base import EmbeddingBackend
+from app.config.settings import settings
+
+class TorchBackend(EmbeddingBackend):
+    """The SentenceTransformer model run through PyTorch."""
+    
+    def __init__(self):
+        self.model = SentenceTransformer(settings.embedding_model)
+        self.name = settings.embedding_model
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.max_seq_length = self.model.max_seq_length
+        self.tokenizer = self.model.tokenizer
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.model.encode(
+            texts,
+            batch_size=settings.embedding_batch_size,
+            show_progress_bar=len(texts) > 32
+        )
+        return np.asarray(embeddings, dtype=np.float32)
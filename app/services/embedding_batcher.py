@@ -0,0 +1,124 @@
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Set
+import asyncio
+import time
+import numpy as np
+from app.config.settings import settings
+from app.utils.logger import logger
+
+# Upper edges of the batch-size histogram
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+class EmbeddingBatcher:
+    """Coalesces embedding requests from concurrent callers into shared encode calls.
+
+    Each text is queued with a future. A collector task takes the first
+    waiting text, keeps collecting for up to ``max_wait_ms`` or until
+    ``max_batch_size`` texts are gathered, then runs one encode call on the
+    embedding executor and resolves every caller's future with its own row.
+    At most ``embedding_workers`` batches run at once; texts arriving while
+    they are busy simply make the next batch larger.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], executor: Executor,
+                 max_batch_size: int = None, max_wait_ms: float = None):
+        self.encode = encode
+        self.executor = executor
+        self.max_batch_size = max_batch_size or settings.embedding_batch_max_size
+        self.max_wait_ms = settings.embedding_batch_max_wait_ms if max_wait_ms is None else max_wait_ms
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.total_wait_ms = 0.0
+        self.max_observed_wait_ms = 0.0
+        self._histogram = [0] * len(BATCH_SIZE_BUCKETS)
+
+    async def embed_many(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed texts, batched together with whatever other callers are waiting."""
+        if not texts:
+            return []
+        self._ensure_collector()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait((text, future, time.perf_counter()))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    def _ensure_collector(self):
+        if self._collector is not None and not self._collector.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(settings.embedding_workers)
+        self._collector = asyncio.create_task(self._collect())
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: List[tuple]):
+        try:
+            dispatched = time.perf_counter()
+            self._record(len(batch), [(dispatched - enqueued) * 1000 for _, _, enqueued in batch])
+
+            loop = asyncio.get_running_loop()
+            vectors = await loop.run_in_executor(self.executor, self.encode, [text for text, _, _ in batch])
+            for (_, future, _), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+        except Exception as e:
+            logger.error(f"Error embedding batch of {len(batch)} texts: {str(e)}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def _record(self, size: int, waits_ms: List[float]):
+        self.batches += 1
+        self.items += size
+        self.largest_batch = max(self.largest_batch, size)
+        self.total_wait_ms += sum(waits_ms)
+        self.max_observed_wait_ms = max(self.max_observed_wait_ms, max(waits_ms))
+        for i, upper in enumerate(BATCH_SIZE_BUCKETS):
+            if size <= upper or i == len(BATCH_SIZE_BUCKETS) - 1:
+                self._histogram[i] += 1
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch sizes formed so far and how long texts waited to be batched."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self.batches,
+            "texts": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "mean_wait_ms": self.total_wait_ms / self.items if self.items else 0.0,
+            "max_wait_observed_ms": self.max_observed_wait_ms,
+            "batch_size_histogram": {
+                f"<={upper}": count for upper, count in zip(BATCH_SIZE_BUCKETS, self._histogram)
+            }
+        }
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+from app.config.settings import settings
+from app.utils.logger import logger
+
+class EmbeddingCache:
+    """Two-tier cache of embeddings keyed by (model name, SHA-256 of text).
+
+    The memory tier is an LRU bounded by the bytes of the vectors it holds.
+    The disk tier is a SQLite table of raw blobs, read back with
+    ``np.frombuffer`` so cached texts never go through the model again.
+    Vectors are kept as ``embedding_cache_dtype`` (float32, or float16 for
+    half the memory and disk); callers upcast when they need float32.
+    """
+
+    def __init__(self, model_name: str, cache_path: str = None, max_memory_bytes: int = None,
+                 dtype: str = None):
+        self.dtype = np.dtype(dtype or settings.embedding_cache_dtype)
+        if self.dtype not in (np.float32, np.float16):
+            raise ValueError(f"Unsupported embedding cache dtype: {self.dtype}")
+        # Blobs of different dtypes must never be read back as each other
+        self.model_name = model_name if self.dtype == np.float32 else f"{model_name}:{self.dtype.name}"
+        self.max_memory_bytes = max_memory_bytes or settings.embedding_cache_memory_bytes
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        path = Path(cache_path or settings.embedding_cache_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Encoding runs on executor threads, so share one connection under the lock
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash BLOB NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _hash(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached vector for each text, or None where it is not cached."""
+        hashes = [self._hash(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        disk_lookups = {}
+
+        with self._lock:
+            for i, text_hash in enumerate(hashes):
+                vector = self._memory.get(text_hash)
+                if vector is not None:
+                    self._memory.move_to_end(text_hash)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    disk_lookups.setdefault(text_hash, []).append(i)
+
+            if disk_lookups:
+                for text_hash, vector in self._read_disk(list(disk_lookups)):
+                    self._remember(text_hash, vector)
+                    for i in disk_lookups.pop(text_hash):
+                        results[i] = vector
+                        self.disk_hits += 1
+                self.misses += sum(len(positions) for positions in disk_lookups.values())
+
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[np.ndarray]):
+        """Add freshly computed vectors to both tiers."""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                text_hash = self._hash(text)
+                # Copy, so a cached row never keeps its whole source batch alive
+                vector = np.array(vector, dtype=self.dtype)
+                self._remember(text_hash, vector)
+                rows.append((self.model_name, text_hash, vector.tobytes()))
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)", rows
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error writing embedding cache: {str(e)}")
+
+    def _read_disk(self, hashes: List[bytes]) -> List[Tuple[bytes, np.ndarray]]:
+        found = []
+        try:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                cursor = self._db.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model_name, *batch]
+                )
+                found.extend(
+                    (bytes(text_hash), np.frombuffer(blob, dtype=self.dtype))
+                    for text_hash, blob in cursor.fetchall()
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error reading embedding cache: {str(e)}")
+        return found
+
+    def _remember(self, text_hash: bytes, vector: np.ndarray):
+        """Insert into the memory tier, evicting least-recently-used vectors over budget."""
+        previous = self._memory.pop(text_hash, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+        self._memory[text_hash] = vector
+        self._memory_bytes += vector.nbytes
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        """Size of the memory tier and hit counters per tier."""
+        with self._lock:
+            return {
+                "memory_bytes": self._memory_bytes,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses
+            }
@@ -1,17 +1,22 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List
 import numpy as np
+import asyncio
 import time
+from app.services.chunker import TextChunker
+from app.services.embedding_backends import create_embedding_backend
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
 from app.config.settings import settings
 from app.utils.logger import logger
 
 class EmbeddingService:
     def __init__(self):
-        logger.info(f"Loading embedding model: {settings.embedding_model}")
+        logger.info(f"Loading embedding model: {settings.embedding_model} ({settings.embedding_backend} backend)")
         try:
             start_time = time.time()
-            self.model = SentenceTransformer(settings.embedding_model)
-            self.embedding_dim = self.model.get_sentence_embedding_dimension()
+            self.backend = create_embedding_backend(settings.embedding_backend)
+            self.embedding_dim = self.backend.dimension
             load_time = time.time() - start_time
             logger.info(f"Model loaded successfully in {load_time:.2f} seconds")
             logger.info(f"Embedding dimension: {self.embedding_dim}")
@@ -19,55 +24,90 @@ class EmbeddingService:
             logger.error(f"Failed to load embedding model: {str(e)}")
             logger.error("This might be due to network issues or insufficient memory")
             raise
+        
+        if self.embedding_dim != settings.embedding_dimension:
+            raise ValueError(
+                f"Embedding model produces {self.embedding_dim}-dimensional vectors "
+                f"but EMBEDDING_DIMENSION is {settings.embedding_dimension}"
+            )
+        
+        # Chunks are sized in the model's own tokens so none are truncated on encode
+        self.chunker = TextChunker(self.backend.tokenizer, max_tokens=self.backend.max_seq_length)
+        # Keyed by backend name too: ONNX/int8 vectors differ slightly from PyTorch ones
+        self.cache = EmbeddingCache(self.backend.name) if settings.embedding_cache_enabled else None
+        
+        # Encoding is CPU-bound, so async callers run it on a dedicated executor
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.embedding_workers,
+            thread_name_prefix="embedding"
+        )
+        # Query texts from concurrent requests are coalesced into shared encode calls
+        self.query_batcher = EmbeddingBatcher(self._encode, self._executor)
     
-    def embed_text(self, text: str) -> List[float]:
-        """Generate embedding for a single text."""
-        try:
-            embedding = self.model.encode(text)
-            return embedding.tolist()
-        except Exception as e:
-            logger.error(f"Error generating embedding: {str(e)}")
-            raise
-    
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts."""
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for multiple texts as one (n, dim) float32 array."""
         logger.info(f"Starting batch embedding generation for {len(texts)} texts")
         try:
             if not texts:
                 raise ValueError("Empty text list provided")
             
             start_time = time.time()
-            embeddings = self.model.encode(texts, show_progress_bar=True)
+            embeddings = self._encode(texts)
             process_time = time.time() - start_time
             
             logger.info(f"Generated {len(embeddings)} embeddings in {process_time:.2f} seconds")
-            return embeddings.tolist()
+            return embeddings
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {str(e)}")
             logger.error(f"Input texts count: {len(texts)}")
             logger.error(f"First few texts: {texts[:2] if texts else 'None'}")
             raise
     
-    def chunk_text(self, text: str, chunk_size: int = None, overlap: int = None) -> List[str]:
-        """Split text into chunks."""
-        chunk_size = chunk_size or settings.chunk_size
-        overlap = overlap or settings.chunk_overlap
-        
-        # Simple sentence-based chunking
-        sentences = text.split('. ')
-        chunks = []
-        current_chunk = ""
-        
-        for sentence in sentences:
-            if len(current_chunk) + len(sentence) < chunk_size:
-                current_chunk += sentence + ". "
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence + ". "
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts as an (n, dim) float32 array, through the cache when enabled."""
+        if self.cache is None:
+            return self.backend.encode(texts)
+        return self._embed_batch_cached(texts)
+    
+    def _embed_batch_cached(self, texts: List[str]) -> np.ndarray:
+        """Encode only cache misses (each distinct text once) and merge in input order."""
+        cached = self.cache.get_many(texts)
         
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        missing_texts = list(dict.fromkeys(
+            text for text, vector in zip(texts, cached) if vector is None
+        ))
+        if missing_texts:
+            encoded = self.backend.encode(missing_texts)
+            self.cache.put_many(missing_texts, encoded)
+            fresh = dict(zip(missing_texts, encoded))
+            cached = [vector if vector is not None else fresh[text] for text, vector in zip(texts, cached)]
         
+        logger.info(f"Embedding cache: {len(texts) - len(missing_texts)}/{len(texts)} texts reused")
+        # Rows from the cache may be float16; the output is always float32
+        output = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        for i, vector in enumerate(cached):
+            output[i] = vector
+        return output
+    
+    async def aembed_queries(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed query texts, sharing encode calls with other in-flight requests."""
+        return await self.query_batcher.embed_many(texts)
+    
+    async def aembed_batch(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for multiple texts without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.embed_batch, texts)
+    
+    def iter_chunks(self, text: str, chunk_size: int = None, overlap: int = None) -> Iterator[str]:
+        """Lazily split text into token-sized, overlapping chunks."""
+        return self.chunker.iter_chunks(text, chunk_size=chunk_size, overlap=overlap)
+    
+    def iter_page_chunks(self, pages: Iterable[str]) -> Iterator[str]:
+        """Lazily chunk a document supplied page by page."""
+        return self.chunker.iter_page_chunks(pages)
+    
+    def chunk_text(self, text: str, chunk_size: int = None, overlap: int = None) -> List[str]:
+        """Split text into chunks."""
+        chunks = list(self.iter_chunks(text, chunk_size=chunk_size, overlap=overlap))
         logger.info(f"Text split into {len(chunks)} chunks")
-        return chunks
\ No newline at end of file
+        return chunks
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import time
+import uuid
+from app.config.settings import settings
+from app.utils.documents import normalize_document_url
+from app.utils.logger import logger
+
+@dataclass
+class IngestionJob:
+    """Status of one background ingestion of a document URL."""
+    job_id: str
+    document_url: str
+    status: str = "queued"  # queued, running, succeeded or failed
+    document_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "document_url": self.document_url,
+            "status": self.status,
+            "document_id": self.document_id,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "seconds": round((self.finished_at or time.time()) - (self.started_at or self.created_at), 3)
+        }
+
+class IngestionJobs:
+    """Bounded pool of background workers that ingest documents ahead of questions.
+
+    ``submit`` queues a URL (at most ``ingestion_job_queue_size`` waiting) and
+    returns its job; ``ingestion_workers`` tasks run ``ensure_document`` on
+    queued jobs, which downloads, parses, embeds and stores the document unless
+    it is already known. A URL submitted again while its job is still queued or
+    running gets the same job back. The latest ``ingestion_job_history`` jobs
+    are kept for polling.
+    """
+
+    def __init__(self, ensure_document: Callable[[str], Awaitable[str]]):
+        self.ensure_document = ensure_document
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._active: Dict[str, str] = {}  # normalised URL -> job ID
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def submit(self, document_url: str) -> IngestionJob:
+        """Queue a document for ingestion; raises asyncio.QueueFull when the queue is full."""
+        url_key = normalize_document_url(document_url)
+        active = self._active.get(url_key)
+        if active is not None:
+            return self._jobs[active]
+
+        self._ensure_workers()
+        job = IngestionJob(job_id=uuid.uuid4().hex, document_url=document_url)
+        self._queue.put_nowait(job)
+        self._jobs[job.job_id] = job
+        self._active[url_key] = job.job_id
+        self._trim_history()
+        logger.info(f"Queued ingestion job {job.job_id} for document: {document_url}")
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=settings.ingestion_job_queue_size)
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < settings.ingestion_workers:
+            self._workers.append(asyncio.create_task(self._work()))
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.document_id = await self.ensure_document(job.document_url)
+                job.status = "succeeded"
+                logger.info(f"Ingestion job {job.job_id} finished in {time.time() - job.started_at:.2f} seconds")
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                logger.error(f"Ingestion job {job.job_id} failed: {str(e)}")
+            finally:
+                job.finished_at = time.time()
+                self._active.pop(normalize_document_url(job.document_url), None)
+                self._queue.task_done()
+
+    def _trim_history(self):
+        """Forget the oldest finished jobs beyond the history limit."""
+        excess = len(self._jobs) - settings.ingestion_job_history
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Jobs by status and the current queue depth."""
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": settings.ingestion_workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queued": settings.ingestion_job_queue_size,
+            "jobs": counts
+        }
+
+    async def aclose(self):
+        """Stop the workers (jobs still queued are abandoned)."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
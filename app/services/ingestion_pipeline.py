@@ -0,0 +1,238 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+import asyncio
+import threading
+import time
+import numpy as np
+from app.services.pdf_parser import PDFParser
+from app.services.embedding_service import EmbeddingService
+from app.services.vector_store import VectorStore, DocumentWriter
+from app.config.settings import settings
+from app.utils.logger import logger
+
+STAGES = ("parse", "chunk", "embed", "upsert")
+
+# How often a worker thread blocked on a queue checks whether the pipeline aborted
+QUEUE_POLL_SECONDS = 0.5
+
+@dataclass
+class StageStats:
+    items: int = 0
+    batches: int = 0
+    # Time spent working, excluding time blocked on the neighbouring queues
+    busy_seconds: float = 0.0
+
+    def merge(self, other: "StageStats"):
+        self.items += other.items
+        self.batches += other.batches
+        self.busy_seconds += other.busy_seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / self.busy_seconds, 1) if self.busy_seconds else None
+        }
+
+class IngestionPipeline:
+    """Streams a PDF through parse -> chunk -> embed -> upsert.
+
+    The stages run concurrently and hand work on through bounded queues:
+    pages go to the chunker (on a worker thread, since chunking is CPU-bound),
+    batches of ``ingest_batch_size`` chunks go to the embedder, and embedded
+    batches are upserted while the next batch is being encoded. The queues
+    hold at most ``ingest_queue_size`` items, so a slow stage throttles the
+    ones before it instead of letting work pile up in memory.
+    """
+
+    def __init__(self, pdf_parser: PDFParser, embedding_service: EmbeddingService,
+                 vector_store: VectorStore):
+        self.pdf_parser = pdf_parser
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+
+        self.documents = 0
+        self.totals = {name: StageStats() for name in STAGES}
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    async def ingest(self, pdf_path: str, document_id: str) -> List[str]:
+        """Ingest a downloaded PDF and return the stored chunk IDs."""
+        loop = asyncio.get_running_loop()
+        run = {name: StageStats() for name in STAGES}
+        pages: asyncio.Queue = asyncio.Queue(maxsize=settings.ingest_queue_size)
+        batches: asyncio.Queue = asyncio.Queue(maxsize=settings.ingest_queue_size)
+        embedded: asyncio.Queue = asyncio.Queue(maxsize=settings.ingest_queue_size)
+        aborted = threading.Event()
+        writer = self.vector_store.open_writer(document_id)
+
+        start_time = time.perf_counter()
+        tasks = [
+            asyncio.create_task(self._parse_stage(pdf_path, pages, run["parse"])),
+            asyncio.create_task(asyncio.to_thread(
+                self._chunk_stage, loop, pages, batches, aborted, run["chunk"]
+            )),
+            asyncio.create_task(self._embed_stage(batches, embedded, run["embed"])),
+            asyncio.create_task(self._upsert_stage(embedded, writer, run["upsert"]))
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the other stages; the chunk thread notices on its next queue poll
+            aborted.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        if not writer.chunks:
+            raise ValueError("No text could be extracted from the document")
+        summary = await writer.commit()
+        chunk_ids = summary.chunk_ids
+        elapsed = time.perf_counter() - start_time
+
+        self.documents += 1
+        for name in STAGES:
+            self.totals[name].merge(run[name])
+        self.last_run = {
+            "document_id": document_id,
+            "pages": run["parse"].items,
+            "chunks": len(chunk_ids),
+            "seconds": round(elapsed, 3),
+            "stages": {name: stats.as_dict() for name, stats in run.items()},
+            "writes": summary.as_dict()
+        }
+        logger.info(
+            f"Ingested {run['parse'].items} pages as {len(chunk_ids)} chunks in {elapsed:.2f}s "
+            f"(busy: " + ", ".join(f"{name} {run[name].busy_seconds:.2f}s" for name in STAGES) + ")"
+        )
+        return chunk_ids
+
+    async def _parse_stage(self, pdf_path: str, pages: asyncio.Queue, stats: StageStats):
+        start = time.perf_counter()
+        async for page in self.pdf_parser.iter_pdf_pages(pdf_path):
+            stats.busy_seconds += time.perf_counter() - start
+            stats.items += 1
+            await pages.put(page)
+            start = time.perf_counter()
+        stats.batches = 1
+        await pages.put(None)
+
+    def _chunk_stage(self, loop: asyncio.AbstractEventLoop, pages: asyncio.Queue,
+                     batches: asyncio.Queue, aborted: threading.Event, stats: StageStats):
+        """Worker-thread stage: chunk pages as they arrive and emit fixed-size batches."""
+        waited = [0.0]
+
+        def wait_for(make_coro):
+            started = time.perf_counter()
+            try:
+                return _run_on_loop(loop, make_coro, aborted)
+            finally:
+                waited[0] += time.perf_counter() - started
+
+        def incoming_pages() -> Iterator[str]:
+            while True:
+                page = wait_for(pages.get)
+                if page is None:
+                    return
+                yield page
+
+        def emit(batch: List[str]):
+            stats.items += len(batch)
+            stats.batches += 1
+            wait_for(lambda: batches.put(batch))
+
+        start = time.perf_counter()
+        batch: List[str] = []
+        for chunk in self.embedding_service.iter_page_chunks(incoming_pages()):
+            batch.append(chunk)
+            if len(batch) >= settings.ingest_batch_size:
+                emit(batch)
+                batch = []
+        if batch:
+            emit(batch)
+        stats.busy_seconds = time.perf_counter() - start - waited[0]
+        wait_for(lambda: batches.put(None))
+
+    async def _embed_stage(self, batches: asyncio.Queue, embedded: asyncio.Queue, stats: StageStats):
+        while True:
+            batch = await batches.get()
+            if batch is None:
+                break
+            start = time.perf_counter()
+            embeddings = await self.embedding_service.aembed_batch(batch)
+            stats.busy_seconds += time.perf_counter() - start
+            stats.items += len(batch)
+            stats.batches += 1
+            await embedded.put((batch, embeddings))
+        await embedded.put(None)
+
+    async def _upsert_stage(self, embedded: asyncio.Queue, writer: DocumentWriter, stats: StageStats):
+        """Upsert batches as they arrive, up to ``upsert_concurrency`` at a time."""
+        slots = asyncio.Semaphore(settings.upsert_concurrency)
+        in_flight = set()
+        errors = []
+        active = 0
+        active_since = 0.0
+
+        async def upsert(chunks: List[str], embeddings: np.ndarray):
+            nonlocal active, active_since
+            if active == 0:
+                active_since = time.perf_counter()
+            active += 1
+            try:
+                await writer.add(chunks, embeddings)
+                stats.items += len(chunks)
+                stats.batches += 1
+            except Exception as e:
+                errors.append(e)
+                raise
+            finally:
+                active -= 1
+                if active == 0:
+                    # Busy time is wall time with at least one upsert in flight
+                    stats.busy_seconds += time.perf_counter() - active_since
+                slots.release()
+
+        def finished(task: asyncio.Task):
+            in_flight.discard(task)
+            if not task.cancelled():
+                # Failures are re-raised from ``errors``; retrieve them so none goes unobserved
+                task.exception()
+
+        try:
+            while True:
+                item = await embedded.get()
+                # Stop taking work once a batch has failed even after retries
+                if item is None or errors:
+                    break
+                await slots.acquire()
+                task = asyncio.create_task(upsert(*item))
+                in_flight.add(task)
+                task.add_done_callback(finished)
+            await asyncio.gather(*in_flight)
+            if errors:
+                raise errors[0]
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage throughput totals and the breakdown of the last ingestion."""
+        return {
+            "documents": self.documents,
+            "stages": {name: stats.as_dict() for name, stats in self.totals.items()},
+            "last_document": self.last_run
+        }
+
+def _run_on_loop(loop: asyncio.AbstractEventLoop, make_coro, aborted: threading.Event):
+    """Block a worker thread on an event-loop queue operation until done or aborted."""
+    while not aborted.is_set():
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(make_coro(), QUEUE_POLL_SECONDS), loop
+        )
+        try:
+            return future.result()
+        except asyncio.TimeoutError:
+            continue
+    raise RuntimeError("Ingestion pipeline aborted")
@@ -0,0 +1,154 @@
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import re
+import numpy as np
+from app.services.context_assembly import chunk_key
+from app.services.vector_backends.similarity import top_k_indices
+from app.config.settings import settings
+from app.utils.documents import document_key
+from app.utils.logger import logger
+
+# Clause numbers ("4.2", "3.1.7") stay one token; everything else splits on non-word characters
+TOKEN_RE = re.compile(r"\d+(?:\.\d+)+|\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be been by can do does for from has have how i if in is it its of on or "
+    "that the their there this to under was what when where which who why will with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms of ``text`` for BM25, without stopwords."""
+    return [term for term in TOKEN_RE.findall(text.lower()) if term not in STOPWORDS]
+
+class BM25Index:
+    """Okapi BM25 over one document's chunks, as a term -> postings inverted index.
+
+    Postings are stored term by term in flat arrays, each with its precomputed
+    BM25 weight (idf times the saturated, length-normalised term frequency),
+    so scoring a query is one vectorised add per query term.
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], offsets: np.ndarray, rows: np.ndarray,
+                 weights: np.ndarray, size: int):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.rows = rows
+        self.weights = weights
+        self.size = size
+
+    @classmethod
+    def build(cls, texts: List[str], k1: float = None, b: float = None) -> "BM25Index":
+        """Index texts (chunk rows in document order)."""
+        k1 = settings.bm25_k1 if k1 is None else k1
+        b = settings.bm25_b if b is None else b
+
+        vocabulary: Dict[str, int] = {}
+        term_ids, rows, counts = [], [], []
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            frequencies = Counter(tokenize(text))
+            lengths[row] = sum(frequencies.values())
+            for term, count in frequencies.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                counts.append(count)
+
+        term_ids = np.array(term_ids, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        term_ids = term_ids[order]
+        rows = np.array(rows, dtype=np.int32)[order]
+        counts = np.array(counts, dtype=np.float32)[order]
+
+        document_frequency = np.bincount(term_ids, minlength=len(vocabulary))
+        offsets = np.concatenate([[0], np.cumsum(document_frequency)]).astype(np.int64)
+        idf = np.log1p((len(texts) - document_frequency + 0.5) / (document_frequency + 0.5))
+        average_length = max(float(lengths.mean()), 1.0) if len(texts) else 1.0
+        length_norm = k1 * (1 - b + b * lengths / average_length)
+        weights = (idf[term_ids] * counts * (k1 + 1) / (counts + length_norm[rows])).astype(np.float32)
+        return cls(vocabulary, offsets, rows, weights, len(texts))
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, rows) of the k best-matching chunks, best first; rows with no query term are left out."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            scores[self.rows[start:end]] += self.weights[start:end]
+        matched = np.flatnonzero(scores)
+        order = matched[top_k_indices(scores[matched], k)] if len(matched) else matched
+        return scores[order], order
+
+    def save(self, path: Path):
+        """Persist the index to a single .npz file (written atomically)."""
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                terms=np.array(terms, dtype=np.str_),
+                offsets=self.offsets,
+                rows=self.rows,
+                weights=self.weights,
+                size=np.array([self.size], dtype=np.int64)
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        """Load an index previously written by ``save``."""
+        with np.load(path) as data:
+            vocabulary = {str(term): i for i, term in enumerate(data["terms"])}
+            return cls(vocabulary, data["offsets"], data["rows"], data["weights"], int(data["size"][0]))
+
+class LexicalIndexStore:
+    """Per-document BM25 indexes kept on local disk, like the chunk manifests."""
+
+    def __init__(self, index_dir: str = None):
+        self.index_dir = Path(index_dir or settings.lexical_index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._indexes: Dict[str, BM25Index] = {}
+
+    def _path(self, document_id: str) -> Path:
+        return self.index_dir / f"{document_key(document_id)}.npz"
+
+    def get(self, document_id: str) -> Optional[BM25Index]:
+        """Return the document's index, or None if it has none."""
+        index = self._indexes.get(document_id)
+        if index is not None:
+            return index
+
+        path = self._path(document_id)
+        if not path.exists():
+            return None
+        try:
+            index = BM25Index.load(path)
+        except Exception as e:
+            logger.error(f"Error reading lexical index for {document_id}: {str(e)}")
+            return None
+        self._indexes[document_id] = index
+        return index
+
+    def put(self, document_id: str, texts: List[str]) -> BM25Index:
+        """Build, write (or replace) and return the index for a document's chunk texts."""
+        index = BM25Index.build(texts)
+        index.save(self._path(document_id))
+        self._indexes[document_id] = index
+        logger.info(f"Wrote lexical index with {len(index.vocabulary)} terms for document: {document_id}")
+        return index
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], top_k: int,
+                           k: int = None) -> List[Dict[str, Any]]:
+    """Fuse ranked chunk lists: each chunk scores the sum of 1 / (k + rank) over the lists."""
+    k = settings.rrf_k if k is None else k
+    fused: Dict[Tuple, float] = {}
+    chunks: Dict[Tuple, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, chunk in enumerate(results, start=1):
+            key = chunk_key(chunk)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+            chunks.setdefault(key, chunk)
+    best = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [dict(chunks[key], score=fused[key]) for key in best]
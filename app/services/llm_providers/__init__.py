@@ -0,0 +1,17 @@
+from app.services.llm_providers.base import Completion, LLMProvider, ProviderError
+
+__all__ = ["Completion", "LLMProvider", "ProviderError", "create_llm_provider"]
+
+def create_llm_provider(name: str) -> LLMProvider:
+    """Instantiate an LLM provider by name.
+    
+    Providers are imported lazily so the Groq SDK is only needed when Groq
+    is configured.
+    """
+    if name == "groq":
+        from app.services.llm_providers.groq_provider import GroqProvider
+        return GroqProvider()
+    if name == "mock":
+        from app.services.llm_providers.mock_provider import MockProvider
+        return MockProvider()
+    raise ValueError(f"Unknown LLM provider: {name}")
@@ -0,0 +1,42 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional
+
+@dataclass
+class Completion:
+    """Text of a chat completion and the tokens it used."""
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+class ProviderError(Exception):
+    """A failed provider call; ``retryable`` for rate limits, timeouts and 5xx."""
+    
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+class LLMProvider(ABC):
+    """Chat-completion API behind LLMService's scheduler.
+    
+    Implementations raise ProviderError for failed calls so the scheduler can
+    tell retryable errors apart. ``model`` names the model answering, and is
+    part of the answer-cache key.
+    """
+    
+    name: str
+    model: str
+    
+    @abstractmethod
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int,
+                       temperature: float, json_mode: bool = False) -> Completion:
+        """Return one completion for ``messages``."""
+    
+    @abstractmethod
+    def stream(self, messages: List[Dict[str, str]], max_tokens: int,
+               temperature: float) -> AsyncIterator[str]:
+        """Yield the completion's text deltas as they are generated."""
+    
+    async def aclose(self):
+        """Release pooled connections."""
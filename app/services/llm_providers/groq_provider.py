@@ -0,0 +1,88 @@
+from typing import AsyncIterator, Dict, List, Optional
+import httpx
+import groq
+from groq import AsyncGroq
+from app.services.llm_providers.base import Completion, LLMProvider, ProviderError
+from app.config.settings import settings
+
+class GroqProvider(LLMProvider):
+    """Groq's async client sharing one pool of keep-alive connections.
+    
+    The SDK's own retries are disabled; LLMScheduler retries instead, so
+    retries also respect the rate-limit budgets.
+    """
+    
+    name = "groq"
+    
+    def __init__(self):
+        if not settings.groq_api_key:
+            raise ValueError("No Groq API key found")
+        self.model = settings.llm_model
+        self._http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.llm_timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_connections
+            )
+        )
+        self.client = AsyncGroq(
+            api_key=settings.groq_api_key,
+            http_client=self._http_client,
+            timeout=settings.llm_timeout,
+            max_retries=0
+        )
+    
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int,
+                       temperature: float, json_mode: bool = False) -> Completion:
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **kwargs
+            )
+        except groq.APIError as e:
+            raise _provider_error(e) from e
+        usage = response.usage
+        return Completion(
+            text=response.choices[0].message.content or "",
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0
+        )
+    
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int,
+                     temperature: float) -> AsyncIterator[str]:
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            )
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        except groq.APIError as e:
+            raise _provider_error(e) from e
+    
+    async def aclose(self):
+        await self._http_client.aclose()
+
+def _provider_error(e: Exception) -> ProviderError:
+    """Classify a Groq SDK error; 429s carry the server's Retry-After when given."""
+    if isinstance(e, (groq.APITimeoutError, groq.APIConnectionError)):
+        return ProviderError(str(e), retryable=True)
+    status_code = getattr(e, "status_code", None)
+    retry_after: Optional[float] = None
+    response = getattr(e, "response", None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+    retryable = status_code == 429 or (status_code is not None and status_code >= 500)
+    return ProviderError(str(e), retryable=retryable, retry_after=retry_after)
@@ -0,0 +1,64 @@
+from typing import AsyncIterator, Dict, List
+import asyncio
+import json
+import math
+import random
+import re
+from app.services.llm_providers.base import Completion, LLMProvider, ProviderError
+from app.config.settings import settings
+from app.utils.tokens import count_tokens
+
+NUMBERED_RE = re.compile(r"^(\d+)\.\s+(.*)$", re.M)
+
+class MockProvider(LLMProvider):
+    """Offline stand-in for load-testing the scheduler without an API key.
+    
+    Latency is log-normal with median ``mock_llm_latency_ms`` and shape
+    ``mock_llm_latency_sigma``, so there is a slow tail for hedging to cut.
+    A ``mock_llm_error_rate`` share of calls fail with a retryable 429.
+    Answers echo the question; JSON-mode calls answer every numbered question.
+    """
+    
+    name = "mock"
+    
+    def __init__(self, latency_ms: float = None, latency_sigma: float = None, error_rate: float = None):
+        self.model = f"mock:{settings.llm_model}"
+        self.latency_ms = settings.mock_llm_latency_ms if latency_ms is None else latency_ms
+        self.latency_sigma = settings.mock_llm_latency_sigma if latency_sigma is None else latency_sigma
+        self.error_rate = settings.mock_llm_error_rate if error_rate is None else error_rate
+        self.calls = 0
+    
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int,
+                       temperature: float, json_mode: bool = False) -> Completion:
+        await self._respond()
+        prompt = messages[-1]["content"]
+        text = _json_answers(prompt) if json_mode else f"Mock answer to: {_question(prompt)}"
+        return Completion(
+            text=text,
+            prompt_tokens=sum(count_tokens(message["content"]) for message in messages),
+            completion_tokens=count_tokens(text)
+        )
+    
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int,
+                     temperature: float) -> AsyncIterator[str]:
+        completion = await self.complete(messages, max_tokens, temperature)
+        for word in re.findall(r"\S+\s*", completion.text):
+            await asyncio.sleep(0.005)
+            yield word
+    
+    async def _respond(self):
+        self.calls += 1
+        delay = self.latency_ms * math.exp(random.gauss(0, self.latency_sigma)) if self.latency_ms else 0
+        await asyncio.sleep(delay / 1000)
+        if random.random() < self.error_rate:
+            raise ProviderError("Mock rate limit exceeded (429)", retryable=True)
+
+def _question(prompt: str) -> str:
+    match = re.search(r"Question:\s*(.*?)\s*Answer:", prompt, re.S)
+    return match.group(1) if match else prompt[-80:]
+
+def _json_answers(prompt: str) -> str:
+    questions = NUMBERED_RE.findall(prompt.rsplit("Questions:", 1)[-1])
+    return json.dumps({
+        "answers": [{"id": int(number), "answer": f"Mock answer to: {question}"} for number, question in questions]
+    })
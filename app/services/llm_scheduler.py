@@ -0,0 +1,237 @@
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+import asyncio
+import random
+import time
+import numpy as np
+from app.services.llm_providers.base import Completion, LLMProvider, ProviderError
+from app.config.settings import settings
+from app.utils.logger import logger
+from app.utils.tokens import count_tokens
+
+# Rate limits are per minute; budgets are tracked over a sliding window of this length
+WINDOW_SECONDS = 60.0
+# Recent call latencies kept for the hedging percentile
+LATENCY_SAMPLES = 200
+
+class LLMScheduler:
+    """Sends provider calls within the rate limits, retrying and optionally hedging them.
+
+    Each call reserves one request and its prompt tokens plus ``max_tokens``
+    in a sliding one-minute window, and waits its turn (first come, first
+    served) until both fit under ``llm_requests_per_minute`` and
+    ``llm_tokens_per_minute`` instead of failing. The reservation is
+    corrected to the tokens actually used when the call returns.
+
+    Retryable errors (429, 5xx, timeouts) are retried up to
+    ``llm_max_retries`` times, after the server's Retry-After (which also
+    holds back every other queued call) or a jittered exponential backoff.
+
+    With ``llm_hedge_enabled``, a call still running after the
+    ``llm_hedge_percentile`` of recent latencies gets a duplicate request if
+    the budget allows one without waiting; the first success is used and
+    the other call is cancelled.
+    """
+
+    def __init__(self, provider: LLMProvider, requests_per_minute: int = None,
+                 tokens_per_minute: int = None, hedge_enabled: bool = None):
+        self.provider = provider
+        self.requests_per_minute = requests_per_minute or settings.llm_requests_per_minute
+        self.tokens_per_minute = tokens_per_minute or settings.llm_tokens_per_minute
+        self.hedge_enabled = settings.llm_hedge_enabled if hedge_enabled is None else hedge_enabled
+
+        self._window: Deque[List[float]] = deque()  # [started_at, tokens] per reserved call
+        self._window_tokens = 0.0
+        self._paused_until = 0.0
+        self._turn = asyncio.Lock()
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.queued_calls = 0
+        self.total_queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int,
+                       temperature: float, json_mode: bool = False) -> Completion:
+        """One completion, scheduled within the rate limits."""
+        estimate = prompt_tokens(messages) + max_tokens
+        for attempt in range(settings.llm_max_retries + 1):
+            try:
+                return await self._hedged(messages, max_tokens, temperature, json_mode, estimate)
+            except ProviderError as e:
+                if not e.retryable or attempt == settings.llm_max_retries:
+                    raise
+                await self._backoff(e, attempt)
+
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int,
+                     temperature: float) -> AsyncIterator[str]:
+        """Stream a completion's text deltas; retried only until the first delta arrives."""
+        prompt_size = prompt_tokens(messages)
+        for attempt in range(settings.llm_max_retries + 1):
+            entry = await self._reserve(prompt_size + max_tokens)
+            parts = []
+            try:
+                async for delta in self.provider.stream(messages, max_tokens, temperature):
+                    parts.append(delta)
+                    yield delta
+            except ProviderError as e:
+                self.failures += 1
+                self._settle(entry, 0)
+                if parts or not e.retryable or attempt == settings.llm_max_retries:
+                    raise
+                await self._backoff(e, attempt)
+                continue
+            self._settle(entry, prompt_size + count_tokens("".join(parts)))
+            return
+
+    async def _hedged(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                      json_mode: bool, estimate: int) -> Completion:
+        entry = await self._reserve(estimate)
+        primary = asyncio.create_task(self._attempt(entry, messages, max_tokens, temperature, json_mode))
+        delay = self._hedge_delay()
+        if delay is None:
+            return await primary
+
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+            hedge_entry = self._try_reserve(estimate)
+            if hedge_entry is None:
+                return await primary
+
+            self.hedges += 1
+            logger.info(f"LLM call exceeded {delay * 1000:.0f}ms, sending a hedged request")
+            hedge = asyncio.create_task(self._attempt(hedge_entry, messages, max_tokens, temperature, json_mode))
+            tasks.append(hedge)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _attempt(self, entry: List[float], messages: List[Dict[str, str]], max_tokens: int,
+                       temperature: float, json_mode: bool) -> Completion:
+        started = time.monotonic()
+        try:
+            completion = await self.provider.complete(messages, max_tokens, temperature, json_mode)
+        except ProviderError:
+            self.failures += 1
+            self._settle(entry, 0)
+            raise
+        self._latencies.append(time.monotonic() - started)
+        used = completion.prompt_tokens + completion.completion_tokens
+        if used:
+            self._settle(entry, used)
+        return completion
+
+    async def _backoff(self, error: ProviderError, attempt: int):
+        self.retries += 1
+        if error.retry_after:
+            delay = error.retry_after
+            # Every queued call would hit the same limit; hold them all back
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        else:
+            delay = settings.llm_retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        logger.warning(f"LLM call failed ({str(error)}), retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+    async def _reserve(self, tokens: int) -> List[float]:
+        """Wait until the call fits in both budgets, then record it."""
+        tokens = min(tokens, self.tokens_per_minute)  # an oversized call runs alone
+        queued = time.monotonic()
+        async with self._turn:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                if now >= self._paused_until and self._fits(tokens):
+                    break
+                wake = self._window[0][0] + WINDOW_SECONDS if self._window else now
+                await asyncio.sleep(max(wake, self._paused_until) - now + 0.001)
+            waited = now - queued
+            if waited > 0.001:
+                self.queued_calls += 1
+                self.total_queue_seconds += waited
+                self.max_queue_seconds = max(self.max_queue_seconds, waited)
+            return self._record(now, tokens)
+
+    def _try_reserve(self, tokens: int) -> Optional[List[float]]:
+        """Record the call only if it fits right now and nobody is queued."""
+        tokens = min(tokens, self.tokens_per_minute)
+        now = time.monotonic()
+        self._expire(now)
+        if self._turn.locked() or now < self._paused_until or not self._fits(tokens):
+            return None
+        return self._record(now, tokens)
+
+    def _fits(self, tokens: int) -> bool:
+        return (
+            len(self._window) < self.requests_per_minute
+            and self._window_tokens + tokens <= self.tokens_per_minute
+        )
+
+    def _record(self, now: float, tokens: int) -> List[float]:
+        self.calls += 1
+        entry = [now, tokens]
+        self._window.append(entry)
+        self._window_tokens += tokens
+        return entry
+
+    def _settle(self, entry: List[float], tokens: int):
+        """Replace a call's reserved tokens by its actual usage, if still in the window."""
+        if entry[0] > time.monotonic() - WINDOW_SECONDS:
+            self._window_tokens += tokens - entry[1]
+        entry[1] = tokens
+
+    def _expire(self, now: float):
+        while self._window and self._window[0][0] <= now - WINDOW_SECONDS:
+            self._window_tokens -= self._window.popleft()[1]
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge_enabled or len(self._latencies) < settings.llm_hedge_min_samples:
+            return None
+        return float(np.percentile(self._latencies, settings.llm_hedge_percentile))
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, retries, hedges and queueing so far, and the current window's usage."""
+        self._expire(time.monotonic())
+        latencies = np.array(self._latencies) * 1000 if self._latencies else np.zeros(1)
+        hedge_delay = self._hedge_delay()
+        return {
+            "provider": self.provider.name,
+            "model": self.provider.model,
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "window_requests": len(self._window),
+            "window_tokens": int(self._window_tokens),
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "queued_calls": self.queued_calls,
+            "mean_queue_ms": self.total_queue_seconds * 1000 / self.queued_calls if self.queued_calls else 0.0,
+            "max_queue_ms": self.max_queue_seconds * 1000,
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p95_ms": float(np.percentile(latencies, 95)),
+            "hedge_after_ms": hedge_delay * 1000 if hedge_delay is not None else None
+        }
+
+def prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    """LLM tokens in a chat prompt's messages."""
+    return sum(count_tokens(message["content"]) for message in messages)
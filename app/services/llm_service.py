@@ -1,19 +1,42 @@
-from typing import List, Dict, Any
-from groq import Groq
+from typing import Callable, List, Dict, Any, Optional
+import json
+import re
+from app.services.context_assembly import format_context
+from app.services.llm_providers import create_llm_provider
+from app.services.llm_scheduler import LLMScheduler, prompt_tokens
 from app.config.settings import settings
 from app.utils.logger import logger
 
+# Bump whenever the prompt changes so cached answers from the old prompt are not reused
+PROMPT_VERSION = "2"
+BATCH_PROMPT_VERSION = "1"
+
+SYSTEM_PROMPT = "You are a helpful assistant that answers questions based on provided context from policy documents. Always ground your answers in the provided context. DO NOT make assumptions"
+
+# Output tokens allowed per answer; a batched call gets this much per question
+ANSWER_MAX_TOKENS = 500
+
 class LLMService:
     def __init__(self):
-        if not settings.groq_api_key:
-            raise ValueError("No Groq API key found")
-        self.groq_client = Groq(api_key=settings.groq_api_key)
+        self.provider = create_llm_provider(settings.llm_provider)
+        # Every call goes through the scheduler's rate-limit budgets, retries and hedging
+        self.scheduler = LLMScheduler(self.provider)
+        self.model = self.provider.model
+        # Batched and single-question prompts word answers differently; keep their caches apart
+        self.prompt_version = (
+            f"{PROMPT_VERSION}-batch{BATCH_PROMPT_VERSION}" if settings.llm_batch_enabled else PROMPT_VERSION
+        )
 
-    def generate_answer(self, question: str, context_chunks: List[Dict[str, Any]]) -> str:
-        """Generate answer based on question and context."""
+    async def generate_answer(self, question: str, context_chunks: List[Dict[str, Any]],
+                              on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Generate answer based on question and context.
+        
+        With ``on_token`` the completion is streamed and each text delta is
+        passed to it as it arrives; the full answer is still returned.
+        """
         try:
             # Prepare context
-            context = "\n\n".join([chunk["text"] for chunk in context_chunks])
+            context = format_context(context_chunks)
             
             # Create prompt
             prompt = f"""Based on the following context from a policy document, answer the question accurately and very concisely. 
@@ -27,21 +50,108 @@ Question: {question}
 
 Answer:"""
             
-            # Generate response using Groq
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that answers questions based on provided context from policy documents. Always ground your answers in the provided context. DO NOT make assumptions"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.1
-            )
-            answer = response.choices[0].message.content.strip()
+            # Generate response through the provider's scheduler
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+            logger.info(f"Prompt tokens: {prompt_tokens(messages)} ({len(context_chunks)} chunks)")
+            if on_token is None:
+                completion = await self.scheduler.complete(messages, max_tokens=ANSWER_MAX_TOKENS, temperature=0.1)
+                answer = completion.text.strip()
+            else:
+                answer = await self._stream_completion(messages, on_token)
             
             logger.info(f"Generated answer for question: {question[:50]}...")
             return answer
             
         except Exception as e:
             logger.error(f"Error generating answer: {str(e)}")
-            raise Exception(f"Failed to generate answer: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to generate answer: {str(e)}")
+    
+    async def _stream_completion(self, messages: List[Dict[str, str]], on_token: Callable[[str], None]) -> str:
+        """Stream a completion, passing text deltas to ``on_token`` and returning the full text."""
+        parts = []
+        async for delta in self.scheduler.stream(messages, max_tokens=ANSWER_MAX_TOKENS, temperature=0.1):
+            parts.append(delta)
+            on_token(delta)
+        return "".join(parts).strip()
+    
+    async def aclose(self):
+        """Close the provider's pooled connections."""
+        await self.provider.aclose()
+    
+    async def generate_batch_answers(self, questions: List[str],
+                                     context_chunks: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Answer several questions over one shared context in a single call.
+        
+        The model is asked for a JSON object with one answer per question. The
+        result is aligned with ``questions``; an entry is None when that answer
+        is missing or unparsable (or the whole call failed), so the caller can
+        fall back to a single-question call for it.
+        """
+        context = format_context(context_chunks)
+        numbered = "\n".join(f"{i}. {question}" for i, question in enumerate(questions, start=1))
+        
+        prompt = f"""Based on the following context from a policy document, answer each question accurately and very concisely. 
+Only use information that is explicitly stated in the context. If the answer to a question cannot be found in the context, state that clearly.
+For each answer also state the reference to the context used to generate it (mention the specific clause from the policy document).
+
+Context:
+{context}
+
+Questions:
+{numbered}
+
+Respond with a JSON object of the form {{"answers": [{{"id": 1, "answer": "..."}}, ...]}} containing one entry per question, using the question numbers as ids."""
+        
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        logger.info(
+            f"Prompt tokens: {prompt_tokens(messages)} ({len(context_chunks)} chunks, {len(questions)} questions)"
+        )
+        try:
+            completion = await self.scheduler.complete(
+                messages,
+                max_tokens=min(ANSWER_MAX_TOKENS * len(questions), settings.llm_batch_max_output_tokens),
+                temperature=0.1,
+                json_mode=True
+            )
+            answers = _parse_batch_answers(completion.text, len(questions))
+        except Exception as e:
+            logger.error(f"Error generating batched answers: {str(e)}")
+            return [None] * len(questions)
+        
+        logger.info(
+            f"Generated {sum(answer is not None for answer in answers)}/{len(questions)} answers in one call"
+        )
+        return answers
+
+def _parse_batch_answers(content: str, count: int) -> List[Optional[str]]:
+    """Extract per-question answers from the model's JSON, tolerating code fences."""
+    answers: List[Optional[str]] = [None] * count
+    match = re.search(r"\{.*\}", content or "", re.S)
+    if match is None:
+        return answers
+    try:
+        payload = json.loads(match.group())
+    except json.JSONDecodeError:
+        return answers
+    
+    items = payload.get("answers") if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        return answers
+    for position, item in enumerate(items):
+        if isinstance(item, dict):
+            index, answer = item.get("id"), item.get("answer")
+        else:
+            index, answer = position + 1, item
+        try:
+            index = int(index) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count and isinstance(answer, str) and answer.strip():
+            answers[index] = answer.strip()
+    return answers
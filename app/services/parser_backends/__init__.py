@@ -0,0 +1,15 @@
+from app.services.parser_backends.base import ParserBackend
+
+def create_parser_backend(name: str) -> ParserBackend:
+    """Instantiate a parser backend by name.
+    
+    Backends are imported lazily so the local extractor works without the
+    LlamaParse client installed or configured.
+    """
+    if name == "llamaparse":
+        from app.services.parser_backends.llamaparse_backend import LlamaParseBackend
+        return LlamaParseBackend()
+    if name == "local":
+        from app.services.parser_backends.local_backend import LocalPDFBackend
+        return LocalPDFBackend()
+    raise ValueError(f"Unknown parser backend: {name}")
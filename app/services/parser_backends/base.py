@@ -0,0 +1,14 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List
+
+class ParserBackend(ABC):
+    """Turns a local PDF file into markdown-ish text, one string per page."""
+    
+    @abstractmethod
+    async def parse_pages(self, pdf_path: str) -> List[str]:
+        """Extract the text of every page, in page order."""
+    
+    async def iter_pages(self, pdf_path: str) -> AsyncIterator[str]:
+        """Yield page texts in page order as they become available."""
+        for page in await self.parse_pages(pdf_path):
+            yield page
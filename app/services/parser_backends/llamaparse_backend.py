@@ -0,0 +1,22 @@
+from typing import List
+from llama_parse import LlamaParse
+from app.services.parser_backends.base import ParserBackend
+from app.config.settings import settings
+from app.utils.logger import logger
+
+class LlamaParseBackend(ParserBackend):
+    """Remote parsing through the LlamaParse service (handles scans and complex layouts)."""
+    
+    def __init__(self):
+        if not settings.llama_parse_api_key:
+            raise ValueError("No LlamaParse API key found")
+        self.parser = LlamaParse(
+            api_key=settings.llama_parse_api_key,
+            result_type="markdown",
+            verbose=True
+        )
+    
+    async def parse_pages(self, pdf_path: str) -> List[str]:
+        logger.info("Parsing PDF with LlamaParse...")
+        documents = await self.parser.aload_data(pdf_path)
+        return [doc.text for doc in documents]
@@ -0,0 +1,102 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Tuple
+import asyncio
+import fitz  # PyMuPDF
+from app.services.parser_backends.base import ParserBackend
+from app.config.settings import settings
+from app.utils.logger import logger
+
+# Spans at least this much larger than the page's body text become headings
+HEADING_SIZE_RATIO = 1.15
+HEADING_MAX_CHARS = 120
+
+class LocalPDFBackend(ParserBackend):
+    """Offline text extraction with PyMuPDF, parallelised across page ranges.
+
+    The page count is read once, then ranges of ``pdf_pages_per_task`` pages
+    are extracted concurrently in a process pool (PyMuPDF holds the GIL).
+    Output approximates LlamaParse's markdown: larger-font lines become
+    ``#``/``##`` headings, short bold lines ``###`` headings, and each text
+    block a paragraph.
+    """
+
+    def __init__(self):
+        self._executor = ProcessPoolExecutor(max_workers=settings.pdf_parser_workers)
+
+    async def parse_pages(self, pdf_path: str) -> List[str]:
+        return [page async for page in self.iter_pages(pdf_path)]
+
+    async def iter_pages(self, pdf_path: str) -> AsyncIterator[str]:
+        """Yield pages in order while later page ranges are still being extracted."""
+        loop = asyncio.get_running_loop()
+        page_count = await loop.run_in_executor(self._executor, _page_count, pdf_path)
+
+        step = max(settings.pdf_pages_per_task, 1)
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        logger.info(f"Extracting {page_count} pages locally in {len(ranges)} tasks")
+
+        futures = [
+            loop.run_in_executor(self._executor, _extract_page_range, pdf_path, start, end)
+            for start, end in ranges
+        ]
+        try:
+            for future in futures:
+                for page in await future:
+                    yield page
+        finally:
+            for future in futures:
+                future.cancel()
+
+def _page_count(pdf_path: str) -> int:
+    with fitz.open(pdf_path) as document:
+        return document.page_count
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Worker-process entry point: markdown-ish text for pages [start, end)."""
+    with fitz.open(pdf_path) as document:
+        return [_page_to_markdown(document[page_no]) for page_no in range(start, end)]
+
+def _page_to_markdown(page) -> str:
+    blocks = [block for block in page.get_text("dict")["blocks"] if block.get("type") == 0]
+
+    # The most common span size (weighted by characters) is the body text size
+    sizes = Counter()
+    for block in blocks:
+        for line in block["lines"]:
+            for span in line["spans"]:
+                sizes[round(span["size"], 1)] += len(span["text"].strip())
+    body_size = sizes.most_common(1)[0][0] if sizes else 0.0
+
+    paragraphs = []
+    for block in blocks:
+        lines = []
+        for line in block["lines"]:
+            text, size, bold = _line_text(line)
+            if text:
+                lines.append((text, size, bold))
+        if not lines:
+            continue
+
+        block_text = " ".join(text for text, _, _ in lines)
+        max_size = max(size for _, size, _ in lines)
+        all_bold = all(bold for _, _, bold in lines)
+
+        if len(block_text) <= HEADING_MAX_CHARS and body_size and max_size >= body_size * HEADING_SIZE_RATIO:
+            level = "#" if max_size >= body_size * 1.6 else "##"
+            paragraphs.append(f"{level} {block_text}")
+        elif len(block_text) <= HEADING_MAX_CHARS and all_bold:
+            paragraphs.append(f"### {block_text}")
+        else:
+            paragraphs.append(block_text)
+
+    return "\n\n".join(paragraphs)
+
+def _line_text(line) -> Tuple[str, float, bool]:
+    spans = [span for span in line["spans"] if span["text"].strip()]
+    if not spans:
+        return "", 0.0, False
+    text = "".join(span["text"] for span in line["spans"]).strip()
+    size = max(span["size"] for span in spans)
+    bold = all(span["flags"] & 16 for span in spans)  # bit 4: bold
+    return text, size, bold
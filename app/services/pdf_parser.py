@@ -1,73 +1,151 @@
-import requests
+import hashlib
 import tempfile
 import os
-import asyncio
-import threading
-from llama_parse import LlamaParse
-from typing import List
+import aiofiles
+import httpx
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+from app.services.parser_backends import create_parser_backend
 from app.config.settings import settings
 from app.utils.logger import logger
 
+@dataclass
+class PDFDownload:
+    path: Optional[str]  # temporary file, None when not modified
+    content_hash: Optional[str]  # SHA-256 of the PDF bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    not_modified: bool = False
+
 class PDFParser:
     def __init__(self):
-        self.parser = LlamaParse(
-            api_key=settings.llama_parse_api_key,
-            result_type="markdown",
-            verbose=True
+        mode = settings.pdf_parser_backend
+        if mode not in ("llamaparse", "local", "auto"):
+            raise ValueError(f"Unknown parser backend: {mode}")
+        
+        # "auto" extracts locally and only sends scanned/complex PDFs to LlamaParse
+        self.local_backend = create_parser_backend("local") if mode != "llamaparse" else None
+        self.llamaparse_backend = None
+        if mode == "llamaparse" or (mode == "auto" and settings.llama_parse_api_key):
+            self.llamaparse_backend = create_parser_backend("llamaparse")
+        
+        # One pooled client for all downloads, so connections are reused
+        self.http_client = httpx.AsyncClient(
+            timeout=settings.pdf_download_timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_connections
+            )
         )
     
-    def parse_pdf_from_url(self, pdf_url: str) -> str:
-        """Download PDF from URL and parse it using LlamaParse in a separate thread."""
+    async def aclose(self):
+        """Close the pooled HTTP client."""
+        await self.http_client.aclose()
+    
+    async def parse_pdf_from_url(self, pdf_url: str) -> str:
+        """Download PDF from URL and parse it without blocking the event loop."""
+        download = await self.download_pdf(pdf_url)
+        try:
+            return await self.parse_pdf_file(download.path)
+        finally:
+            # Clean up temporary file
+            os.unlink(download.path)
+    
+    async def download_pdf(self, pdf_url: str, etag: Optional[str] = None,
+                           last_modified: Optional[str] = None) -> PDFDownload:
+        """Stream a PDF to a temporary file, hashing it on the way.
+        
+        The body is written in chunks (never held in memory whole) and the
+        download is aborted once it exceeds ``pdf_max_bytes``. When validators
+        from an earlier download are passed, the request is conditional and a
+        304 returns ``not_modified=True`` without a body. The caller owns the
+        temporary file and must delete it.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        
+        temp_path = None
         try:
             logger.info(f"Downloading PDF from URL: {pdf_url}")
             
-            # Download PDF
-            response = requests.get(pdf_url, timeout=30)
-            response.raise_for_status()
-            
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
-                temp_file.write(response.content)
-                temp_path = temp_file.name
-            
-            try:
-                # Parse PDF in a separate thread to avoid event loop issues
-                logger.info("Parsing PDF with LlamaParse...")
-                result = self._parse_in_thread(temp_path)
+            async with self.http_client.stream("GET", pdf_url, headers=headers) as response:
+                if response.status_code == 304:
+                    logger.info("PDF not modified since last download")
+                    return PDFDownload(path=None, content_hash=None, etag=etag,
+                                       last_modified=last_modified, not_modified=True)
+                response.raise_for_status()
                 
-                logger.info(f"Successfully parsed PDF. Total length: {len(result)} characters")
-                return result
+                content_length = int(response.headers.get("Content-Length") or 0)
+                if content_length > settings.pdf_max_bytes:
+                    raise ValueError(f"PDF is {content_length} bytes, limit is {settings.pdf_max_bytes}")
                 
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_path)
+                hasher = hashlib.sha256()
+                size = 0
+                fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+                os.close(fd)
+                async with aiofiles.open(temp_path, "wb") as temp_file:
+                    async for chunk in response.aiter_bytes(settings.pdf_download_chunk_bytes):
+                        size += len(chunk)
+                        if size > settings.pdf_max_bytes:
+                            raise ValueError(f"PDF exceeds the {settings.pdf_max_bytes} byte limit")
+                        hasher.update(chunk)
+                        await temp_file.write(chunk)
                 
+                download = PDFDownload(
+                    path=temp_path,
+                    content_hash=hasher.hexdigest(),
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                )
+            
+            logger.info(f"Downloaded PDF ({size} bytes, sha256 {download.content_hash[:12]})")
+            return download
+            
+        except Exception as e:
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
+            logger.error(f"Error downloading PDF: {str(e)}")
+            raise Exception(f"Failed to download PDF: {str(e)}")
+    
+    async def parse_pdf_file(self, temp_path: str) -> str:
+        """Parse a local PDF file with the configured backend(s)."""
+        try:
+            pages = await self.parse_pdf_pages(temp_path)
+            result = "\n\n".join(pages)
+            
+            logger.info(f"Successfully parsed PDF. Total length: {len(result)} characters")
+            return result
+            
         except Exception as e:
             logger.error(f"Error parsing PDF: {str(e)}")
             raise Exception(f"Failed to parse PDF: {str(e)}")
     
-    def _parse_in_thread(self, temp_path: str) -> str:
-        """Run LlamaParse in a separate thread with its own event loop."""
-        result = [None]  # Use list to store result
-        
-        def parse_pdf():
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                documents = self.parser.load_data(temp_path)
-                parsed_text = "\n\n".join([doc.text for doc in documents])
-                result[0] = parsed_text
-            except Exception as e:
-                result[0] = f"Error: {str(e)}"
-            finally:
-                loop.close()
-        
-        # Run in thread
-        thread = threading.Thread(target=parse_pdf)
-        thread.start()
-        thread.join()
-        
-        if result[0] and result[0].startswith("Error:"):
-            raise Exception(result[0])
-        
-        return result[0]
\ No newline at end of file
+    async def parse_pdf_pages(self, temp_path: str) -> List[str]:
+        """Extract per-page text, locally first when configured."""
+        if self.local_backend is not None:
+            pages = await self.local_backend.parse_pages(temp_path)
+            if self.llamaparse_backend is None or not _needs_remote_parse(pages):
+                return pages
+            logger.info("Local extraction found too little text (scanned or complex layout). Using LlamaParse...")
+        return await self.llamaparse_backend.parse_pages(temp_path)
+
+    async def iter_pdf_pages(self, temp_path: str) -> AsyncIterator[str]:
+        """Yield per-page text as it is extracted (streamed only for the local-only backend)."""
+        if self.local_backend is not None and self.llamaparse_backend is None:
+            async for page in self.local_backend.iter_pages(temp_path):
+                yield page
+            return
+        # LlamaParse returns whole documents, and "auto" needs every page to decide
+        for page in await self.parse_pdf_pages(temp_path):
+            yield page
+
+def _needs_remote_parse(pages: List[str]) -> bool:
+    """Heuristic for scans/complex layouts: too many pages with almost no extractable text."""
+    if not pages:
+        return True
+    sparse = sum(1 for page in pages if len(page.strip()) < settings.pdf_min_chars_per_page)
+    return sparse / len(pages) > settings.pdf_max_sparse_page_ratio
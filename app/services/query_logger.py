@@ -0,0 +1,93 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+from app.services.query_store import QueryStore
+from app.config.settings import settings
+from app.utils.logger import logger
+
+class QueryLogger:
+    """Write-behind buffer for query results (and their new answer-cache rows), off the request path.
+
+    ``log`` appends a record to an in-process buffer and returns at once; a
+    background writer stores buffered records through ``QueryStore`` in
+    batches of up to ``query_log_batch_size``, every
+    ``query_log_flush_interval`` seconds or as soon as a batch is full. When
+    the buffer already holds ``query_log_buffer_size`` records (the database
+    is down or too slow), new records are dropped and counted. ``aclose``
+    drains the buffer on shutdown.
+    """
+
+    def __init__(self, store: QueryStore):
+        self.store = store
+        self._buffer: List[Dict[str, Any]] = []
+        self._batch_ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._closing = False
+        self._reported_dropped = 0
+
+        self.logged = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def log(self, record: Dict[str, Any]):
+        """Buffer one answered request (see ``QueryStore.record_many`` for its fields)."""
+        if len(self._buffer) >= settings.query_log_buffer_size:
+            self.dropped += 1
+            return
+        self._ensure_writer()
+        self._buffer.append(record)
+        self.logged += 1
+        if len(self._buffer) >= settings.query_log_batch_size:
+            self._batch_ready.set()
+
+    def _ensure_writer(self):
+        if not self._closing and (self._writer is None or self._writer.done()):
+            self._writer = asyncio.create_task(self._write())
+
+    async def _write(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=settings.query_log_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self):
+        """Store everything buffered so far, one batch per transaction."""
+        self._batch_ready.clear()
+        while self._buffer:
+            batch = self._buffer[:settings.query_log_batch_size]
+            del self._buffer[:len(batch)]
+            self.flushes += 1
+            try:
+                await asyncio.to_thread(self.store.record_many, batch)
+                self.written += len(batch)
+            except Exception:
+                # Already logged by the store; the records are lost, not retried
+                self.failed += len(batch)
+        if self.dropped > self._reported_dropped:
+            logger.warning(f"Query log buffer full: {self.dropped - self._reported_dropped} records dropped")
+            self._reported_dropped = self.dropped
+
+    def stats(self) -> Dict[str, Any]:
+        """Records logged, written, failed and dropped, and the current buffer size."""
+        return {
+            "buffered": len(self._buffer),
+            "max_buffered": settings.query_log_buffer_size,
+            "logged": self.logged,
+            "written": self.written,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "flushes": self.flushes
+        }
+
+    async def aclose(self):
+        """Stop the writer and store whatever is still buffered."""
+        self._closing = True
+        if self._writer is not None:
+            self._batch_ready.set()
+            await self._writer
+            self._writer = None
+        await self.flush()
+        logger.info(f"Query log drained: {self.written} records written, {self.dropped} dropped")
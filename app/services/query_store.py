@@ -0,0 +1,104 @@
+from typing import List, Dict, Any
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from app.models.database import SessionLocal, Document, QueryRun, QuestionAnswer, RetrievalReference
+from app.services.answer_cache import insert_answers
+from app.utils.logger import logger
+
+class QueryStore:
+    """Answered requests in the normalised query tables.
+
+    A request is one ``query_runs`` row, one ``question_answers`` row per
+    question and one ``retrieval_references`` row per context chunk, which
+    points at the chunk by (document_id, chunk_index) instead of copying its
+    text. Recording requests only inserts, so it never scans for an earlier
+    record of the same URL.
+    """
+
+    def record_many(self, records: List[Dict[str, Any]]):
+        """Store answered requests in one transaction; raises on failure.
+
+        Each record carries document_id, document_url, document_name,
+        questions, answers, retrieved_chunks (each question's context chunks),
+        processing_time and optionally cache_keys and answer_cache_entries
+        (the request's newly generated answers, for the ``answer_cache`` table).
+        """
+        if not records:
+            return
+        db = SessionLocal()
+        try:
+            # Documents ingested before the documents table have no row yet
+            document_ids = sorted({record["document_id"] for record in records})
+            db.execute(insert(Document).values([{"id": document_id} for document_id in document_ids])
+                       .on_conflict_do_nothing())
+            answers = [entry for record in records for entry in record.get("answer_cache_entries") or []]
+            if answers:
+                db.execute(insert_answers(answers))
+            # Rows of each table go out as multi-row inserts on flush
+            db.add_all([self._query_run(record) for record in records])
+            db.commit()
+            logger.info(f"Stored {len(records)} query results in database")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error storing query results: {str(e)}")
+            raise
+        finally:
+            db.close()
+
+    def _query_run(self, record: Dict[str, Any]) -> QueryRun:
+        document_id = record["document_id"]
+        cache_keys = record.get("cache_keys") or [None] * len(record["questions"])
+        return QueryRun(
+            document_id=document_id,
+            document_url=record["document_url"],
+            document_name=record["document_name"],
+            processing_time=record["processing_time"],
+            answers=[
+                QuestionAnswer(
+                    position=position,
+                    question=question,
+                    answer=answer,
+                    cache_key=cache_key,
+                    references=[
+                        RetrievalReference(
+                            rank=rank,
+                            document_id=chunk.get("document_id") or document_id,
+                            chunk_index=chunk["chunk_index"],
+                            score=chunk.get("score")
+                        )
+                        for rank, chunk in enumerate(
+                            [chunk for chunk in chunks if chunk.get("chunk_index") is not None]
+                        )
+                    ]
+                )
+                for position, (question, answer, chunks, cache_key) in enumerate(zip(
+                    record["questions"], record["answers"], record["retrieved_chunks"], cache_keys
+                ))
+            ]
+        )
+
+    def recent(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """The latest requests with their question counts, newest first."""
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(QueryRun, func.count(QuestionAnswer.id))
+                .outerjoin(QuestionAnswer, QuestionAnswer.query_run_id == QueryRun.id)
+                .group_by(QueryRun.id)
+                .order_by(QueryRun.created_at.desc())
+                .limit(limit)
+                .all()
+            )
+            return [
+                {
+                    "id": run.id,
+                    "document_id": run.document_id,
+                    "document_url": run.document_url,
+                    "questions_count": questions_count,
+                    "processing_time": run.processing_time,
+                    "created_at": run.created_at
+                }
+                for run, questions_count in rows
+            ]
+        finally:
+            db.close()
@@ -0,0 +1,44 @@
+from typing import Any, Dict, List
+from app.services.context_assembly import chunk_key, document_order
+from app.config.settings import settings
+from app.utils.tokens import count_tokens
+
+def merge_context(chunk_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Union of several questions' chunks without duplicates, in document order."""
+    merged = {}
+    for chunks in chunk_lists:
+        for chunk in chunks:
+            merged.setdefault(chunk_key(chunk), chunk)
+    return document_order(list(merged.values()))
+
+def group_questions(chunk_lists: List[List[Dict[str, Any]]], max_questions: int = None,
+                    context_tokens: int = None, min_overlap: float = None) -> List[List[int]]:
+    """Greedily group questions (by index) whose retrieved chunks overlap.
+
+    A question joins the first open group whose chunk set it overlaps by at
+    least ``min_overlap`` (Jaccard), provided the group stays within
+    ``max_questions`` and its deduplicated context within ``context_tokens``.
+    Otherwise it starts a new group, so unrelated questions end up alone.
+    """
+    max_questions = max_questions or settings.llm_batch_max_questions
+    context_tokens = context_tokens or settings.llm_batch_context_tokens
+    min_overlap = settings.llm_batch_min_overlap if min_overlap is None else min_overlap
+
+    groups: List[Dict[str, Any]] = []
+    for index, chunks in enumerate(chunk_lists):
+        sizes = {chunk_key(chunk): count_tokens(chunk["text"]) for chunk in chunks}
+        keys = set(sizes)
+        for group in groups:
+            if len(group["members"]) >= max_questions:
+                continue
+            union = group["keys"] | keys
+            overlap = len(group["keys"] & keys) / len(union) if union else 1.0
+            new_tokens = sum(size for key, size in sizes.items() if key not in group["keys"])
+            if overlap >= min_overlap and group["tokens"] + new_tokens <= context_tokens:
+                group["members"].append(index)
+                group["keys"] = union
+                group["tokens"] += new_tokens
+                break
+        else:
+            groups.append({"members": [index], "keys": keys, "tokens": sum(sizes.values())})
+    return [group["members"] for group in groups]
@@ -1,10 +1,24 @@
-from typing import List, Dict, Any
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Tuple
+import asyncio
+import os
 import time
+import numpy as np
 from app.services.pdf_parser import PDFParser
 from app.services.embedding_service import EmbeddingService
 from app.services.vector_store import VectorStore
+from app.services.ingestion_pipeline import IngestionPipeline
+from app.services.ingestion_jobs import IngestionJobs
+from app.services.document_registry import DocumentRegistry
 from app.services.llm_service import LLMService
-from app.models.database import SessionLocal, DocumentQuery
+from app.services.answer_cache import AnswerCache, make_cache_key
+from app.services.semantic_cache import SemanticCache
+from app.services.query_store import QueryStore
+from app.services.query_logger import QueryLogger
+from app.services.question_groups import group_questions, merge_context
+from app.services.context_assembly import ContextAssembler
+from app.utils.documents import normalize_document_url
+from app.utils.single_flight import SingleFlight
+from app.config.settings import settings
 from app.utils.logger import logger
 
 class RAGService:
@@ -12,42 +26,59 @@ class RAGService:
         self.pdf_parser = PDFParser()
         self.embedding_service = EmbeddingService()
         self.vector_store = VectorStore()
+        self.ingestion = IngestionPipeline(self.pdf_parser, self.embedding_service, self.vector_store)
         self.llm_service = LLMService()
+        self.document_registry = DocumentRegistry()
+        self.answer_cache = AnswerCache()
+        self.semantic_cache = SemanticCache()
+        self.query_store = QueryStore()
+        self.query_logger = QueryLogger(self.query_store)
+        self.context_assembler = ContextAssembler(self.embedding_service.aembed_batch)
+        # Concurrent requests for the same URL, or the same content, share one in-flight ingestion
+        self._url_flights = SingleFlight()
+        self._content_flights = SingleFlight()
+        self.ingestion_jobs = IngestionJobs(self._ensure_document)
     
-    def document_exists_in_db(self, document_url: str) -> bool:
-        """Check if document already exists in PostgreSQL database."""
-        db = SessionLocal()
-        try:
-            existing_query = db.query(DocumentQuery).filter(
-                DocumentQuery.document_url == document_url
-            ).first()
-            return existing_query is not None
-        finally:
-            db.close()
+    async def process_document_and_questions(self, document_url: str, questions: List[str]) -> Dict[str, Any]:
+        """Main RAG pipeline.
+        
+        Network calls are awaited and blocking work (embedding, database access)
+        runs on worker threads, so concurrent requests overlap instead of queuing.
+        """
+        return await self._run_pipeline(document_url, questions)
     
-    def get_existing_document_data(self, document_url: str) -> Dict[str, Any]:
-        """Get existing document data from PostgreSQL database."""
-        db = SessionLocal()
+    async def stream_document_and_questions(self, document_url: str, questions: List[str],
+                                            stream_tokens: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Run the pipeline, yielding each answer as soon as it is available.
+        
+        Yields ``{"event": "answer", "index", "question", "answer", "cached"}``
+        per question (cached answers first, the rest as they are generated), and
+        with ``stream_tokens`` also ``{"event": "token", "index", "text"}`` deltas
+        for answers generated by single-question calls. The last event is
+        ``{"event": "done", ...}`` with the same fields as
+        ``process_document_and_questions`` returns. Errors are raised.
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(
+            self._run_pipeline(document_url, questions, events.put_nowait, stream_tokens)
+        )
+        task.add_done_callback(lambda _: events.put_nowait(None))
         try:
-            existing_query = db.query(DocumentQuery).filter(
-                DocumentQuery.document_url == document_url
-            ).first()
-            
-            if existing_query:
-                return {
-                    "document_url": existing_query.document_url,
-                    "document_name": existing_query.document_name,
-                    "questions": existing_query.questions,
-                    "retrieved_chunks": existing_query.retrieved_chunks,
-                    "answers": existing_query.answers,
-                    "processing_time": existing_query.processing_time
-                }
-            return None
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+            yield {"event": "done", **task.result()}
         finally:
-            db.close()
+            # The client went away mid-stream
+            if not task.done():
+                task.cancel()
     
-    def process_document_and_questions(self, document_url: str, questions: List[str]) -> Dict[str, Any]:
-        """Main RAG pipeline."""
+    async def _run_pipeline(self, document_url: str, questions: List[str],
+                            emit: Optional[Callable[[Dict[str, Any]], None]] = None,
+                            stream_tokens: bool = False) -> Dict[str, Any]:
+        """Answer the questions, passing answer (and token) events to ``emit`` if given."""
         start_time = time.time()
         doc_name = self._extract_document_name(document_url)
         
@@ -55,120 +86,264 @@ class RAGService:
             logger.info(f"Starting RAG pipeline for document: {document_url}")
             logger.info(f"Questions to process: {len(questions)}")
             
-            # Check if document already exists in PostgreSQL
-            if self.document_exists_in_db(document_url):
-                logger.info(f"Document already exists in database. Skipping parsing and storage.")
-                # Use existing data from database
-                existing_data = self.get_existing_document_data(document_url)
+            # Resolve the content-addressed document, ingesting it only if unseen
+            document_id = await self._ensure_document(document_url)
+            
+            # Look every question up in the answer cache
+            cache_keys = [
+                make_cache_key(document_id, question, self.llm_service.model, self.llm_service.prompt_version)
+                for question in questions
+            ]
+            cached_answers = await asyncio.to_thread(self.answer_cache.get_many, cache_keys)
+            
+            # Question indices sharing each cache key, so duplicates get the same answer event
+            indices = {}
+            for index, cache_key in enumerate(cache_keys):
+                indices.setdefault(cache_key, []).append(index)
+            
+            def emit_answer(cache_key: str, answer: str, cached: bool):
+                if emit is None:
+                    return
+                for index in indices[cache_key]:
+                    emit({"event": "answer", "index": index, "question": questions[index],
+                          "answer": answer, "cached": cached})
+            
+            for cache_key, entry in cached_answers.items():
+                emit_answer(cache_key, entry["answer"], True)
+            
+            # Cache misses, each distinct normalised question only once
+            pending = {}
+            for question, cache_key in zip(questions, cache_keys):
+                if cache_key not in cached_answers and cache_key not in pending:
+                    pending[cache_key] = question
+            
+            # Step 5: Process questions
+            logger.info(f"Step 5: Processing questions... ({len(questions) - len(pending)}/{len(questions)} in answer cache)")
+            
+            answered_keys = set()
+            new_entries = []
+            if pending:
+                pending_questions = list(pending.values())
                 
-                # Check if the same questions were already processed
-                if set(existing_data["questions"]) == set(questions):
-                    logger.info("Same questions already processed. Returning cached results.")
-                    return {
-                        "answers": existing_data["answers"],
-                        "retrieved_chunks": existing_data["retrieved_chunks"],
-                        "processing_time": existing_data["processing_time"],
-                        "document_name": existing_data["document_name"],
-                        "cached": True
-                    }
-                else:
-                    # Different questions, but document already processed
-                    logger.info("Document exists but different questions. Processing new questions only.")
-                    # We'll need to re-process since we don't have the original chunks stored
-                    # This is a limitation - we could enhance this by storing chunks in PostgreSQL too
-                    all_chunks = []
-            else:
-                # Step 1: Parse PDF
-                logger.info("Step 1: Parsing PDF...")
-                parsed_text = self.pdf_parser.parse_pdf_from_url(document_url)
+                # Embed every uncached question in a single batch call
+                question_embeddings = await self.embedding_service.aembed_queries(pending_questions)
                 
-                # Step 2: Chunk text
-                logger.info("Step 2: Chunking text...")
-                chunks = self.embedding_service.chunk_text(parsed_text)
+                # Reuse answers to near-identical earlier questions about this document
+                scope = (document_id, self.llm_service.model, self.llm_service.prompt_version)
+                to_answer = []
+                for cache_key, question, embedding in zip(pending, pending_questions, question_embeddings):
+                    # Disabled, this only records the similarity for tuning the threshold
+                    entry = self.semantic_cache.lookup(scope, question, embedding)
+                    if entry is not None:
+                        # Served, but not written under this question's exact key: a false
+                        # positive must not outlive a later, stricter threshold
+                        cached_answers[cache_key] = entry
+                        emit_answer(cache_key, entry["answer"], True)
+                    else:
+                        to_answer.append((cache_key, question, embedding))
+                answered_keys = {cache_key for cache_key, _, _ in to_answer}
                 
-                # Step 3: Generate embeddings for chunks
-                logger.info("Step 3: Generating embeddings for chunks...")
-                chunk_embeddings = self.embedding_service.embed_batch(chunks)
+                def on_answer(position: int, answer: str):
+                    emit_answer(to_answer[position][0], answer, False)
                 
-                # Step 4: Store in vector database
-                logger.info("Step 4: Storing embeddings...")
-                chunk_ids = self.vector_store.store_embeddings(
-                    chunks, chunk_embeddings, document_url
-                )
-                all_chunks = self.vector_store.get_document_chunks(document_url)
-            
-            # Step 5: Process questions
-            logger.info("Step 5: Processing questions...")
-            answers = []
-            all_retrieved_chunks = []
-            
-            for question in questions:
-                # Generate question embedding
-                question_embedding = self.embedding_service.embed_text(question)
+                def on_token(position: int, text: str):
+                    emit({"event": "token", "index": indices[to_answer[position][0]][0], "text": text})
                 
-                # Retrieve relevant chunks
-                retrieved_chunks = self.vector_store.search_similar(question_embedding)
-                all_retrieved_chunks.append({
-                    "question": question,
-                    "chunks": retrieved_chunks
-                })
+                # Retrieve concurrently, then answer (grouped into shared calls when enabled)
+                semaphore = asyncio.Semaphore(settings.question_concurrency)
+                assembled = await asyncio.gather(*[
+                    self._retrieve(question, embedding, document_id, semaphore)
+                    for _, question, embedding in to_answer
+                ])
+                retrieved = [chunks for chunks, _ in assembled]
+                context_tokens = [tokens for _, tokens in assembled if tokens is not None]
+                if context_tokens:
+                    logger.info(f"Context for {len(retrieved)} questions: {sum(context_tokens)} tokens")
+                generated = await self._generate_answers(
+                    [question for _, question, _ in to_answer], retrieved, semaphore,
+                    on_answer=on_answer if emit is not None else None,
+                    on_token=on_token if emit is not None and stream_tokens else None
+                )
                 
-                # Generate answer
-                answer = self.llm_service.generate_answer(question, retrieved_chunks)
-                answers.append(answer)
+                for (cache_key, question, embedding), answer, chunks in zip(to_answer, generated, retrieved):
+                    entry = {"answer": answer, "retrieved_chunks": chunks}
+                    cached_answers[cache_key] = entry
+                    new_entries.append(self._cache_entry(cache_key, document_id, question, entry))
+                    # With its key, so requests it serves are logged against this answer's cache row
+                    self.semantic_cache.add(scope, question, embedding, {**entry, "cache_key": cache_key})
+                # Postgres gets the new answers write-behind, with the query log below
+                self.answer_cache.remember_many(new_entries)
+            
+            cache_hits = sum(1 for cache_key in cache_keys if cache_key not in answered_keys)
+            answers = [cached_answers[cache_key]["answer"] for cache_key in cache_keys]
+            all_retrieved_chunks = [
+                {"question": question, "chunks": cached_answers[cache_key]["retrieved_chunks"]}
+                for question, cache_key in zip(questions, cache_keys)
+            ]
             
             processing_time = int((time.time() - start_time) * 1000)  # milliseconds
             
-            # Store results in PostgreSQL database
-            self._store_query_results(document_url, doc_name, questions, all_retrieved_chunks, answers, processing_time)
+            # Logged to PostgreSQL in the background, after the response
+            self.query_logger.log({
+                "document_id": document_id,
+                "document_url": document_url,
+                "document_name": doc_name,
+                "questions": questions,
+                "answers": answers,
+                "retrieved_chunks": [cached_answers[cache_key]["retrieved_chunks"] for cache_key in cache_keys],
+                "processing_time": processing_time,
+                "cache_keys": [cached_answers[cache_key].get("cache_key", cache_key) for cache_key in cache_keys],
+                "answer_cache_entries": new_entries
+            })
             
             return {
                 "answers": answers,
                 "retrieved_chunks": all_retrieved_chunks,
                 "processing_time": processing_time,
                 "document_name": doc_name,
-                "cached": False
+                "cached": cache_hits == len(questions),
+                "cache_hits": cache_hits
             }
             
         except Exception as e:
             logger.error(f"Error in RAG pipeline: {str(e)}")
             raise
     
-    def _store_query_results(self, document_url: str, document_name: str, questions: List[str], retrieved_chunks: List[Dict], answers: List[str], processing_time: int):
-        """Store query results in PostgreSQL database."""
-        db = SessionLocal()
-        try:
-            # Check if record already exists
-            existing_query = db.query(DocumentQuery).filter(
-                DocumentQuery.document_url == document_url
-            ).first()
+    async def _ensure_document(self, document_url: str) -> str:
+        """Return the document ID for a URL, joining any resolution of it already in flight."""
+        return await self._url_flights.run(
+            normalize_document_url(document_url), lambda: self._resolve_document(document_url)
+        )
+    
+    async def _resolve_document(self, document_url: str) -> str:
+        """Return the document ID for a URL, running ingestion only for new content.
+        
+        Known URLs (after normalisation) are revalidated with a conditional
+        request when the server gave validators, and resolve without any
+        transfer on a 304. Without validators the PDF is downloaded again and
+        its content hash decides whether it is still the known document; with
+        ``document_revalidation`` off, known URLs are trusted without a request.
+        Otherwise the PDF is downloaded and hashed; if that content was already
+        ingested under another URL, parsing, embedding and storage are skipped.
+        """
+        known = await asyncio.to_thread(self.document_registry.lookup, document_url)
+        if known and await asyncio.to_thread(self.vector_store.has_document, known["document_id"]):
+            if not settings.document_revalidation:
+                logger.info(f"Document already ingested as {known['document_id'][:12]}. Skipping download and storage.")
+                return known["document_id"]
             
-            if existing_query:
-                # Update existing record
-                existing_query.questions = questions
-                existing_query.retrieved_chunks = retrieved_chunks
-                existing_query.answers = answers
-                existing_query.processing_time = processing_time
+            download = await self.pdf_parser.download_pdf(
+                document_url, etag=known.get("etag"), last_modified=known.get("last_modified")
+            )
+            if download.not_modified:
+                logger.info(f"Document already ingested as {known['document_id'][:12]} and unchanged. Skipping storage.")
+                return known["document_id"]
+        else:
+            download = await self.pdf_parser.download_pdf(document_url)
+        
+        document_id = download.content_hash
+        try:
+            if await asyncio.to_thread(self.vector_store.has_document, document_id):
+                logger.info(f"Document content already ingested as {document_id[:12]}. Skipping parsing and storage.")
             else:
-                # Create new record
-                new_query = DocumentQuery(
-                    document_url=document_url,
-                    document_name=document_name,
-                    questions=questions,
-                    retrieved_chunks=retrieved_chunks,
-                    answers=answers,
-                    processing_time=processing_time
+                # Parse, chunk, embed and store as overlapping pipeline stages
+                logger.info("Ingesting document...")
+                await self._content_flights.run(
+                    document_id, lambda: self.ingestion.ingest(download.path, document_id)
                 )
-                db.add(new_query)
-            
-            db.commit()
-            logger.info("Query results stored in database")
-            
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error storing query results: {str(e)}")
         finally:
-            db.close()
+            os.unlink(download.path)
+        
+        entry = {"document_id": document_id, "etag": download.etag, "last_modified": download.last_modified}
+        if entry != known:
+            await asyncio.to_thread(
+                self.document_registry.record,
+                document_url, document_id, download.etag, download.last_modified
+            )
+        return document_id
+    
+    def _cache_entry(self, cache_key: str, document_id: str, question: str,
+                     entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer-cache row for a freshly answered (or semantically matched) question."""
+        return {
+            "cache_key": cache_key,
+            "document_id": document_id,
+            "question": question,
+            "model": self.llm_service.model,
+            "prompt_version": self.llm_service.prompt_version,
+            "answer": entry["answer"],
+            "retrieved_chunks": entry["retrieved_chunks"]
+        }
+    
+    async def _retrieve(self, question: str, question_embedding: np.ndarray, document_id: str,
+                        semaphore: asyncio.Semaphore) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Retrieve the context chunks for one question from this document only.
+        
+        Dense and BM25 results are fused when hybrid search is enabled. With
+        context assembly enabled, ``context_candidates`` chunks are retrieved
+        and deduplicated, diversified and trimmed to the token budget, and
+        their context's token count is returned with them (None otherwise).
+        """
+        async with semaphore:
+            if not settings.context_assembly_enabled:
+                chunks = await self.vector_store.search_hybrid(question, question_embedding, document_id=document_id)
+                return chunks, None
+            candidates = await self.vector_store.search_hybrid(
+                question, question_embedding,
+                top_k=max(settings.context_candidates, settings.top_k), document_id=document_id
+            )
+            return await self.context_assembler.assemble(question_embedding, candidates)
+    
+    async def _generate_answers(self, questions: List[str], retrieved: List[List[Dict[str, Any]]],
+                                semaphore: asyncio.Semaphore,
+                                on_answer: Optional[Callable[[int, str], None]] = None,
+                                on_token: Optional[Callable[[int, str], None]] = None) -> List[str]:
+        """Answer each question from its retrieved chunks, in question order.
+        
+        With batching enabled, questions whose chunks overlap are answered
+        together in one call over their merged context; any answer missing
+        from a batched response is regenerated with its own call.
+        ``on_answer(index, answer)`` is called as each answer completes, and
+        ``on_token(index, text)`` with the streamed output of single-question
+        calls (a batched call's JSON is not streamed).
+        """
+        answers: List[Optional[str]] = [None] * len(questions)
+        
+        def done(index: int, answer: str):
+            answers[index] = answer
+            if on_answer is not None:
+                on_answer(index, answer)
+        
+        async def answer_one(index: int):
+            async with semaphore:
+                stream = None if on_token is None else (lambda text: on_token(index, text))
+                answer = await self.llm_service.generate_answer(questions[index], retrieved[index], on_token=stream)
+            done(index, answer)
+        
+        async def answer_group(members: List[int]):
+            async with semaphore:
+                batch = await self.llm_service.generate_batch_answers(
+                    [questions[i] for i in members],
+                    merge_context([retrieved[i] for i in members])
+                )
+            for index, answer in zip(members, batch):
+                if answer is not None:
+                    done(index, answer)
+            missing = [index for index in members if answers[index] is None]
+            if missing:
+                logger.info(f"Falling back to single-question calls for {len(missing)}/{len(members)} questions")
+                await asyncio.gather(*[answer_one(index) for index in missing])
+        
+        if settings.llm_batch_enabled:
+            groups = group_questions(retrieved)
+            logger.info(f"Answering {len(questions)} questions in {len(groups)} groups")
+            await asyncio.gather(*[
+                answer_group(members) if len(members) > 1 else answer_one(members[0])
+                for members in groups
+            ])
+        else:
+            await asyncio.gather(*[answer_one(index) for index in range(len(questions))])
+        return answers
     
     def _extract_document_name(self, url: str) -> str:
         """Extract document name from URL."""
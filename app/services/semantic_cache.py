@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
+import threading
+import numpy as np
+from app.services.vector_backends.similarity import normalize
+from app.config.settings import settings
+from app.utils.logger import logger
+
+# Upper edges of the best-similarity histogram used to tune the threshold
+SIMILARITY_BUCKETS = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.925, 0.95, 0.975, 1.0]
+
+@dataclass
+class _DocumentEntries:
+    embeddings: np.ndarray  # (n, dim) float32, L2-normalised
+    questions: List[str] = field(default_factory=list)
+    entries: List[Dict[str, Any]] = field(default_factory=list)
+
+class SemanticCache:
+    """Reuses answers to differently-phrased questions about the same document.
+
+    Each answered question's embedding is kept per (document, model, prompt
+    version). A new question whose cosine similarity to a previous one is at
+    least ``threshold`` gets that question's answer without an LLM call.
+    Entries live in memory only, bounded per document and in document count.
+
+    When disabled the cache runs in shadow mode: lookups still record the
+    best-match similarity (and count would-be hits) so the threshold can be
+    tuned from ``stats``, but never serve an answer, and only embeddings and
+    questions are kept, not the answers.
+    """
+
+    def __init__(self, threshold: float = None, max_entries: int = None, max_documents: int = None,
+                 enabled: bool = None):
+        self.enabled = enabled if enabled is not None else settings.semantic_cache_enabled
+        self.threshold = threshold if threshold is not None else settings.semantic_cache_threshold
+        self.max_entries = max_entries or settings.semantic_cache_max_entries
+        self.max_documents = max_documents or settings.semantic_cache_max_documents
+        self._documents: "OrderedDict[Tuple[str, str, str], _DocumentEntries]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self._histogram = [0] * len(SIMILARITY_BUCKETS)
+
+    def lookup(self, scope: Tuple[str, str, str], question: str,
+               embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return the cached entry of the most similar earlier question, if above threshold (and enabled)."""
+        query = normalize(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            self.lookups += 1
+            document = self._documents.get(scope)
+            if document is None or not document.entries:
+                return None
+            self._documents.move_to_end(scope)
+
+            similarities = document.embeddings @ query
+            best = int(np.argmax(similarities))
+            score = float(similarities[best])
+            self._record_similarity(score)
+            if score < self.threshold:
+                return None
+
+            self.hits += 1
+            matched_question = document.questions[best]
+            entry = document.entries[best]
+
+        if not self.enabled:
+            logger.info(f"Semantic cache shadow hit ({score:.3f}): '{question[:50]}' ~ '{matched_question[:50]}'")
+            return None
+        logger.info(f"Semantic cache hit ({score:.3f}): '{question[:50]}' ~ '{matched_question[:50]}'")
+        return entry
+
+    def add(self, scope: Tuple[str, str, str], question: str, embedding: np.ndarray, entry: Dict[str, Any]):
+        """Remember an answered question for later similarity lookups (the entry only when enabled)."""
+        vector = normalize(np.asarray(embedding, dtype=np.float32))[None, :]
+        with self._lock:
+            document = self._documents.get(scope)
+            if document is None:
+                document = _DocumentEntries(embeddings=np.empty((0, vector.shape[1]), dtype=np.float32))
+                self._documents[scope] = document
+                while len(self._documents) > self.max_documents:
+                    self._documents.popitem(last=False)
+            self._documents.move_to_end(scope)
+
+            document.embeddings = np.vstack([document.embeddings, vector])[-self.max_entries:]
+            document.questions = (document.questions + [question])[-self.max_entries:]
+            document.entries = (document.entries + [entry if self.enabled else None])[-self.max_entries:]
+
+    def _record_similarity(self, score: float):
+        for i, upper in enumerate(SIMILARITY_BUCKETS):
+            if score <= upper or i == len(SIMILARITY_BUCKETS) - 1:
+                self._histogram[i] += 1
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate (would-be hits in shadow mode) and the distribution of best-match similarities seen."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "documents": len(self._documents),
+                "best_similarity_histogram": {
+                    f"<={upper}": count for upper, count in zip(SIMILARITY_BUCKETS, self._histogram)
+                }
+            }
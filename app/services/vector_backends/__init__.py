@@ -0,0 +1,15 @@
+from app.services.vector_backends.base import VectorBackend
+
+def create_backend(name: str) -> VectorBackend:
+    """Instantiate the vector backend configured by name.
+    
+    Backends are imported lazily so that, for example, the local backend
+    can run without the Pinecone client installed or configured.
+    """
+    if name == "pinecone":
+        from app.services.vector_backends.pinecone_backend import PineconeBackend
+        return PineconeBackend()
+    if name == "local":
+        from app.services.vector_backends.local_backend import LocalBackend
+        return LocalBackend()
+    raise ValueError(f"Unknown vector backend: {name}")
@@ -0,0 +1,61 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+@dataclass
+class UpsertSummary:
+    """What a store call wrote: chunk IDs plus request, payload and retry counts."""
+    chunk_ids: List[str] = field(default_factory=list)
+    vectors: int = 0
+    requests: int = 0
+    bytes: int = 0  # Estimated request payload size
+    retries: int = 0
+    seconds: float = 0.0
+    
+    def merge(self, other: "UpsertSummary"):
+        self.chunk_ids.extend(other.chunk_ids)
+        self.vectors += other.vectors
+        self.requests += other.requests
+        self.bytes += other.bytes
+        self.retries += other.retries
+        self.seconds += other.seconds
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "vectors": self.vectors,
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "seconds": round(self.seconds, 3)
+        }
+
+class VectorBackend(ABC):
+    """Storage and similarity search operations behind VectorStore."""
+    
+    # Whether store_batch can write part of a document before the rest is embedded
+    incremental = False
+    # Whether stored vectors outlive the local disk, so a lost manifest can be restored from the database
+    durable = True
+    
+    @abstractmethod
+    async def store_embeddings(self, chunks: List[str], embeddings: np.ndarray,
+                               document_id: str) -> UpsertSummary:
+        """Store chunk embeddings for a document and summarise what was written."""
+    
+    async def store_batch(self, chunks: List[str], embeddings: np.ndarray,
+                          document_id: str, start_index: int) -> UpsertSummary:
+        """Store chunks ``start_index``... of a document; only for incremental backends."""
+        raise NotImplementedError(f"{type(self).__name__} stores whole documents only")
+    
+    @abstractmethod
+    async def search_similar(self, query_embedding: np.ndarray, top_k: int,
+                             document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return the top_k most similar chunks, best match first.
+        
+        When document_id is given only that document's chunks are searched.
+        """
+    
+    @abstractmethod
+    async def get_document_chunks(self, document_id: str) -> List[Dict[str, Any]]:
+        """Return all chunks stored for a document, in document order."""
@@ -0,0 +1,236 @@
+from typing import List, Optional, Tuple
+import os
+import threading
+import numpy as np
+from app.services.vector_backends.similarity import normalize, top_k_indices
+from app.utils.logger import logger
+
+class IVFInt8Index:
+    """Inverted-file ANN index over int8 scalar-quantised vectors.
+
+    Vectors are L2-normalised and assigned to the nearest of ``nlist`` k-means
+    centroids. Each vector is stored as int8 codes plus one float32 scale
+    (~4x smaller than float32), and a search only scans the ``nprobe`` lists
+    whose centroids are closest to the query. Until ``train_size`` vectors
+    have been added the index has no centroids and searches its pending
+    buffer exactly, so it can be fed incrementally from the first document.
+    """
+
+    def __init__(self, dim: int, nlist: int = 256, nprobe: int = 8, train_size: int = 10000,
+                 kmeans_iterations: int = 10, seed: int = 0):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = max(train_size, nlist)
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        # Per-list storage; each entry is a list of blocks merged lazily on search
+        self._codes: List[List[np.ndarray]] = []
+        self._scales: List[List[np.ndarray]] = []
+        self._ids: List[List[np.ndarray]] = []
+        # Full-precision vectors waiting for training
+        self._pending_vectors: List[np.ndarray] = []
+        self._pending_ids: List[np.ndarray] = []
+        # Inserts may run on a worker thread while searches run elsewhere
+        self._lock = threading.RLock()
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        pending = sum(len(ids) for ids in self._pending_ids)
+        stored = sum(len(block) for blocks in self._ids for block in blocks)
+        return pending + stored
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        """Insert vectors with caller-assigned int64 ids."""
+        vectors = normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(vectors) == 0:
+            return
+
+        with self._lock:
+            if self.is_trained:
+                self._assign(vectors, ids)
+                return
+
+            self._pending_vectors.append(vectors)
+            self._pending_ids.append(ids)
+            if sum(len(block) for block in self._pending_ids) >= self.train_size:
+                self._train()
+
+    def remove(self, id_filter) -> int:
+        """Drop the vectors whose ids ``id_filter`` (ids -> boolean mask) selects; return how many."""
+        removed = 0
+        with self._lock:
+            for i, ids in enumerate(self._pending_ids):
+                keep = ~id_filter(ids)
+                removed += int(len(ids) - keep.sum())
+                self._pending_vectors[i], self._pending_ids[i] = self._pending_vectors[i][keep], ids[keep]
+            for list_no in range(len(self._ids)):
+                if not self._ids[list_no]:
+                    continue
+                codes, scales, ids = self._merged_list(list_no)
+                keep = ~id_filter(ids)
+                if keep.all():
+                    continue
+                removed += int(len(ids) - keep.sum())
+                self._codes[list_no] = [codes[keep]] if keep.any() else []
+                self._scales[list_no] = [scales[keep]] if keep.any() else []
+                self._ids[list_no] = [ids[keep]] if keep.any() else []
+        return removed
+
+    def all_ids(self) -> np.ndarray:
+        """Every id in the index (pending and stored), in no particular order."""
+        with self._lock:
+            blocks = list(self._pending_ids) + [block for blocks in self._ids for block in blocks]
+        return np.concatenate(blocks) if blocks else np.empty(0, dtype=np.int64)
+
+    def search(self, query: np.ndarray, k: int, nprobe: int = None,
+               id_filter=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, ids) of the approximate top-k, best first.
+
+        ``id_filter`` optionally maps an array of ids to a boolean mask of the
+        ids that may be returned.
+        """
+        query = normalize(np.asarray(query, dtype=np.float32).reshape(self.dim))
+        scores_parts, ids_parts = [], []
+
+        with self._lock:
+            if self._pending_ids:
+                vectors = np.concatenate(self._pending_vectors)
+                ids = np.concatenate(self._pending_ids)
+                scores_parts.append(vectors @ query)
+                ids_parts.append(ids)
+
+            if self.is_trained:
+                probe = min(nprobe or self.nprobe, self.nlist)
+                centroid_scores = self.centroids @ query
+                for list_no in top_k_indices(centroid_scores, probe):
+                    if not self._ids[list_no]:
+                        continue
+                    codes, scales, ids = self._merged_list(list_no)
+                    scores_parts.append((codes.astype(np.float32) @ query) * scales)
+                    ids_parts.append(ids)
+
+        if not ids_parts:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        scores = np.concatenate(scores_parts)
+        ids = np.concatenate(ids_parts)
+        if id_filter is not None:
+            mask = id_filter(ids)
+            scores, ids = scores[mask], ids[mask]
+        order = top_k_indices(scores, k)
+        return scores[order], ids[order]
+
+    def save(self, path: str):
+        """Persist the index to a single .npz file (written atomically)."""
+        with self._lock:
+            lists = [self._merged_list(i) for i in range(len(self._ids))]
+            pending_vectors = list(self._pending_vectors)
+            pending_ids = list(self._pending_ids)
+            centroids = self.centroids
+        list_sizes = np.array([len(ids) for _, _, ids in lists], dtype=np.int64)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                params=np.array([self.dim, self.nlist, self.nprobe, self.train_size], dtype=np.int64),
+                centroids=centroids if centroids is not None else np.empty((0, self.dim), np.float32),
+                codes=np.concatenate([c for c, _, _ in lists]) if lists else np.empty((0, self.dim), np.int8),
+                scales=np.concatenate([s for _, s, _ in lists]) if lists else np.empty(0, np.float32),
+                ids=np.concatenate([i for _, _, i in lists]) if lists else np.empty(0, np.int64),
+                list_sizes=list_sizes,
+                pending_vectors=np.concatenate(pending_vectors) if pending_vectors
+                else np.empty((0, self.dim), np.float32),
+                pending_ids=np.concatenate(pending_ids) if pending_ids
+                else np.empty(0, np.int64)
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, nprobe: int = None) -> "IVFInt8Index":
+        """Load an index previously written by ``save``."""
+        with np.load(path) as data:
+            dim, nlist, saved_nprobe, train_size = (int(v) for v in data["params"])
+            index = cls(dim, nlist=nlist, nprobe=nprobe or saved_nprobe, train_size=train_size)
+            if len(data["centroids"]):
+                index.centroids = data["centroids"]
+                offsets = np.concatenate([[0], np.cumsum(data["list_sizes"])])
+                codes, scales, ids = data["codes"], data["scales"], data["ids"]
+                for start, end in zip(offsets[:-1], offsets[1:]):
+                    index._codes.append([codes[start:end]] if end > start else [])
+                    index._scales.append([scales[start:end]] if end > start else [])
+                    index._ids.append([ids[start:end]] if end > start else [])
+            if len(data["pending_ids"]):
+                index._pending_vectors = [data["pending_vectors"]]
+                index._pending_ids = [data["pending_ids"]]
+        return index
+
+    def _train(self):
+        """Fit k-means centroids on the pending buffer and move it into the lists."""
+        vectors = np.concatenate(self._pending_vectors)
+        ids = np.concatenate(self._pending_ids)
+        self._pending_vectors, self._pending_ids = [], []
+
+        # k-means converges well on ~64 points per list; more only slows training
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), self.nlist * 64)
+        sample = vectors[rng.choice(len(vectors), size=sample_size, replace=False)]
+
+        logger.info(f"Training IVF index: {self.nlist} lists on {sample_size} vectors")
+        self.centroids = _spherical_kmeans(sample, self.nlist, self.kmeans_iterations, self.seed)
+        self._codes = [[] for _ in range(self.nlist)]
+        self._scales = [[] for _ in range(self.nlist)]
+        self._ids = [[] for _ in range(self.nlist)]
+        self._assign(vectors, ids)
+
+    def _assign(self, vectors: np.ndarray, ids: np.ndarray):
+        """Quantise vectors and append them to their nearest centroid's list."""
+        assignments = np.argmax(vectors @ self.centroids.T, axis=1)
+        codes, scales = _quantize(vectors)
+        order = np.argsort(assignments, kind="stable")
+        boundaries = np.flatnonzero(np.diff(assignments[order])) + 1
+        for group in np.split(order, boundaries):
+            list_no = int(assignments[group[0]])
+            self._codes[list_no].append(codes[group])
+            self._scales[list_no].append(scales[group])
+            self._ids[list_no].append(ids[group])
+
+    def _merged_list(self, list_no: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return one inverted list as contiguous arrays, merging pending blocks."""
+        if not self._ids[list_no]:
+            return (np.empty((0, self.dim), np.int8), np.empty(0, np.float32),
+                    np.empty(0, np.int64))
+        if len(self._ids[list_no]) > 1:
+            self._codes[list_no] = [np.concatenate(self._codes[list_no])]
+            self._scales[list_no] = [np.concatenate(self._scales[list_no])]
+            self._ids[list_no] = [np.concatenate(self._ids[list_no])]
+        return self._codes[list_no][0], self._scales[list_no][0], self._ids[list_no][0]
+
+def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8 quantisation: v ~= codes * scale."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+def _spherical_kmeans(vectors: np.ndarray, k: int, iterations: int, seed: int) -> np.ndarray:
+    """Lloyd's k-means on the unit sphere (cosine assignment)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=k)
+        empty = counts == 0
+        # Re-seed empty clusters with random points so every list stays useful
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = normalize(sums)
+    return centroids
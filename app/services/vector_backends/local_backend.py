@@ -0,0 +1,318 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Dict, Any, Optional, Tuple
+import asyncio
+import json
+import os
+import time
+import numpy as np
+from app.services.vector_backends.base import UpsertSummary, VectorBackend
+from app.services.vector_backends.ivf_index import IVFInt8Index
+from app.services.vector_backends.similarity import normalize, top_k_indices
+from app.config.settings import settings
+from app.utils.documents import chunk_id, document_key
+from app.utils.logger import logger
+
+# ANN ids pack the document ordinal into the high bits and the row into the low bits
+ROW_BITS = 32
+ROW_MASK = (1 << ROW_BITS) - 1
+
+@dataclass
+class LocalDocument:
+    document_id: str
+    ordinal: int
+    chunks: List[str]
+    chunk_ids: List[str]
+    embeddings: np.ndarray  # (n_chunks, dim) float32, L2-normalised
+
+class LocalBackend(VectorBackend):
+    """In-process vector store holding one float32 matrix per document.
+
+    Embeddings are L2-normalised on write so cosine similarity is a single
+    matrix-vector product. Each document is persisted as a ``.npy`` matrix,
+    loaded memory-mapped on startup, next to a JSON file with its chunk texts.
+
+    With ``local_index_type="ivf"`` corpus-wide searches, and searches within
+    documents larger than ``ivf_exact_threshold`` chunks, go through an int8
+    IVF index instead of scanning every matrix; the memory-mapped float32 rows
+    are then only touched to re-score the ANN candidates exactly. The index
+    file is a snapshot, rewritten only once ``ivf_snapshot_ratio`` of the index
+    has changed since the last one: documents stored after it are re-added
+    from their matrices on startup, and replaced versions are dropped.
+    """
+
+    # Vectors live in the local data directory, lost along with the manifests
+    durable = False
+
+    def __init__(self, data_dir: str = None):
+        self.data_dir = Path(data_dir or settings.local_vector_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.documents: Dict[str, LocalDocument] = {}
+        self._by_ordinal: Dict[int, LocalDocument] = {}
+        # Ordinals only ever increase, so stale ANN ids never point at a newer document
+        self._next_ordinal = 0
+        self._load_documents()
+
+        self.index: Optional[IVFInt8Index] = None
+        self._unsaved_vectors = 0  # index changes since the last snapshot
+        if settings.local_index_type == "ivf":
+            self.index = self._load_index()
+        elif settings.local_index_type != "flat":
+            raise ValueError(f"Unknown local index type: {settings.local_index_type}")
+
+    @property
+    def _index_path(self) -> Path:
+        return self.data_dir / "ivf_index.npz"
+
+    def _load_documents(self):
+        """Memory-map every document persisted in the data directory."""
+        unnumbered = []
+        for meta_path in self.data_dir.glob("*.json"):
+            matrix_path = meta_path.with_suffix(".npy")
+            if not matrix_path.exists():
+                continue
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                document = LocalDocument(
+                    document_id=meta["document_id"],
+                    ordinal=meta.get("ordinal", -1),
+                    chunks=meta["chunks"],
+                    chunk_ids=meta["chunk_ids"],
+                    embeddings=np.load(matrix_path, mmap_mode="r")
+                )
+            except Exception as e:
+                logger.error(f"Skipping unreadable local vectors {meta_path.name}: {str(e)}")
+                continue
+            if document.ordinal < 0:
+                unnumbered.append(document)
+            else:
+                self._register(document)
+        self._next_ordinal = max(self._by_ordinal, default=-1) + 1
+        # Numbered after every stored ordinal rather than by position, which could collide
+        for document in unnumbered:
+            document.ordinal = self._take_ordinal()
+            self._register(document)
+        logger.info(f"Loaded {len(self.documents)} documents from {self.data_dir}")
+
+    def _load_index(self) -> IVFInt8Index:
+        """Load the IVF index snapshot and bring it up to date with the stored documents."""
+        index = None
+        if self._index_path.exists():
+            try:
+                index = IVFInt8Index.load(str(self._index_path), nprobe=settings.ivf_nprobe)
+                logger.info(f"Loaded IVF index with {len(index)} vectors")
+            except Exception as e:
+                logger.error(f"Rebuilding unreadable IVF index: {str(e)}")
+        if index is None:
+            index = IVFInt8Index(
+                dim=settings.embedding_dimension,
+                nlist=settings.ivf_nlist,
+                nprobe=settings.ivf_nprobe,
+                train_size=settings.ivf_train_size
+            )
+
+        indexed = set(np.unique(index.all_ids() >> ROW_BITS).tolist())
+        self._next_ordinal = max(self._next_ordinal, max(indexed, default=-1) + 1)
+        # Versions replaced since the snapshot, and documents stored after it
+        removed = index.remove(_ordinal_filter(indexed - set(self._by_ordinal)))
+        added = 0
+        for document in self.documents.values():
+            if document.ordinal not in indexed:
+                index.add(np.asarray(document.embeddings), _ann_ids(document))
+                added += len(document.chunks)
+        if removed or added:
+            index.save(str(self._index_path))
+            logger.info(f"Updated IVF index snapshot: {added} vectors added, {removed} removed")
+        return index
+
+    def _take_ordinal(self) -> int:
+        ordinal = self._next_ordinal
+        self._next_ordinal += 1
+        return ordinal
+
+    def _register(self, document: LocalDocument):
+        previous = self.documents.get(document.document_id)
+        if previous is not None:
+            # Stale ANN entries of the old version are filtered out by ordinal
+            self._by_ordinal.pop(previous.ordinal, None)
+        self.documents[document.document_id] = document
+        self._by_ordinal[document.ordinal] = document
+
+    def _document_path(self, document_id: str) -> Path:
+        return self.data_dir / document_key(document_id)
+
+    def _persist(self, document: LocalDocument) -> np.ndarray:
+        """Write a document to disk atomically and return its memory-mapped matrix."""
+        base_path = self._document_path(document.document_id)
+        matrix_path = base_path.with_suffix(".npy")
+        meta_path = base_path.with_suffix(".json")
+
+        tmp_matrix = base_path.with_suffix(".npy.tmp")
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, document.embeddings)
+        os.replace(tmp_matrix, matrix_path)
+
+        tmp_meta = base_path.with_suffix(".json.tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({
+                "document_id": document.document_id,
+                "ordinal": document.ordinal,
+                "chunks": document.chunks,
+                "chunk_ids": document.chunk_ids
+            }, f)
+        os.replace(tmp_meta, meta_path)
+
+        return np.load(matrix_path, mmap_mode="r")
+
+    def _index_document(self, document: LocalDocument, matrix: np.ndarray):
+        """Insert a document into the IVF index, dropping its previous version, and snapshot if due."""
+        changed = 0
+        previous = self.documents.get(document.document_id)
+        if previous is not None:
+            changed += self.index.remove(_ordinal_filter([previous.ordinal]))
+        self.index.add(matrix, _ann_ids(document))
+        changed += len(matrix)
+
+        # The document's matrix is already on disk, so a missed snapshot is
+        # caught up on startup; rewriting the whole file per insert would be O(N)
+        self._unsaved_vectors += changed
+        if self._unsaved_vectors >= settings.ivf_snapshot_ratio * len(self.index):
+            self.index.save(str(self._index_path))
+            self._unsaved_vectors = 0
+
+    async def store_embeddings(self, chunks: List[str], embeddings: np.ndarray,
+                               document_id: str) -> UpsertSummary:
+        """Store embeddings for a document, replacing any previous version."""
+        try:
+            start_time = time.time()
+            matrix = normalize(np.asarray(embeddings, dtype=np.float32))
+            chunk_ids = [chunk_id(document_id, i) for i in range(len(chunks))]
+            document = LocalDocument(
+                document_id=document_id,
+                ordinal=self._take_ordinal(),
+                chunks=list(chunks),
+                chunk_ids=chunk_ids,
+                embeddings=matrix
+            )
+            document.embeddings = await asyncio.to_thread(self._persist, document)
+            if self.index is not None:
+                await asyncio.to_thread(self._index_document, document, matrix)
+            self._register(document)
+
+            logger.info(f"Stored {len(chunk_ids)} embeddings locally")
+            return UpsertSummary(
+                chunk_ids=chunk_ids,
+                vectors=len(chunk_ids),
+                requests=1,
+                bytes=matrix.nbytes,
+                seconds=time.time() - start_time
+            )
+
+        except Exception as e:
+            logger.error(f"Error storing embeddings: {str(e)}")
+            raise
+
+    async def search_similar(self, query_embedding: np.ndarray, top_k: int,
+                             document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Cosine top-k over one or all stored documents (exact, or IVF with exact re-scoring)."""
+        try:
+            query = normalize(np.asarray(query_embedding, dtype=np.float32))
+
+            if document_id is not None:
+                document = self.documents.get(document_id)
+                if document is None:
+                    candidates = []
+                elif self.index is not None and len(document.chunks) > settings.ivf_exact_threshold:
+                    candidates = await asyncio.to_thread(
+                        self._search_index, query, top_k, [document.ordinal]
+                    )
+                    if len(candidates) < min(top_k, len(document.chunks)):
+                        # The probed lists held too few of this document's chunks
+                        candidates = await asyncio.to_thread(_search_document, document, query, top_k)
+                else:
+                    candidates = _search_document(document, query, top_k)
+            elif self.index is not None:
+                candidates = await asyncio.to_thread(self._search_index, query, top_k)
+            else:
+                candidates = self._search_flat(query, top_k)
+
+            retrieved_chunks = [
+                {
+                    "text": document.chunks[row],
+                    "score": score,
+                    "document_id": document.document_id,
+                    "chunk_index": row
+                }
+                for score, document, row in candidates
+            ]
+
+            logger.info(f"Retrieved {len(retrieved_chunks)} similar chunks")
+            return retrieved_chunks
+
+        except Exception as e:
+            logger.error(f"Error searching vectors: {str(e)}")
+            raise
+
+    def _search_flat(self, query: np.ndarray, top_k: int) -> List[Tuple[float, LocalDocument, int]]:
+        candidates = []
+        for document in list(self.documents.values()):
+            candidates.extend(_search_document(document, query, top_k))
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        return candidates[:top_k]
+
+    def _search_index(self, query: np.ndarray, top_k: int,
+                      ordinals: Optional[List[int]] = None) -> List[Tuple[float, LocalDocument, int]]:
+        if ordinals is None:
+            ordinals = list(self._by_ordinal)
+        rerank = settings.ivf_rerank_factor > 1
+        depth = top_k * settings.ivf_rerank_factor if rerank else top_k
+        id_filter = _ordinal_filter(ordinals)
+        scores, ids = self.index.search(query, depth, id_filter=id_filter)
+        if len(ids) < min(top_k, len(self.index)) and self.index.nprobe < self.index.nlist:
+            # Too few live candidates in the probed lists: probe them all
+            scores, ids = self.index.search(query, depth, nprobe=self.index.nlist, id_filter=id_filter)
+
+        candidates = []
+        for score, ann_id in zip(scores, ids):
+            document = self._by_ordinal.get(int(ann_id) >> ROW_BITS)
+            if document is None:
+                # Replaced by a newer version while this search ran
+                continue
+            row = int(ann_id) & ROW_MASK
+            if rerank:
+                # Re-score against the full-precision row to undo quantisation error
+                score = document.embeddings[row] @ query
+            candidates.append((float(score), document, row))
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        return candidates[:top_k]
+
+    async def get_document_chunks(self, document_id: str) -> List[Dict[str, Any]]:
+        """Return all chunks stored for a document, in document order."""
+        document = self.documents.get(document_id)
+        if document is None:
+            return []
+        return [
+            {
+                "text": text,
+                "document_id": document_id,
+                "chunk_index": i,
+                "chunk_id": stored_id
+            }
+            for i, (text, stored_id) in enumerate(zip(document.chunks, document.chunk_ids))
+        ]
+
+def _search_document(document: LocalDocument, query: np.ndarray,
+                     top_k: int) -> List[Tuple[float, LocalDocument, int]]:
+    """Exact top-k within a single document's matrix."""
+    scores = document.embeddings @ query
+    return [(float(scores[row]), document, int(row)) for row in top_k_indices(scores, top_k)]
+
+def _ordinal_filter(ordinals) -> Callable[[np.ndarray], np.ndarray]:
+    """ANN id filter selecting the ids of the given document ordinals."""
+    ordinals = np.asarray(list(ordinals), dtype=np.int64)
+    return lambda ids: np.isin(ids >> ROW_BITS, ordinals)
+
+def _ann_ids(document: LocalDocument) -> np.ndarray:
+    rows = np.arange(len(document.chunks), dtype=np.int64)
+    return (np.int64(document.ordinal) << ROW_BITS) | rows
@@ -0,0 +1,196 @@
+from pinecone import Pinecone, ServerlessSpec
+from typing import List, Dict, Any, Optional, Tuple
+from app.services.vector_backends.base import UpsertSummary, VectorBackend
+from app.config.settings import settings
+from app.utils.documents import chunk_id, document_key
+from app.utils.logger import logger
+import asyncio
+import numpy as np
+import random
+import time
+
+# Rough JSON size of one float in an upsert request, and of a vector's id/keys
+BYTES_PER_VALUE = 20
+VECTOR_OVERHEAD_BYTES = 200
+
+class PineconeBackend(VectorBackend):
+    def __init__(self):
+        if not settings.pinecone_api_key:
+            raise ValueError("No Pinecone API key found")
+        
+        # Initialize Pinecone client
+        self.pc = Pinecone(api_key=settings.pinecone_api_key)
+        self.index_name = settings.pinecone_index_name
+        
+        # Check if index exists before creating
+        existing_indexes = self.pc.list_indexes()
+        index_names = [index['name'] for index in existing_indexes]
+        
+        if self.index_name not in index_names:
+            logger.info(f"Creating Pinecone index: {self.index_name}")
+            self.pc.create_index(
+                name=self.index_name,
+                dimension=settings.embedding_dimension,
+                metric="cosine",
+                spec=ServerlessSpec(
+                    cloud="aws",
+                    region="us-east-1"
+                )
+            )
+            # Wait for index to be ready
+            time.sleep(3)
+        
+        self.index = self.pc.Index(self.index_name)
+        # Bounds concurrent upsert requests across all documents being ingested
+        self._upsert_slots = asyncio.Semaphore(settings.upsert_concurrency)
+    
+    incremental = True
+    
+    async def store_embeddings(self, chunks: List[str], embeddings: np.ndarray, 
+                               document_id: str) -> UpsertSummary:
+        """Store embeddings in Pinecone, in a namespace dedicated to the document."""
+        return await self.store_batch(chunks, embeddings, document_id, 0)
+    
+    async def store_batch(self, chunks: List[str], embeddings: np.ndarray,
+                          document_id: str, start_index: int) -> UpsertSummary:
+        """Upsert part of a document; IDs continue from start_index.
+        
+        Vectors are grouped into requests by estimated payload size (chunk text
+        dominates it) and the requests are sent concurrently, each retried
+        with exponential backoff on failure.
+        """
+        start_time = time.time()
+        namespace = document_key(document_id)
+        vectors = []
+        chunk_ids = []
+        
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings), start=start_index):
+            vector_id = chunk_id(document_id, i)
+            chunk_ids.append(vector_id)
+            
+            vectors.append({
+                "id": vector_id,
+                # The client serialises plain lists; convert only here
+                "values": embedding.tolist(),
+                "metadata": {
+                    "chunk_text": chunk,
+                    "document_id": document_id,
+                    "chunk_index": i
+                }
+            })
+        
+        batches = _size_batches(vectors)
+        results = await asyncio.gather(
+            *[self._upsert_with_retry(batch, namespace) for batch, _ in batches],
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            logger.error(f"Error storing embeddings: {len(errors)}/{len(batches)} upsert requests failed: {str(errors[0])}")
+            raise errors[0]
+        
+        summary = UpsertSummary(
+            chunk_ids=chunk_ids,
+            vectors=len(vectors),
+            requests=len(batches),
+            bytes=sum(size for _, size in batches),
+            retries=sum(results),
+            seconds=time.time() - start_time
+        )
+        logger.info(
+            f"Stored {len(vectors)} embeddings in Pinecone with {summary.requests} requests "
+            f"(~{summary.bytes / 1024:.0f} KiB, {summary.retries} retries) in {summary.seconds:.2f}s"
+        )
+        return summary
+    
+    async def _upsert_with_retry(self, batch: List[Dict[str, Any]], namespace: str) -> int:
+        """Upsert one request's vectors, returning how many retries it needed."""
+        for attempt in range(settings.upsert_max_retries + 1):
+            try:
+                async with self._upsert_slots:
+                    await asyncio.to_thread(self.index.upsert, vectors=batch, namespace=namespace)
+                return attempt
+            except Exception as e:
+                if attempt == settings.upsert_max_retries:
+                    raise
+                delay = settings.upsert_retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning(f"Upsert of {len(batch)} vectors failed ({str(e)}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+    
+    async def search_similar(self, query_embedding: np.ndarray, top_k: int,
+                             document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Search for similar vectors, scoped to the document's namespace when given."""
+        try:
+            results = await asyncio.to_thread(
+                self.index.query,
+                vector=np.asarray(query_embedding, dtype=np.float32).tolist(),
+                top_k=top_k,
+                include_metadata=True,
+                namespace=document_key(document_id) if document_id else ""
+            )
+            
+            retrieved_chunks = []
+            for match in results.matches:
+                retrieved_chunks.append({
+                    "text": match.metadata["chunk_text"],
+                    "score": float(match.score),
+                    "document_id": match.metadata["document_id"],
+                    "chunk_index": match.metadata["chunk_index"]
+                })
+            
+            logger.info(f"Retrieved {len(retrieved_chunks)} similar chunks")
+            return retrieved_chunks
+            
+        except Exception as e:
+            logger.error(f"Error searching vectors: {str(e)}")
+            raise
+
+    async def get_document_chunks(self, document_id: str) -> List[Dict[str, Any]]:
+        """Retrieve all chunks for a specific document from its Pinecone namespace."""
+        try:
+            document_chunks = await asyncio.to_thread(self._list_namespace, document_key(document_id))
+            
+            # Sort by chunk_index to maintain document order
+            document_chunks.sort(key=lambda x: x["chunk_index"])
+            
+            logger.info(f"Retrieved {len(document_chunks)} chunks for document: {document_id}")
+            return document_chunks
+            
+        except Exception as e:
+            logger.error(f"Error retrieving document chunks for {document_id}: {str(e)}")
+            # Return empty list if no chunks found or error occurs
+            return []
+    
+    def _list_namespace(self, namespace: str) -> List[Dict[str, Any]]:
+        """List every vector ID in a namespace and fetch their metadata page by page."""
+        document_chunks = []
+        for ids in self.index.list(namespace=namespace):
+            response = self.index.fetch(ids=list(ids), namespace=namespace)
+            for vector_id, vector in response.vectors.items():
+                document_chunks.append({
+                    "text": vector.metadata["chunk_text"],
+                    "document_id": vector.metadata["document_id"],
+                    "chunk_index": vector.metadata["chunk_index"],
+                    "chunk_id": vector_id
+                })
+        return document_chunks
+
+def _size_batches(vectors: List[Dict[str, Any]]) -> List[Tuple[List[Dict[str, Any]], int]]:
+    """Group vectors into upsert requests bounded by estimated bytes and vector count."""
+    batches = []
+    batch, batch_bytes = [], 0
+    for vector in vectors:
+        size = (
+            len(vector["values"]) * BYTES_PER_VALUE
+            + len(vector["metadata"]["chunk_text"].encode("utf-8"))
+            + VECTOR_OVERHEAD_BYTES
+        )
+        if batch and (batch_bytes + size > settings.upsert_max_batch_bytes
+                      or len(batch) >= settings.upsert_max_batch_vectors):
+            batches.append((batch, batch_bytes))
+            batch, batch_bytes = [], 0
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        batches.append((batch, batch_bytes))
+    return batches
@@ -0,0 +1,13 @@
+import numpy as np
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalise a vector or the rows of a matrix."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, highest first."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    indices = np.argpartition(-scores, k - 1)[:k]
+    return indices[np.argsort(-scores[indices])]
@@ -1,133 +1,169 @@
-from pinecone import Pinecone, ServerlessSpec
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import time
+import numpy as np
+from app.services.chunk_manifest import ChunkManifestStore
+from app.services.document_store import DocumentStore
+from app.services.lexical_index import BM25Index, LexicalIndexStore, reciprocal_rank_fusion
+from app.services.vector_backends import create_backend
+from app.services.vector_backends.base import UpsertSummary
 from app.config.settings import settings
 from app.utils.logger import logger
-import uuid
-import time
 
 class VectorStore:
+    """Facade over the configured vector backend (Pinecone or local)."""
+    
     def __init__(self):
-        # Initialize Pinecone client
-        self.pc = Pinecone(api_key=settings.pinecone_api_key)
-        self.index_name = settings.pinecone_index_name
+        logger.info(f"Initializing vector backend: {settings.vector_backend}")
+        self.backend = create_backend(settings.vector_backend)
+        self.manifests = ChunkManifestStore()
+        self.lexical = LexicalIndexStore()
+        self.documents = DocumentStore()
+    
+    def has_document(self, document_id: str) -> bool:
+        """Check whether a document's chunks have been stored (blocking: may query the database)."""
+        return self._manifest(document_id) is not None
+    
+    def _manifest(self, document_id: str) -> Optional[List[Dict[str, Any]]]:
+        """The document's chunk manifest, restored from the database when the local one is missing."""
+        chunks = self.manifests.get(document_id)
+        if chunks is None and self.backend.durable:
+            # A fresh local disk (restart, another instance): one primary-key range scan of chunks
+            chunks = self.documents.get_chunks(document_id)
+            if chunks:
+                self.manifests.put(document_id, chunks)
+                logger.info(f"Restored chunk manifest for document {document_id[:12]} from the database")
+        return chunks
+    
+    async def store_embeddings(self, chunks: List[str], embeddings: np.ndarray, 
+                               document_id: str) -> UpsertSummary:
+        """Store chunk embeddings for a document and record its chunk manifest."""
+        summary = await self.backend.store_embeddings(chunks, embeddings, document_id)
+        await self._write_manifest(document_id, chunks, summary.chunk_ids)
+        return summary
+    
+    def open_writer(self, document_id: str) -> "DocumentWriter":
+        """Start an incremental, batch-by-batch ingestion of a document."""
+        return DocumentWriter(self, document_id)
+    
+    async def _write_manifest(self, document_id: str, chunks: List[str], chunk_ids: List[str]):
+        manifest = [
+            {
+                "text": chunk,
+                "document_id": document_id,
+                "chunk_index": i,
+                "chunk_id": chunk_id
+            }
+            for i, (chunk, chunk_id) in enumerate(zip(chunks, chunk_ids))
+        ]
+        if settings.hybrid_search_enabled:
+            # Before the manifest, which is what marks the document as ingested
+            start_time = time.time()
+            await asyncio.to_thread(self.lexical.put, document_id, chunks)
+            logger.info(f"Built lexical index for {len(chunks)} chunks in {time.time() - start_time:.3f} seconds")
+        await asyncio.to_thread(self.documents.put, document_id, manifest)
+        await asyncio.to_thread(self.manifests.put, document_id, manifest)
+    
+    async def search_similar(self, query_embedding: np.ndarray, top_k: int = None,
+                             document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Search for similar vectors, optionally within a single document."""
+        top_k = top_k or settings.top_k
+        return await self.backend.search_similar(query_embedding, top_k, document_id)
+    
+    async def search_hybrid(self, query_text: str, query_embedding: np.ndarray, top_k: int = None,
+                            document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Fuse dense and BM25 results for a question with reciprocal rank fusion.
         
-        # Check if index exists before creating
-        existing_indexes = self.pc.list_indexes()
-        index_names = [index['name'] for index in existing_indexes]
+        Each retriever contributes its best ``hybrid_candidates`` chunks. Without
+        a document (or with hybrid search disabled) this is a plain dense search.
+        """
+        top_k = top_k or settings.top_k
+        if document_id is None or not settings.hybrid_search_enabled:
+            return await self.search_similar(query_embedding, top_k=top_k, document_id=document_id)
         
-        if self.index_name not in index_names:
-            logger.info(f"Creating Pinecone index: {self.index_name}")
-            self.pc.create_index(
-                name=self.index_name,
-                dimension=384,
-                metric="cosine",
-                spec=ServerlessSpec(
-                    cloud="aws",
-                    region="us-east-1"
-                )
-            )
-            # Wait for index to be ready
-            time.sleep(3)
+        depth = max(settings.hybrid_candidates, top_k)
+        dense, (index, chunks) = await asyncio.gather(
+            self.backend.search_similar(query_embedding, depth, document_id),
+            asyncio.to_thread(self._lexical_index, document_id)
+        )
+        if index is None:
+            return dense[:top_k]
         
-        self.index = self.pc.Index(self.index_name)
+        scores, rows = index.search(query_text, depth)
+        lexical = [
+            {
+                "text": chunks[row]["text"],
+                "score": float(score),
+                "document_id": document_id,
+                "chunk_index": chunks[row]["chunk_index"]
+            }
+            for score, row in zip(scores, rows)
+        ]
+        logger.info(f"Hybrid retrieval: {len(dense)} dense and {len(lexical)} lexical candidates")
+        return reciprocal_rank_fusion([dense, lexical], top_k)
     
-    def store_embeddings(self, chunks: List[str], embeddings: List[List[float]], 
-                        document_url: str) -> List[str]:
-        """Store embeddings in Pinecone."""
-        try:
-            vectors = []
-            chunk_ids = []
-            
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                chunk_id = f"{document_url}_{i}_{uuid.uuid4().hex[:8]}"
-                chunk_ids.append(chunk_id)
-                
-                vectors.append({
-                    "id": chunk_id,
-                    "values": embedding,
-                    "metadata": {
-                        "chunk_text": chunk,
-                        "document_url": document_url,
-                        "chunk_index": i
-                    }
-                })
-            
-            # Upsert in batches
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
-            
-            logger.info(f"Stored {len(vectors)} embeddings in Pinecone")
-            return chunk_ids
-            
-        except Exception as e:
-            logger.error(f"Error storing embeddings: {str(e)}")
-            raise
+    def _lexical_index(self, document_id: str) -> Tuple[Optional[BM25Index], List[Dict[str, Any]]]:
+        """The document's BM25 index and manifest, building the index for documents ingested without one."""
+        chunks = self._manifest(document_id)
+        if not chunks:
+            return None, []
+        index = self.lexical.get(document_id)
+        if index is None:
+            index = self.lexical.put(document_id, [chunk["text"] for chunk in chunks])
+        return index, chunks
     
-    def search_similar(self, query_embedding: List[float], top_k: int = None) -> List[Dict[str, Any]]:
-        """Search for similar vectors."""
-        try:
-            top_k = top_k or settings.top_k
-            
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True
-            )
-            
-            retrieved_chunks = []
-            for match in results.matches:
-                retrieved_chunks.append({
-                    "text": match.metadata["chunk_text"],
-                    "score": float(match.score),
-                    "document_url": match.metadata["document_url"],
-                    "chunk_index": match.metadata["chunk_index"]
-                })
-            
-            logger.info(f"Retrieved {len(retrieved_chunks)} similar chunks")
-            return retrieved_chunks
-            
-        except Exception as e:
-            logger.error(f"Error searching vectors: {str(e)}")
-            raise
+    async def get_document_chunks(self, document_id: str) -> List[Dict[str, Any]]:
+        """Retrieve all chunks for a specific document from its manifest."""
+        chunks = await asyncio.to_thread(self._manifest, document_id)
+        if chunks is not None:
+            return chunks
+        
+        # Ingested before manifests (and the chunks table) existed: ask the backend once
+        chunks = await self.backend.get_document_chunks(document_id)
+        if chunks:
+            await asyncio.to_thread(self.manifests.put, document_id, chunks)
+        return chunks
 
-    def get_document_chunks(self, document_url: str) -> List[Dict[str, Any]]:
-        """Retrieve all chunks for a specific document from Pinecone."""
-        try:
-            # Use a dummy query vector to fetch all chunks for the document
-            # Pinecone doesn't support filtering by metadata directly in query, 
-            # so we'll use a hybrid approach
-            
-            # First, try to get chunks by searching with a dummy vector and filtering
-            dummy_vector = [0.0] * 384  # Same dimension as embeddings
-            
-            # Get a large number of results to capture all chunks for this document
-            results = self.index.query(
-                vector=dummy_vector,
-                top_k=10000,  # Large number to get all chunks
-                include_metadata=True,
-                filter={
-                    "document_url": {"$eq": document_url}
-                }
+class DocumentWriter:
+    """Writes one document to the vector store in batches as they are embedded.
+    
+    Incremental backends (Pinecone) receive each batch immediately, and
+    several ``add`` calls may be in flight at once; for the other backends
+    batches are buffered and stored in one go on commit. Either way the
+    manifest is only written on commit, so has_document stays false for an
+    ingestion that never finishes.
+    """
+    
+    def __init__(self, store: VectorStore, document_id: str):
+        self.store = store
+        self.document_id = document_id
+        self.chunks: List[str] = []
+        self._embeddings: List[np.ndarray] = []
+        self._batches: List[Tuple[int, UpsertSummary]] = []
+    
+    async def add(self, chunks: List[str], embeddings: np.ndarray):
+        """Store the next batch of chunks, continuing the document's chunk numbering."""
+        # Reserve the batch's chunk indices before awaiting so concurrent adds don't collide
+        start_index = len(self.chunks)
+        self.chunks.extend(chunks)
+        backend = self.store.backend
+        if backend.incremental:
+            summary = await backend.store_batch(chunks, embeddings, self.document_id, start_index)
+            self._batches.append((start_index, summary))
+        else:
+            self._embeddings.append(embeddings)
+    
+    async def commit(self) -> UpsertSummary:
+        """Finish the document, record its chunk manifest and summarise all writes."""
+        summary = UpsertSummary()
+        if self.store.backend.incremental:
+            # Batches may have completed out of order; chunk IDs follow chunk order
+            for _, batch in sorted(self._batches, key=lambda item: item[0]):
+                summary.merge(batch)
+        else:
+            summary = await self.store.backend.store_embeddings(
+                self.chunks, np.concatenate(self._embeddings), self.document_id
             )
-            
-            document_chunks = []
-            for match in results.matches:
-                document_chunks.append({
-                    "text": match.metadata["chunk_text"],
-                    "document_url": match.metadata["document_url"],
-                    "chunk_index": match.metadata["chunk_index"],
-                    "chunk_id": match.id
-                })
-            
-            # Sort by chunk_index to maintain document order
-            document_chunks.sort(key=lambda x: x["chunk_index"])
-            
-            logger.info(f"Retrieved {len(document_chunks)} chunks for document: {document_url}")
-            return document_chunks
-            
-        except Exception as e:
-            logger.error(f"Error retrieving document chunks for {document_url}: {str(e)}")
-            # Return empty list if no chunks found or error occurs
-            return []
+            self._embeddings = []
+        await self.store._write_manifest(self.document_id, self.chunks, summary.chunk_ids)
+        return summary
@@ -0,0 +1,40 @@
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Query parameters that only sign a URL or bound its lifetime (Azure SAS, CloudFront)
+SIGNATURE_PARAMS = frozenset(["sig", "se", "st", "sp", "sv", "spr", "sr", "expires", "signature", "key-pair-id"])
+# Prefixes of S3 and GCS presigned-URL parameters
+SIGNATURE_PARAM_PREFIXES = ("x-amz-", "x-goog-")
+
+def document_key(document_url: str) -> str:
+    """Stable, filesystem- and namespace-safe key for a document URL."""
+    return hashlib.sha1(document_url.encode("utf-8")).hexdigest()
+
+def normalize_document_url(document_url: str) -> str:
+    """Normalise a document URL so signed variants of the same blob compare equal.
+    
+    The scheme and host are lower-cased, default ports dropped, the fragment
+    and the signature/expiry query parameters (SAS tokens, presigned S3/GCS
+    and CloudFront parameters) removed. Every other parameter may select a
+    different document (``download?id=1``), so it is kept, sorted.
+    """
+    parts = urlsplit(document_url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    params = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_signature_param(name)
+    )
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(params), ""))
+
+def is_signature_param(name: str) -> bool:
+    """Whether a query parameter only signs the URL or sets its expiry."""
+    name = name.lower()
+    return name in SIGNATURE_PARAMS or name.startswith(SIGNATURE_PARAM_PREFIXES)
+
+def chunk_id(document_id: str, chunk_index: int) -> str:
+    """Deterministic chunk ID, so re-ingesting a document overwrites instead of duplicating."""
+    return f"{document_id}:{chunk_index}"
@@ -0,0 +1,28 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one shared task.
+    
+    The first caller for a key starts the work; callers arriving while it is
+    in flight await the same task and get its result (or exception). Waiters
+    are shielded from each other: one caller being cancelled (say, a client
+    disconnecting) does not cancel the work the others are waiting for.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+    
+    async def run(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(work())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+    
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+    
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,35 @@
+from app.config.settings import settings
+from app.utils.logger import logger
+
+_encoding = None
+
+def _get_encoding():
+    """The tiktoken encoding named by ``llm_tokenizer_encoding``, or False if it cannot be loaded."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(settings.llm_tokenizer_encoding)
+        except Exception as e:
+            logger.warning(f"Tokenizer {settings.llm_tokenizer_encoding} unavailable ({str(e)}); estimating token counts")
+            _encoding = False
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """LLM tokens in ``text``, using the tiktoken encoding named by ``llm_tokenizer_encoding``.
+
+    Llama 3's tokenizer is built on cl100k_base, so counts track Groq's
+    closely. If the encoding cannot be loaded (it is downloaded on first
+    use), counts fall back to about four characters per token.
+    """
+    encoding = _get_encoding()
+    if encoding is False:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """The first ``max_tokens`` LLM tokens of ``text`` (about four characters each without the encoding)."""
+    encoding = _get_encoding()
+    if encoding is False:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
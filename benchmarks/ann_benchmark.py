@@ -0,0 +1,76 @@
+"""Recall vs latency of the local IVF-int8 index against exact search.
+
+Usage (with the usual environment variables from .env.example set):
+
+    python -m benchmarks.ann_benchmark --vectors 200000 --queries 200
+
+Synthetic clustered unit vectors stand in for chunk embeddings; pass
+``--embeddings path.npy`` to benchmark a real (n, dim) float32 matrix.
+"""
+import argparse
+import time
+import numpy as np
+from app.services.vector_backends.ivf_index import IVFInt8Index
+from app.services.vector_backends.similarity import normalize, top_k_indices
+
+def make_corpus(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = normalize(rng.normal(size=(clusters, dim)).astype(np.float32))
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.normal(scale=0.6 / np.sqrt(dim), size=(n, dim)).astype(np.float32)
+    return normalize(centers[labels] + noise)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--embeddings", help="optional .npy matrix to use instead of synthetic data")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        corpus = normalize(np.load(args.embeddings).astype(np.float32))
+    else:
+        corpus = make_corpus(args.vectors, args.dim, clusters=2000, seed=0)
+    rng = np.random.default_rng(1)
+    queries = normalize(corpus[rng.choice(len(corpus), args.queries, replace=False)]
+                        + rng.normal(scale=0.02, size=(args.queries, corpus.shape[1])).astype(np.float32))
+
+    # Exact baseline
+    start = time.perf_counter()
+    truth = [set(top_k_indices(corpus @ q, args.k).tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    index = IVFInt8Index(corpus.shape[1], nlist=args.nlist, train_size=len(corpus))
+    index.add(corpus, np.arange(len(corpus), dtype=np.int64))
+    build_s = time.perf_counter() - start
+
+    float_mb = corpus.nbytes / 2**20
+    quantized_mb = len(corpus) * (corpus.shape[1] + 4 + 8) / 2**20
+    print(f"vectors={len(corpus)} dim={corpus.shape[1]} nlist={args.nlist} build={build_s:.1f}s")
+    print(f"memory: float32={float_mb:.1f} MiB  ivf-int8={quantized_mb:.1f} MiB "
+          f"({float_mb / quantized_mb:.2f}x smaller)")
+    print(f"exact: recall@{args.k}=1.000  latency={exact_ms:.3f} ms/query")
+    print(f"{'nprobe':>6} {'recall':>8} {'ms/query':>9} {'recall+rr':>10} {'ms+rr':>8}")
+
+    for nprobe in args.nprobe:
+        row = [nprobe]
+        for rerank in (1, args.rerank_factor):
+            hits = 0
+            start = time.perf_counter()
+            for q, expected in zip(queries, truth):
+                _, ids = index.search(q, args.k * rerank, nprobe=nprobe)
+                if rerank > 1:
+                    ids = ids[top_k_indices(corpus[ids] @ q, args.k)]
+                hits += len(expected & set(ids.tolist()))
+            elapsed = (time.perf_counter() - start) * 1000 / len(queries)
+            row += [hits / (args.k * len(queries)), elapsed]
+        print(f"{row[0]:>6} {row[1]:>8.3f} {row[2]:>9.3f} {row[3]:>10.3f} {row[4]:>8.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Throughput of the token-based chunker against the old character splitter.
+
+Usage (with the usual environment variables from .env.example set):
+
+    python -m benchmarks.chunker_benchmark --pages 500
+
+A synthetic policy document in LlamaParse-style markdown (headings,
+numbered clauses, prose) stands in for parsed PDFs; pass ``--text path.md``
+to chunk a real parsed document instead. Chunks longer than the model's
+sequence limit would be silently truncated when embedded.
+"""
+import argparse
+import random
+import time
+from sentence_transformers import SentenceTransformer
+from app.services.chunker import TextChunker
+from app.config.settings import settings
+
+WORDS = ("policy insured sum premium hospital treatment claim period benefit cover "
+         "waiting expenses member room rent maternity exclusion illness accident "
+         "deductible co-payment renewal grace notified network surgery").split()
+
+def make_document(pages: int, seed: int) -> str:
+    rng = random.Random(seed)
+
+    def sentence() -> str:
+        words = rng.choices(WORDS, k=rng.randint(8, 30))
+        return " ".join(words).capitalize() + "."
+
+    parts = []
+    for page in range(pages):
+        parts.append(f"# Section {page + 1}")
+        for clause in range(rng.randint(3, 6)):
+            parts.append(f"{page + 1}.{clause + 1} " + " ".join(sentence() for _ in range(rng.randint(1, 4))))
+        parts.append("\n".join(sentence() for _ in range(rng.randint(4, 10))))
+    return "\n\n".join(parts)
+
+def legacy_chunk_text(text: str, chunk_size: int = 512):
+    """The previous character-based splitter, kept here as the baseline."""
+    sentences = text.split('. ')
+    chunks = []
+    current_chunk = ""
+    for sentence in sentences:
+        if len(current_chunk) + len(sentence) < chunk_size:
+            current_chunk += sentence + ". "
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = sentence + ". "
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    return chunks
+
+def token_lengths(tokenizer, chunks):
+    return [len(ids) for ids in tokenizer(chunks, add_special_tokens=True)["input_ids"]]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--text", help="optional markdown/text file to chunk instead of synthetic data")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.text:
+        with open(args.text, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = make_document(args.pages, seed=0)
+
+    model = SentenceTransformer(settings.embedding_model)
+    tokenizer = model.tokenizer
+    chunker = TextChunker(tokenizer, max_tokens=model.max_seq_length)
+    size_mb = len(text.encode("utf-8")) / 2**20
+
+    print(f"text={size_mb:.1f} MiB  model={settings.embedding_model}  max_seq_length={model.max_seq_length}")
+    print(f"chunk_size={settings.chunk_size} tokens  overlap={settings.chunk_overlap} tokens")
+    print(f"{'chunker':>8} {'MiB/s':>8} {'chunks':>7} {'mean tok':>9} {'max tok':>8} {'truncated':>10}")
+
+    for name, chunk in (("legacy", legacy_chunk_text), ("token", lambda t: list(chunker.iter_chunks(t)))):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            chunks = chunk(text)
+            best = min(best, time.perf_counter() - start)
+
+        lengths = token_lengths(tokenizer, chunks)
+        truncated = sum(length > model.max_seq_length for length in lengths)
+        print(f"{name:>8} {size_mb / best:>8.2f} {len(chunks):>7} "
+              f"{sum(lengths) / len(lengths):>9.1f} {max(lengths):>8} {truncated:>10}")
+
+if __name__ == "__main__":
+    main()
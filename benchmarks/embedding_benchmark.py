@@ -0,0 +1,63 @@
+"""Throughput and cosine drift of the ONNX embedding backend against PyTorch.
+
+Usage (with the usual environment variables from .env.example set):
+
+    python -m benchmarks.embedding_benchmark --texts 2000
+
+Texts are chunks of a synthetic policy document (see chunker_benchmark), so
+lengths vary the way real chunks do. The ONNX graph is exported into
+ONNX_MODEL_DIR on first run. Drift is the cosine similarity between each
+ONNX vector and the PyTorch vector of the same text.
+"""
+import argparse
+import time
+import numpy as np
+from app.services.chunker import TextChunker
+from app.services.embedding_backends.torch_backend import TorchBackend
+from app.services.embedding_backends.onnx_backend import OnnxBackend
+from app.config.settings import settings
+from benchmarks.chunker_benchmark import make_document
+
+def throughput(backend, texts, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        embeddings = backend.encode(texts)
+        best = min(best, time.perf_counter() - start)
+    return embeddings, len(texts) / best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    reference = TorchBackend()
+    chunker = TextChunker(reference.tokenizer, max_tokens=reference.max_seq_length)
+    texts = []
+    for pages in range(50, 100000, 50):
+        texts = list(chunker.iter_chunks(make_document(pages, seed=0)))
+        if len(texts) >= args.texts:
+            break
+    texts = texts[:args.texts]
+
+    print(f"texts={len(texts)}  model={settings.embedding_model}  batch_size={settings.embedding_batch_size}  "
+          f"intra_op_threads={settings.onnx_intra_op_threads or 'auto'}")
+    print(f"{'backend':>10} {'texts/s':>9} {'speedup':>8} {'mean cos':>9} {'min cos':>9}")
+
+    expected, base_rate = throughput(reference, texts, args.repeat)
+    print(f"{'torch':>10} {base_rate:>9.1f} {1.0:>8.2f} {1.0:>9.5f} {1.0:>9.5f}")
+
+    for quantize in (False, True):
+        settings.onnx_quantize = quantize
+        backend = OnnxBackend()
+        embeddings, rate = throughput(backend, texts, args.repeat)
+        cosines = np.sum(_unit(embeddings) * _unit(expected), axis=1)
+        print(f"{'onnx-int8' if quantize else 'onnx':>10} {rate:>9.1f} {rate / base_rate:>8.2f} "
+              f"{cosines.mean():>9.5f} {cosines.min():>9.5f}")
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Memory and time of passing embeddings as NumPy arrays versus Python lists.
+
+Usage (with the usual environment variables from .env.example set):
+
+    python -m benchmarks.embedding_memory_benchmark --chunks 20000
+
+Random unit vectors stand in for encoder output. The "lists" path is what
+ingestion used to do: ``.tolist()`` after encoding, then converting back to
+float32 to store. The "arrays" path keeps the encoder's float32 matrix.
+Peak memory is measured with tracemalloc, which also tracks NumPy buffers.
+The embedding cache is filled with the same vectors as float32 and float16.
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from app.services.embedding_cache import EmbeddingCache
+from app.services.vector_backends.similarity import normalize
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 2**20, elapsed * 1000
+
+def lists_path(matrix: np.ndarray) -> np.ndarray:
+    embeddings = matrix.tolist()
+    return normalize(np.asarray(embeddings, dtype=np.float32))
+
+def arrays_path(matrix: np.ndarray) -> np.ndarray:
+    return normalize(np.asarray(matrix, dtype=np.float32))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    matrix = normalize(rng.normal(size=(args.chunks, args.dim)).astype(np.float32))
+    print(f"chunks={args.chunks} dim={args.dim} float32 matrix={matrix.nbytes / 2**20:.1f} MiB")
+    print(f"{'path':>8} {'peak MiB':>9} {'ms':>8}")
+    for name, path in (("lists", lists_path), ("arrays", arrays_path)):
+        stored, peak_mb, elapsed_ms = measure(path, matrix)
+        assert np.allclose(stored, matrix, atol=1e-6)
+        print(f"{name:>8} {peak_mb:>9.1f} {elapsed_ms:>8.1f}")
+
+    texts = [f"chunk {i}" for i in range(args.chunks)]
+    print(f"{'cache':>8} {'MiB':>9} {'min cos':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for dtype in ("float32", "float16"):
+            cache = EmbeddingCache("benchmark", cache_path=f"{tmp_dir}/{dtype}.sqlite3",
+                                   max_memory_bytes=2**40, dtype=dtype)
+            cache.put_many(texts, matrix)
+            restored = np.vstack(cache.get_many(texts)).astype(np.float32)
+            cosines = np.sum(normalize(restored) * matrix, axis=1)
+            print(f"{dtype:>8} {cache.stats()['memory_bytes'] / 2**20:>9.1f} {cosines.min():>8.5f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Build time, size and query latency of the per-document BM25 index.
+
+Usage (with the usual environment variables from .env.example set):
+
+    python -m benchmarks.lexical_benchmark --pages 200 500 2000 --queries 500
+
+Paragraphs of a synthetic policy document (see chunker_benchmark) stand in
+for chunks. Queries name a clause number the way policy questions do
+("What does clause 12.3 say about ..."); hit@k is the share of queries whose
+clause is among the top k results, the case dense retrieval handles poorly.
+"""
+import argparse
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from app.services.lexical_index import BM25Index
+from benchmarks.chunker_benchmark import make_document
+
+CLAUSE_RE = re.compile(r"^(\d+\.\d+) ((?:\w+ ){3})", re.M)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 500, 2000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'chunks':>7} {'terms':>6} {'build ms':>9} {'MiB':>6} {'load ms':>8} "
+          f"{'query us':>9} {'p95 us':>7} {'hit@k':>6}")
+    for pages in args.pages:
+        chunks = make_document(pages, seed=0).split("\n\n")
+
+        build_ms = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            index = BM25Index.build(chunks)
+            build_ms = min(build_ms, (time.perf_counter() - start) * 1000)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "index.npz"
+            index.save(path)
+            size_mb = path.stat().st_size / 2**20
+            start = time.perf_counter()
+            index = BM25Index.load(path)
+            load_ms = (time.perf_counter() - start) * 1000
+
+        rng = random.Random(1)
+        clauses = [(row, match) for row, chunk in enumerate(chunks) for match in CLAUSE_RE.finditer(chunk)]
+        latencies, hits = [], 0
+        for row, match in rng.sample(clauses, min(args.queries, len(clauses))):
+            query = f"What does clause {match.group(1)} say about {match.group(2).strip()}?"
+            start = time.perf_counter()
+            _, rows = index.search(query, args.k)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            hits += row in rows
+        print(f"{pages:>6} {len(chunks):>7} {len(index.vocabulary):>6} {build_ms:>9.1f} {size_mb:>6.2f} "
+              f"{load_ms:>8.1f} {np.mean(latencies):>9.1f} {np.percentile(latencies, 95):>7.1f} "
+              f"{hits / len(latencies):>6.3f}")
+
+if __name__ == "__main__":
+    main()
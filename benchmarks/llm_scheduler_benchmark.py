@@ -0,0 +1,62 @@
+"""Load test of the LLM scheduler against the mock provider, without and with hedging.
+
+Usage (with the usual environment variables from .env.example set):
+
+    python -m benchmarks.llm_scheduler_benchmark --calls 200 --rpm 150 --error-rate 0.05
+
+Calls are all submitted at once, as a burst of requests would. Latency is
+per call from submission, so it includes time queued for the RPM/TPM
+budgets and retry backoff; no call should fail while retries remain.
+Calls beyond --rpm wait for the one-minute window to slide, so each mode
+takes over a minute when --calls exceeds --rpm.
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+from app.services.llm_providers.mock_provider import MockProvider
+from app.services.llm_scheduler import LLMScheduler
+
+PROMPT = "Context:\n" + "The policy covers hospitalisation expenses. " * 40 + "\n\nQuestion: {}\n\nAnswer:"
+
+async def run(args, hedge: bool):
+    provider = MockProvider(latency_ms=args.latency_ms, latency_sigma=args.sigma, error_rate=args.error_rate)
+    scheduler = LLMScheduler(provider, requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+                             hedge_enabled=hedge)
+
+    async def call(i: int) -> float:
+        start = time.perf_counter()
+        messages = [{"role": "user", "content": PROMPT.format(f"question {i}")}]
+        await scheduler.complete(messages, max_tokens=args.max_tokens, temperature=0.1)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[call(i) for i in range(args.calls)], return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    latencies = np.array([r for r in results if not isinstance(r, BaseException)])
+    stats = scheduler.stats()
+    print(f"{'hedged' if hedge else 'plain':>7} {elapsed:>7.1f} {len(results) - len(latencies):>6} "
+          f"{np.percentile(latencies, 50):>8.0f} {np.percentile(latencies, 95):>8.0f} "
+          f"{np.percentile(latencies, 99):>8.0f} {stats['retries']:>7} {stats['hedges']:>6} "
+          f"{stats['hedge_wins']:>5} {provider.calls:>6}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--rpm", type=int, default=150)
+    parser.add_argument("--tpm", type=int, default=1_000_000)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--sigma", type=float, default=0.8)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"calls={args.calls} rpm={args.rpm} tpm={args.tpm} median latency={args.latency_ms:.0f}ms "
+          f"sigma={args.sigma} error rate={args.error_rate}")
+    print(f"{'mode':>7} {'wall s':>7} {'failed':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'retries':>7} {'hedges':>6} {'wins':>5} {'sent':>6}")
+    for hedge in (False, True):
+        asyncio.run(run(args, hedge))
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,20 @@ def main():
     print(f"☁️ Running on Google Cloud Platform - Cloud Run")
     print(f"🌍 Environment: {os.environ.get('ENVIRONMENT', 'production')}")
     
+    # Bring the database schema up to date before the app touches it
+    try:
+        from app.config.settings import settings
+        if settings.database_migrate_on_startup:
+            from alembic import command
+            from alembic.config import Config
+            alembic_config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+            alembic_config.attributes["app_logging"] = True
+            command.upgrade(alembic_config, "head")
+            print("✅ Database migrations applied")
+    except Exception as e:
+        print(f"❌ Failed to apply database migrations: {e}")
+        raise
+    
     # Import app here to avoid circular imports and early initialization
     try:
         from app.main import app
@@ -0,0 +1,20 @@
+import os
+
+# Settings are read on import; the tests never reach a real database or API
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("BEARER_TOKEN", "test-token")
+
+import pytest
+from app.config.settings import settings
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Point every local data directory at a fresh temporary one."""
+    for name, relative in [
+        ("local_vector_dir", "vectors"),
+        ("manifest_dir", "manifests"),
+        ("lexical_index_dir", "lexical"),
+        ("embedding_cache_path", "embedding_cache.sqlite3")
+    ]:
+        monkeypatch.setattr(settings, name, str(tmp_path / relative))
+    return tmp_path
@@ -0,0 +1,58 @@
+import re
+from app.services.chunker import TextChunker
+
+class WordTokenizer:
+    """Stands in for a HuggingFace fast tokenizer: one token per word or punctuation mark."""
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False):
+        offsets = [[match.span() for match in re.finditer(r"\w+|[^\w\s]", text)] for text in texts]
+        return {
+            "input_ids": [list(range(len(spans))) for spans in offsets],
+            "offset_mapping": offsets
+        }
+
+def count_tokens(text):
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+def chunk(text, chunk_size=20, overlap=6):
+    return list(TextChunker(WordTokenizer()).iter_chunks(text, chunk_size=chunk_size, overlap=overlap))
+
+SECTION = " ".join(f"Sentence number {i} of the section ends here." for i in range(12))
+
+def test_chunks_stay_within_token_budget():
+    chunks = chunk(f"# Coverage\n\n{SECTION}")
+
+    assert len(chunks) > 1
+    assert all(count_tokens(text) <= 20 for text in chunks)
+    assert all(text.startswith("# Coverage\n\n") for text in chunks)
+
+def test_consecutive_chunks_share_whole_sentences_within_overlap():
+    chunks = chunk(SECTION, chunk_size=20, overlap=10)
+
+    assert len(chunks) == 11
+    for previous, current in zip(chunks, chunks[1:]):
+        first_sentence = current.split(". ")[0] + "."
+        assert previous.endswith(first_sentence)
+        assert count_tokens(first_sentence) <= 10
+
+def test_long_unit_is_cut_into_token_windows():
+    words = " ".join(f"w{i}" for i in range(50))
+    chunks = chunk(words, chunk_size=20, overlap=5)
+
+    assert [count_tokens(text) for text in chunks] == [20, 20, 20]
+    assert chunks[1].split()[:5] == chunks[0].split()[-5:]
+
+def test_document_of_only_headings_still_has_chunks():
+    chunks = chunk("# Policy\n\n## Section 1\n\n## Section 2\n")
+
+    assert chunks == ["# Policy\n\n## Section 1\n\n## Section 2"]
+
+def test_heading_without_text_is_not_emitted_alone():
+    chunks = chunk("# Policy\n\n## Section 1\n\nCovered.\n")
+
+    assert chunks == ["## Section 1\n\nCovered."]
+
+def test_numbered_clauses_split_but_leading_numbers_do_not():
+    chunks = chunk("Premiums for\n2024 are due monthly.\n1. Pay on time\n2.3 Grace period applies\n")
+
+    assert chunks == ["Premiums for 2024 are due monthly.\n\n1. Pay on time\n\n2.3 Grace period applies"]
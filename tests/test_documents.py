@@ -0,0 +1,35 @@
+from app.utils.documents import normalize_document_url
+
+BLOB = "https://hackrx.blob.core.windows.net/assets/policy.pdf"
+
+def test_sas_signature_and_expiry_are_removed():
+    first = f"{BLOB}?sv=2023-01-03&st=2025-07-04T09%3A11%3A24Z&se=2027-07-05T09%3A11%3A00Z&sr=b&sp=r&sig=abc%3D"
+    second = f"{BLOB}?sv=2023-01-03&st=2025-08-01T00%3A00%3A00Z&se=2027-08-01T00%3A00%3A00Z&sr=b&sp=r&sig=xyz%3D"
+
+    assert normalize_document_url(first) == normalize_document_url(second) == BLOB
+
+def test_presigned_s3_gcs_and_cloudfront_parameters_are_removed():
+    s3 = ("https://bucket.s3.amazonaws.com/policy.pdf?X-Amz-Algorithm=AWS4-HMAC-SHA256"
+          "&X-Amz-Credential=AKIA%2F20250101&X-Amz-Date=20250101T000000Z&X-Amz-Expires=3600"
+          "&X-Amz-SignedHeaders=host&X-Amz-Signature=deadbeef")
+    gcs = "https://storage.googleapis.com/bucket/policy.pdf?X-Goog-Expires=900&X-Goog-Signature=beef"
+    cloudfront = "https://d111.cloudfront.net/policy.pdf?Expires=1700000000&Signature=abc&Key-Pair-Id=K2"
+
+    assert normalize_document_url(s3) == "https://bucket.s3.amazonaws.com/policy.pdf"
+    assert normalize_document_url(gcs) == "https://storage.googleapis.com/bucket/policy.pdf"
+    assert normalize_document_url(cloudfront) == "https://d111.cloudfront.net/policy.pdf"
+
+def test_parameter_order_does_not_matter():
+    assert (normalize_document_url("https://example.com/download?id=7&version=2&sig=a")
+            == normalize_document_url("https://example.com/download?sig=b&version=2&id=7"))
+
+def test_other_parameters_are_kept():
+    assert normalize_document_url("https://example.com/download?id=1") != normalize_document_url(
+        "https://example.com/download?id=2")
+    assert (normalize_document_url(f"{BLOB}?version=3&sig=abc")
+            == f"{BLOB}?version=3")
+
+def test_scheme_host_port_and_fragment_are_normalised():
+    assert (normalize_document_url("  HTTPS://Example.COM:443/a/Policy.pdf#page=2 ")
+            == "https://example.com/a/Policy.pdf")
+    assert normalize_document_url("http://example.com:8080/p.pdf") == "http://example.com:8080/p.pdf"
@@ -0,0 +1,64 @@
+from app.services.lexical_index import BM25Index, LexicalIndexStore, reciprocal_rank_fusion, tokenize
+
+CHUNKS = [
+    "Section 3 describes the waiting period for pre-existing diseases.",
+    "Clause 4.2 excludes cosmetic surgery unless medically necessary.",
+    "Clause 4.21 covers ambulance charges up to the sum insured.",
+    "The policy covers hospitalisation for at least 24 hours."
+]
+
+def chunk(index, score=0.0, document_id="doc"):
+    return {"text": f"chunk {index}", "document_id": document_id, "chunk_index": index, "score": score}
+
+def test_clause_numbers_are_single_terms():
+    assert tokenize("See clause 3.1.7 and 4.2.") == ["see", "clause", "3.1.7", "4.2"]
+
+def test_exact_clause_number_ranks_its_chunk_first():
+    index = BM25Index.build(CHUNKS)
+
+    scores, rows = index.search("What does clause 4.2 say?", 3)
+    # "4.21" is a different term, so chunk 2 only matches "clause"; chunks with no query term are left out
+    assert rows.tolist() == [1, 2]
+    assert list(scores) == sorted(scores, reverse=True)
+
+def test_unknown_terms_match_nothing():
+    scores, rows = BM25Index.build(CHUNKS).search("dental implants", 5)
+    assert len(scores) == 0 and len(rows) == 0
+
+def test_save_and_load_round_trip(tmp_path):
+    index = BM25Index.build(CHUNKS)
+    index.save(tmp_path / "index.npz")
+    loaded = BM25Index.load(tmp_path / "index.npz")
+
+    assert loaded.vocabulary == index.vocabulary
+    assert loaded.size == index.size
+    for query in ["clause 4.2", "waiting period", "ambulance sum insured"]:
+        expected, found = index.search(query, 4), loaded.search(query, 4)
+        assert found[1].tolist() == expected[1].tolist()
+        assert found[0].tolist() == expected[0].tolist()
+
+def test_store_reloads_index_from_disk(tmp_path):
+    LexicalIndexStore(str(tmp_path)).put("doc", CHUNKS)
+
+    index = LexicalIndexStore(str(tmp_path)).get("doc")
+    assert index is not None and index.search("clause 4.2", 1)[1].tolist() == [1]
+    assert LexicalIndexStore(str(tmp_path)).get("other") is None
+
+def test_fusion_deduplicates_by_chunk_index():
+    dense = [chunk(5, 0.9), chunk(2, 0.8), chunk(7, 0.7)]
+    lexical = [chunk(2, 12.0), chunk(9, 8.0)]
+
+    fused = reciprocal_rank_fusion([dense, lexical], top_k=10, k=60)
+    assert [c["chunk_index"] for c in fused] == [2, 5, 9, 7]
+    assert fused[0]["score"] == 1 / 62 + 1 / 61
+    # Chunks of different documents with the same index stay apart
+    other = reciprocal_rank_fusion([[chunk(1)], [chunk(1, document_id="other")]], top_k=10)
+    assert len(other) == 2
+
+def test_fusion_ties_keep_first_seen_order_and_respect_top_k():
+    dense = [chunk(1), chunk(2)]
+    lexical = [chunk(3), chunk(4)]
+
+    fused = reciprocal_rank_fusion([dense, lexical], top_k=3, k=60)
+    # 1 and 3 tie at rank 1, 2 and 4 at rank 2: the earlier list wins each tie
+    assert [c["chunk_index"] for c in fused] == [1, 3, 2]
@@ -0,0 +1,111 @@
+import asyncio
+import time
+import pytest
+from app.config.settings import settings
+from app.services.llm_providers.base import ProviderError
+from app.services.llm_providers.mock_provider import MockProvider
+from app.services.llm_scheduler import LLMScheduler
+
+MESSAGES = [{"role": "user", "content": "Context: the policy.\n\nQuestion: Is surgery covered?\n\nAnswer:"}]
+
+@pytest.fixture(autouse=True)
+def fast_window(monkeypatch):
+    """A 0.2 s rate-limit window, quick retries, and token counts without downloading an encoding."""
+    monkeypatch.setattr("app.services.llm_scheduler.WINDOW_SECONDS", 0.2)
+    monkeypatch.setattr("app.utils.tokens._encoding", False)
+    monkeypatch.setattr(settings, "llm_retry_backoff", 0.01)
+    monkeypatch.setattr(settings, "llm_max_retries", 2)
+    monkeypatch.setattr(settings, "llm_hedge_min_samples", 5)
+    monkeypatch.setattr(settings, "llm_hedge_percentile", 95.0)
+
+class ScriptedProvider(MockProvider):
+    """MockProvider whose n-th call fails or stalls on cue."""
+
+    def __init__(self, failures=(), delays=()):
+        super().__init__(latency_ms=0, error_rate=0)
+        self.failures = list(failures)
+        self.delays = list(delays)
+        self.cancelled = 0
+
+    async def _respond(self):
+        call = self.calls
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delays[call] if call < len(self.delays) else 0)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if call < len(self.failures) and self.failures[call] is not None:
+            raise self.failures[call]
+
+def run_calls(scheduler, n, max_tokens=10):
+    async def burst():
+        return await asyncio.gather(*[scheduler.complete(MESSAGES, max_tokens, 0.0) for _ in range(n)])
+    start = time.monotonic()
+    completions = asyncio.run(burst())
+    return completions, time.monotonic() - start
+
+def test_requests_beyond_the_rpm_budget_wait_for_the_window():
+    scheduler = LLMScheduler(ScriptedProvider(), requests_per_minute=2, tokens_per_minute=100000)
+
+    completions, elapsed = run_calls(scheduler, 5)
+    assert len(completions) == 5
+    # Two calls per window: the 3rd and 4th wait one window, the 5th two
+    assert elapsed >= 0.4
+    assert scheduler.queued_calls == 3
+    assert scheduler.stats()["window_requests"] <= 2
+
+def test_tokens_beyond_the_tpm_budget_wait_for_the_window():
+    scheduler = LLMScheduler(ScriptedProvider(), requests_per_minute=100, tokens_per_minute=100)
+
+    completions, elapsed = run_calls(scheduler, 2, max_tokens=60)
+    assert len(completions) == 2
+    assert elapsed >= 0.2
+    assert scheduler.queued_calls == 1
+
+def test_reservations_are_settled_to_actual_usage():
+    scheduler = LLMScheduler(ScriptedProvider(), requests_per_minute=100, tokens_per_minute=100000)
+
+    (completion,), _ = run_calls(scheduler, 1, max_tokens=500)
+    assert scheduler.stats()["window_tokens"] == completion.prompt_tokens + completion.completion_tokens
+
+def test_retryable_errors_are_retried_after_retry_after():
+    provider = ScriptedProvider(failures=[
+        ProviderError("429", retryable=True, retry_after=0.1),
+        ProviderError("503", retryable=True)
+    ])
+    scheduler = LLMScheduler(provider, requests_per_minute=100, tokens_per_minute=100000)
+
+    (completion,), elapsed = run_calls(scheduler, 1)
+    assert completion.text.startswith("Mock answer")
+    assert provider.calls == 3 and scheduler.retries == 2 and scheduler.failures == 2
+    assert elapsed >= 0.1
+
+def test_retries_stop_at_the_limit_and_skip_permanent_errors():
+    failing = ScriptedProvider(failures=[ProviderError("429", retryable=True)] * 5)
+    with pytest.raises(ProviderError):
+        run_calls(LLMScheduler(failing, requests_per_minute=100, tokens_per_minute=100000), 1)
+    assert failing.calls == settings.llm_max_retries + 1
+
+    rejected = ScriptedProvider(failures=[ProviderError("400", retryable=False)])
+    with pytest.raises(ProviderError):
+        run_calls(LLMScheduler(rejected, requests_per_minute=100, tokens_per_minute=100000), 1)
+    assert rejected.calls == 1
+
+def test_slow_call_is_hedged_and_the_loser_cancelled():
+    provider = ScriptedProvider(delays=[5.0, 0.0])
+    scheduler = LLMScheduler(provider, requests_per_minute=100, tokens_per_minute=100000, hedge_enabled=True)
+    scheduler._latencies.extend([0.01] * 5)
+
+    (completion,), elapsed = run_calls(scheduler, 1)
+    assert completion.text.startswith("Mock answer")
+    assert elapsed < 1.0
+    assert scheduler.hedges == 1 and scheduler.hedge_wins == 1
+    assert provider.cancelled == 1
+
+def test_no_hedge_without_enough_latency_samples():
+    provider = ScriptedProvider(delays=[0.1])
+    scheduler = LLMScheduler(provider, requests_per_minute=100, tokens_per_minute=100000, hedge_enabled=True)
+
+    run_calls(scheduler, 1)
+    assert scheduler.hedges == 0 and provider.calls == 1
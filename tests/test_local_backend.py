@@ -0,0 +1,128 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+from app.config.settings import settings
+from app.services.vector_backends.ivf_index import IVFInt8Index
+from app.services.vector_backends.local_backend import ROW_BITS, LocalBackend
+from app.services.vector_backends.similarity import normalize
+
+DIM = 16
+
+@pytest.fixture
+def ivf(data_dir, monkeypatch):
+    """A small IVF configuration: trained after 64 vectors, every document searched through the index."""
+    for name, value in [
+        ("embedding_dimension", DIM),
+        ("local_index_type", "ivf"),
+        ("ivf_nlist", 8),
+        ("ivf_nprobe", 2),
+        ("ivf_train_size", 64),
+        ("ivf_exact_threshold", 0)
+    ]:
+        monkeypatch.setattr(settings, name, value)
+    return data_dir
+
+def vectors(n, seed):
+    return normalize(np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32))
+
+def clustered(n, seed, clusters=8):
+    """Unit vectors around a few shared centres, the structure IVF relies on."""
+    centres = vectors(clusters, seed=1000)
+    rng = np.random.default_rng(seed)
+    noise = rng.normal(scale=0.25, size=(n, DIM)).astype(np.float32)
+    return normalize(centres[rng.integers(0, clusters, size=n)] + noise)
+
+def store(backend, document_id, embeddings):
+    chunks = [f"{document_id} chunk {i}" for i in range(len(embeddings))]
+    return asyncio.run(backend.store_embeddings(chunks, embeddings, document_id))
+
+def search(backend, query, top_k, document_id=None):
+    return asyncio.run(backend.search_similar(query, top_k, document_id))
+
+def test_replaced_document_drops_its_old_vectors(ivf):
+    backend = LocalBackend()
+    for i in range(4):
+        store(backend, f"doc{i}", vectors(30, seed=i))
+    old = vectors(30, seed=10)
+    store(backend, "doc0", old)
+    new = vectors(20, seed=11)
+    store(backend, "doc0", new)
+
+    assert len(backend.index) == 3 * 30 + 20
+    results = search(backend, old[0], 5, document_id="doc0")
+    assert len(results) == 5
+    assert all(result["chunk_index"] < 20 for result in results)
+    assert search(backend, new[7], 1, document_id="doc0")[0]["chunk_index"] == 7
+
+def test_document_scoped_search_keeps_top_k(ivf):
+    backend = LocalBackend()
+    for i in range(10):
+        store(backend, f"doc{i}", vectors(40, seed=i))
+
+    for seed in range(20):
+        query = vectors(1, seed=100 + seed)[0]
+        results = search(backend, query, 10, document_id="doc3")
+        # The probed lists rarely hold 10 of doc3's 40 chunks; the search must still return 10
+        assert len(results) == 10
+        assert all(result["document_id"] == "doc3" for result in results)
+        scores = [result["score"] for result in results]
+        assert scores == sorted(scores, reverse=True)
+
+def test_ivf_recall_against_flat_search(ivf, monkeypatch):
+    corpus = [clustered(100, seed=i) for i in range(8)]
+    backend = LocalBackend()
+    for i, embeddings in enumerate(corpus):
+        store(backend, f"doc{i}", embeddings)
+    monkeypatch.setattr(settings, "local_index_type", "flat")
+    flat = LocalBackend(data_dir=str(ivf / "flat"))
+    for i, embeddings in enumerate(corpus):
+        store(flat, f"doc{i}", embeddings)
+
+    hits = 0
+    queries = clustered(20, seed=50)
+    for query in queries:
+        expected = {(r["document_id"], r["chunk_index"]) for r in search(flat, query, 5)}
+        found = {(r["document_id"], r["chunk_index"]) for r in search(backend, query, 5)}
+        hits += len(expected & found)
+    assert hits / (5 * len(queries)) >= 0.9
+
+def test_search_skips_documents_replaced_mid_search(ivf):
+    backend = LocalBackend()
+    for i in range(3):
+        store(backend, f"doc{i}", vectors(30, seed=i))
+    # As if doc1's new version was registered between the ANN search and resolving its ids
+    backend._by_ordinal.pop(backend.documents["doc1"].ordinal)
+
+    results = backend._search_index(vectors(1, seed=5)[0], 10, list(range(3)))
+    assert results and all(document.document_id != "doc1" for _, document, _ in results)
+
+def test_ordinals_are_never_reused_across_restarts(ivf):
+    backend = LocalBackend()
+    store(backend, "doc0", vectors(30, seed=0))
+    store(backend, "doc1", vectors(30, seed=1))
+    store(backend, "doc1", vectors(30, seed=2))
+    # A metadata file without an ordinal is numbered after the stored ones
+    meta_path = next(path for path in (ivf / "vectors").glob("*.json")
+                     if json.loads(path.read_text())["document_id"] == "doc0")
+    meta = json.loads(meta_path.read_text())
+    del meta["ordinal"]
+    meta_path.write_text(json.dumps(meta))
+
+    reloaded = LocalBackend()
+    ordinals = sorted(document.ordinal for document in reloaded.documents.values())
+    assert len(set(ordinals)) == 2
+    store(reloaded, "doc2", vectors(30, seed=3))
+    assert reloaded.documents["doc2"].ordinal > max(ordinals)
+    indexed = set((reloaded.index.all_ids() >> ROW_BITS).tolist())
+    assert indexed == {document.ordinal for document in reloaded.documents.values()}
+
+def test_index_snapshot_round_trip(tmp_path):
+    index = IVFInt8Index(DIM, nlist=4, nprobe=4, train_size=32)
+    data = vectors(50, seed=0)
+    index.add(data, np.arange(50))
+    index.save(str(tmp_path / "index.npz"))
+
+    loaded = IVFInt8Index.load(str(tmp_path / "index.npz"))
+    assert sorted(loaded.all_ids().tolist()) == list(range(50))
+    assert loaded.search(data[17], 1)[1].tolist() == [17]
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.config.settings import settings
+from app.services.query_logger import QueryLogger
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(settings, "query_log_batch_size", 3)
+    monkeypatch.setattr(settings, "query_log_buffer_size", 10)
+    monkeypatch.setattr(settings, "query_log_flush_interval", 60.0)
+
+class FakeStore:
+    """QueryStore stand-in: records batches, or fails / hangs like an unreachable database."""
+
+    def __init__(self, error=None, release=None):
+        self.batches = []
+        self.error = error
+        self.release = release
+
+    def record_many(self, records):
+        if self.release is not None:
+            self.release.wait()
+        if self.error is not None:
+            raise self.error
+        self.batches.append(list(records))
+
+def record(n):
+    return {"document_id": "doc", "document_url": f"https://example.com/{n}.pdf", "questions": [str(n)]}
+
+def test_buffer_is_drained_on_shutdown():
+    store = FakeStore()
+
+    async def scenario():
+        query_logger = QueryLogger(store)
+        for n in range(2):
+            query_logger.log(record(n))
+        # Below the batch size and long before the flush interval: nothing written yet
+        await asyncio.sleep(0)
+        assert store.batches == []
+        await query_logger.aclose()
+        return query_logger
+
+    query_logger = asyncio.run(scenario())
+    assert [r["questions"] for batch in store.batches for r in batch] == [["0"], ["1"]]
+    assert query_logger.stats()["buffered"] == 0 and query_logger.written == 2
+
+def test_full_batch_is_written_without_waiting_for_the_interval():
+    store = FakeStore()
+
+    async def scenario():
+        query_logger = QueryLogger(store)
+        for n in range(7):
+            query_logger.log(record(n))
+        for _ in range(100):
+            if query_logger.written == 7:
+                break
+            await asyncio.sleep(0.01)
+        written = [len(batch) for batch in store.batches]
+        await query_logger.aclose()
+        return written
+
+    assert asyncio.run(scenario()) == [3, 3, 1]
+
+def test_database_errors_never_reach_or_block_requests():
+    release = threading.Event()
+    store = FakeStore(error=RuntimeError("database is down"), release=release)
+
+    async def scenario():
+        query_logger = QueryLogger(store)
+        start = time.monotonic()
+        # The writer is stuck on the database for the whole burst
+        for n in range(15):
+            query_logger.log(record(n))
+            await asyncio.sleep(0)
+        log_seconds = time.monotonic() - start
+        release.set()
+        await query_logger.aclose()
+        return query_logger, log_seconds
+
+    query_logger, log_seconds = asyncio.run(scenario())
+    assert log_seconds < 0.5
+    stats = query_logger.stats()
+    # Past the buffer limit records are dropped rather than queued without bound
+    assert stats["dropped"] > 0
+    assert stats["failed"] == stats["logged"] and stats["written"] == 0
+    assert stats["buffered"] == 0
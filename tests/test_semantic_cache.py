@@ -0,0 +1,20 @@
+import numpy as np
+from app.services.semantic_cache import SemanticCache
+
+SCOPE = ("document", "model", "v1")
+
+def test_shadow_mode_records_similarity_without_serving():
+    cache = SemanticCache(threshold=0.9, enabled=False)
+    cache.add(SCOPE, "What is the waiting period?", np.array([1.0, 0.0]), {"answer": "30 days"})
+
+    assert cache.lookup(SCOPE, "How long is the waiting period?", np.array([0.99, 0.05])) is None
+    stats = cache.stats()
+    assert stats["lookups"] == 1 and stats["hits"] == 1
+    assert stats["best_similarity_histogram"]["<=1.0"] == 1
+
+def test_enabled_cache_serves_hits_above_threshold():
+    cache = SemanticCache(threshold=0.9, enabled=True)
+    cache.add(SCOPE, "What is the waiting period?", np.array([1.0, 0.0]), {"answer": "30 days"})
+
+    assert cache.lookup(SCOPE, "How long is the waiting period?", np.array([0.99, 0.05])) == {"answer": "30 days"}
+    assert cache.lookup(SCOPE, "Is dental covered?", np.array([0.0, 1.0])) is None
@@ -0,0 +1,122 @@
+import asyncio
+import shutil
+import numpy as np
+from app.services.pdf_parser import PDFDownload
+from app.services.rag_service import RAGService
+from app.services.vector_backends.base import UpsertSummary
+from app.services.vector_store import VectorStore
+from app.utils.single_flight import SingleFlight
+
+DOCUMENT_ID = "a" * 64
+CHUNKS = ["Section 1 covers hospitalisation.", "Clause 4.2 excludes cosmetic surgery."]
+
+class FakeDocumentStore:
+    """The Postgres chunks table, shared by every instance."""
+
+    def __init__(self):
+        self.chunks = {}
+        self.reads = 0
+
+    def put(self, document_id, chunks):
+        self.chunks[document_id] = [dict(chunk) for chunk in chunks]
+
+    def get_chunks(self, document_id):
+        self.reads += 1
+        return self.chunks.get(document_id)
+
+class FakeDurableBackend:
+    """A remote vector index (Pinecone): survives the local disk."""
+    incremental = False
+    durable = True
+
+    async def store_embeddings(self, chunks, embeddings, document_id):
+        chunk_ids = [f"{document_id}_{i}" for i in range(len(chunks))]
+        return UpsertSummary(chunk_ids=chunk_ids, vectors=len(chunks), requests=1)
+
+    async def search_similar(self, query_embedding, top_k, document_id=None):
+        return []
+
+    async def get_document_chunks(self, document_id):
+        return []
+
+def make_store(documents, durable=True):
+    store = VectorStore()
+    store.backend = FakeDurableBackend()
+    store.backend.durable = durable
+    store.documents = documents
+    return store
+
+def ingest(documents):
+    store = make_store(documents)
+    asyncio.run(store.store_embeddings(CHUNKS, np.ones((len(CHUNKS), 4), dtype=np.float32), DOCUMENT_ID))
+
+def wipe_local_disk(data_dir):
+    shutil.rmtree(data_dir / "manifests")
+    shutil.rmtree(data_dir / "lexical")
+
+def test_lost_manifest_is_restored_from_database(data_dir, monkeypatch):
+    monkeypatch.setattr("app.config.settings.settings.vector_backend", "local")
+    documents = FakeDocumentStore()
+    ingest(documents)
+    wipe_local_disk(data_dir)
+
+    store = make_store(documents)
+    assert store.has_document(DOCUMENT_ID)
+    assert any((data_dir / "manifests").iterdir())
+    # Later lookups are served by the restored manifest
+    assert store.has_document(DOCUMENT_ID)
+    assert documents.reads == 1
+
+    results = asyncio.run(store.search_hybrid("clause 4.2", np.ones(4), top_k=1, document_id=DOCUMENT_ID))
+    assert [result["chunk_index"] for result in results] == [1]
+
+def test_lost_manifest_is_not_restored_for_local_vectors(data_dir, monkeypatch):
+    monkeypatch.setattr("app.config.settings.settings.vector_backend", "local")
+    documents = FakeDocumentStore()
+    ingest(documents)
+    wipe_local_disk(data_dir)
+
+    assert not make_store(documents, durable=False).has_document(DOCUMENT_ID)
+
+class FakeRegistry:
+    def __init__(self):
+        self.entries = {}
+
+    def lookup(self, document_url):
+        return self.entries.get(document_url)
+
+    def record(self, document_url, document_id, etag=None, last_modified=None):
+        self.entries[document_url] = {"document_id": document_id, "etag": etag, "last_modified": last_modified}
+
+class FakeParser:
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.downloads = 0
+
+    async def download_pdf(self, document_url, etag=None, last_modified=None):
+        self.downloads += 1
+        path = self.tmp_path / f"download-{self.downloads}.pdf"
+        path.write_bytes(b"%PDF")
+        return PDFDownload(path=str(path), content_hash=DOCUMENT_ID, etag=None, last_modified=None)
+
+class FailingIngestion:
+    async def ingest(self, path, document_id):
+        raise AssertionError("known document ingested again")
+
+def test_known_document_is_not_ingested_again_on_fresh_disk(data_dir, monkeypatch):
+    monkeypatch.setattr("app.config.settings.settings.vector_backend", "local")
+    documents = FakeDocumentStore()
+    ingest(documents)
+    registry = FakeRegistry()
+    registry.record("https://example.com/policy.pdf", DOCUMENT_ID)
+    wipe_local_disk(data_dir)
+
+    service = RAGService.__new__(RAGService)
+    service.vector_store = make_store(documents)
+    service.document_registry = registry
+    service.pdf_parser = FakeParser(data_dir)
+    service.ingestion = FailingIngestion()
+    service._content_flights = SingleFlight()
+
+    document_id = asyncio.run(service._resolve_document("https://example.com/policy.pdf"))
+    assert document_id == DOCUMENT_ID